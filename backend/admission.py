@@ -0,0 +1,200 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# OpenAI 비전 입력 토큰 산정 기준 (detail=high: 512px 타일당 170 + 기본 85)
+IMAGE_BASE_TOKENS = 85
+IMAGE_TILE_TOKENS = 170
+
+
+class AdmissionRejected(Exception):
+    """대기열이 가득 차서 요청을 받을 수 없을 때 발생"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__("모델 호출 대기열이 가득 찼습니다.")
+
+
+class AdmissionTimeout(Exception):
+    """최대 대기시간 안에 호출 예산을 확보하지 못했을 때 발생"""
+
+    def __init__(self, waited: float):
+        self.waited = waited
+        super().__init__(f"모델 호출 대기시간 초과 ({waited:.1f}초)")
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """이미지 한 장의 입력 토큰 수 추정 (2048px 이내로 축소 후 짧은 변 768px 기준 타일 계산)"""
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = -(-int(width) // 512) * -(-int(height) // 512)
+    return IMAGE_BASE_TOKENS + IMAGE_TILE_TOKENS * tiles
+
+
+def estimate_request_tokens(prompt: str, image_sizes, max_tokens: int) -> int:
+    """요청 전 토큰 사용량 추정 - 공급자 TPM 한도는 max_tokens까지 포함해 계산된다"""
+    prompt_tokens = len(prompt) // 2 + 1  # 한글 위주 프롬프트 기준 보수적 추정
+    image_tokens = sum(estimate_image_tokens(w, h) for w, h in image_sizes)
+    return prompt_tokens + image_tokens + max_tokens
+
+
+class TokenBucket:
+    """분당 한도를 초당 보충량으로 환산한 토큰 버킷 (잔량은 음수가 될 수 있음)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """amount 만큼 확보될 때까지 남은 시간(초) - 용량을 넘는 요청은 가득 찰 때까지만 기다린다"""
+        self._refill()
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate) if needed > 0 else 0.0
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def give_back(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class AdmissionTicket:
+    def __init__(self, estimated_tokens: int, waited: float):
+        self.estimated_tokens = estimated_tokens
+        self.waited = waited
+
+
+class AdmissionController:
+    """RPM/TPM 토큰 버킷과 FIFO 대기열로 모델 호출 진입을 제어"""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_queue: int = 50, max_wait: float = 60.0):
+        self.rpm_bucket = TokenBucket(rpm) if rpm > 0 else None
+        self.tpm_bucket = TokenBucket(tpm) if tpm > 0 else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._cond = asyncio.Condition()
+        self._queue: Deque[object] = deque()
+        self._recent_waits: Deque[float] = deque(maxlen=500)
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _delay_for(self, tokens: int) -> float:
+        delay = 0.0
+        if self.rpm_bucket:
+            delay = max(delay, self.rpm_bucket.time_until(1))
+        if self.tpm_bucket:
+            delay = max(delay, self.tpm_bucket.time_until(tokens))
+        return delay
+
+    async def acquire(self, estimated_tokens: int) -> AdmissionTicket:
+        """호출 예산을 확보할 때까지 대기 (대기열 초과 시 AdmissionRejected, 시간 초과 시 AdmissionTimeout)"""
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(retry_after=self._delay_for(estimated_tokens) or 1.0)
+
+        me = object()
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        # 락을 기다리는 동안에도 대기열 길이에 포함되도록 먼저 줄을 선다
+        self._queue.append(me)
+        try:
+            async with self._cond:
+                try:
+                    while True:
+                        timeout = deadline - time.monotonic()
+                        if self._queue[0] is me:
+                            delay = self._delay_for(estimated_tokens)
+                            if delay <= 0:
+                                break
+                            if delay > timeout:
+                                # 예산이 보충되기 전에 데드라인이 먼저 온다 - 기다리지 않고 바로 실패
+                                timeout = 0
+                            else:
+                                timeout = delay
+                        if timeout <= 0:
+                            self.timed_out += 1
+                            raise AdmissionTimeout(time.monotonic() - started)
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), timeout=timeout)
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    self._queue.remove(me)
+                    self._cond.notify_all()
+
+                if self.rpm_bucket:
+                    self.rpm_bucket.take(1)
+                if self.tpm_bucket:
+                    self.tpm_bucket.take(estimated_tokens)
+        except BaseException:
+            if me in self._queue:
+                self._queue.remove(me)
+            raise
+
+        waited = time.monotonic() - started
+        self._recent_waits.append(waited)
+        self.admitted += 1
+        self.in_flight += 1
+        return AdmissionTicket(estimated_tokens, waited)
+
+    def release(self, ticket: AdmissionTicket, actual_tokens: Optional[int] = None):
+        """호출 종료 - 실제 사용량으로 TPM 예산을 정산 (추정보다 적으면 반환, 많으면 추가 차감)"""
+        self.in_flight -= 1
+        if self.tpm_bucket and actual_tokens is not None:
+            difference = ticket.estimated_tokens - actual_tokens
+            if difference > 0:
+                self.tpm_bucket.give_back(difference)
+            else:
+                self.tpm_bucket.take(-difference)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._recent_waits)
+
+        def pct(q: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1)
+
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_ms_p50": pct(0.5),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_max": pct(1.0),
+            "rpm_available": round(self.rpm_bucket.level, 1) if self.rpm_bucket else None,
+            "tpm_available": round(self.tpm_bucket.level) if self.tpm_bucket else None,
+        }
+
+
+# 전역 진입 제어기
+admission_controller = None
+
+def get_admission_controller() -> AdmissionController:
+    global admission_controller
+    if admission_controller is None:
+        admission_controller = AdmissionController(
+            rpm=int(os.getenv("MODEL_RPM_LIMIT", "0")),
+            tpm=int(os.getenv("MODEL_TPM_LIMIT", "0")),
+            max_queue=int(os.getenv("MODEL_ADMISSION_QUEUE", "50")),
+            max_wait=float(os.getenv("MODEL_ADMISSION_MAX_WAIT", "60")),
+        )
+    return admission_controller
@@ -0,0 +1,126 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from database import get_db_manager
+
+# 분석 결과 파일 종류 (analysis_files.file_type) - 업로드 이미지는 "image:<uploaded_images.id>",
+# 이미지 축소본은 "<축소본 이름>:<uploaded_images.id>" (예: "thumb:...", image_pipeline.RENDITIONS)
+RESULT_FILE_TYPES = ("full_report", "risk_analysis", "sgr_checklist", "recommendations")
+IMAGE_FILE_TYPE_PREFIX = "image:"
+
+
+def image_file_type(image_id: str) -> str:
+    return f"{IMAGE_FILE_TYPE_PREFIX}{image_id}"
+
+
+def rendition_file_type(image_id: str, rendition: str) -> str:
+    return f"{rendition}:{image_id}"
+
+
+def sha256_hex(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class Artifact(NamedTuple):
+    """저장된 파일 한 개 (analysis_files 한 행)"""
+    session_id: str
+    user_id: str
+    file_type: str
+    path: Path
+    size: int
+    sha256: Optional[str]
+    mime_type: Optional[str]
+    # 저장 계층 - "archived"면 path는 일별 아카이브이고 (archive_offset, archive_length)가 압축 프레임 위치
+    tier: str = "hot"
+    archive_offset: Optional[int] = None
+    archive_length: Optional[int] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Artifact":
+        return cls(str(row["session_id"]), str(row["user_id"]), row["file_type"], Path(row["file_path"]),
+                   row.get("file_size") or 0, row.get("sha256"), row.get("mime_type"),
+                   row.get("storage_tier") or "hot", row.get("archive_offset"), row.get("archive_length"))
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "file_type": self.file_type,
+            "file_path": str(self.path),
+            "file_size": self.size,
+            "sha256": self.sha256,
+            "mime_type": self.mime_type,
+            "storage_tier": self.tier,
+            "archive_offset": self.archive_offset,
+            "archive_length": self.archive_length,
+        }
+
+
+class ArtifactManifest:
+    """세션 → 파일 종류 → Artifact 매니페스트
+
+    analysis_files 테이블이 원본이고, 프로세스 안에는 최근 조회한 세션의 매니페스트를 LRU로 둔다.
+    세션당 DB 조회는 ttl초에 한 번이며 그 사이 조회는 dict 두 번으로 끝난다 (파일시스템을 뒤지거나 디렉터리를 만들지 않음).
+
+    LRU는 이 프로세스 안에서만 일관된다 - 같은 인스턴스의 기록/삭제/계층화는 record()/forget()으로 바로 반영되지만,
+    다른 인스턴스가 바꾼 행은 항목이 ttl을 넘겨 DB에서 다시 읽을 때까지 보이지 않는다.
+    그 사이 옛 위치를 읽다가 파일이 없으면 다운로드 응답이 forget()을 불러 다음 조회에서 다시 읽게 한다.
+    """
+
+    def __init__(self, max_sessions: int, ttl: float = 60):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # 세션 → (DB에서 읽은 시각(monotonic), 파일 종류 → Artifact)
+        self._sessions: "OrderedDict[str, Tuple[float, Dict[str, Artifact]]]" = OrderedDict()
+
+    async def record(self, artifacts: List[Artifact]):
+        """저장한 파일들을 DB와 메모리 매니페스트에 기록 (한 번의 일괄 upsert)"""
+        if not artifacts:
+            return
+        await get_db_manager().save_artifacts([artifact.to_row() for artifact in artifacts])
+        # 메모리에 있는 세션만 갱신 - 없는 세션을 일부 파일로 채우면 DB의 나머지 행이 가려진다
+        for artifact in artifacts:
+            entry = self._sessions.get(artifact.session_id)
+            if entry is not None:
+                entry[1][artifact.file_type] = artifact
+
+    async def session_files(self, session_id: str) -> Dict[str, Artifact]:
+        entry = self._sessions.get(session_id)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+        rows = await get_db_manager().get_session_artifacts(session_id)
+        files = {row["file_type"]: Artifact.from_row(row) for row in rows}
+        if files:
+            self._remember(session_id, files)
+        else:
+            self._sessions.pop(session_id, None)
+        return files
+
+    async def lookup(self, session_id: str, file_type: str) -> Optional[Artifact]:
+        return (await self.session_files(session_id)).get(file_type)
+
+    def forget(self, session_id: str):
+        """세션 파일이 삭제/이동되었을 때 메모리 매니페스트에서 제거"""
+        self._sessions.pop(session_id, None)
+
+    def _remember(self, session_id: str, files: Dict[str, Artifact]):
+        self._sessions[session_id] = (time.monotonic(), files)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+# 전역 아티팩트 매니페스트
+artifact_manifest = None
+
+def get_artifact_manifest() -> ArtifactManifest:
+    global artifact_manifest
+    if artifact_manifest is None:
+        artifact_manifest = ArtifactManifest(int(os.getenv("ARTIFACT_MANIFEST_MAX_SESSIONS", "10000")),
+                                             float(os.getenv("ARTIFACT_MANIFEST_TTL_SECONDS", "60")))
+    return artifact_manifest
@@ -8,6 +8,12 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from database import get_db_manager, DatabaseManager
+import time
+import logging
+import metrics
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
 # 보안 설정
 SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
@@ -26,9 +32,12 @@ class AuthManager:
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """비밀번호 검증"""
-        print(f"비밀번호 검증: '{plain_password}' vs '{hashed_password}'")
-        result = pwd_context.verify(plain_password, hashed_password)
-        print(f"비밀번호 검증 결과: {result}")
+        started = time.perf_counter()
+        with span("auth.verify_password"):
+            result = pwd_context.verify(plain_password, hashed_password)
+        elapsed = time.perf_counter() - started
+        metrics.password_verify_seconds.observe(elapsed)
+        logger.debug("비밀번호 검증", extra={"ok": result, "verify_ms": round(elapsed * 1000, 1)})
         return result
     
     def get_password_hash(self, password: str) -> str:
@@ -60,21 +69,22 @@ class AuthManager:
     
     async def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """사용자 인증"""
-        print(f"사용자 인증 시도: {username}")
-        
-        user = await self.db_manager.get_user_by_username(username)
-        print(f"데이터베이스에서 조회된 사용자: {user}")
-        
-        if not user:
-            print(f"사용자 '{username}'을 찾을 수 없습니다.")
-            return None
+        with span("auth.authenticate_user") as s:
+            user = await self.db_manager.get_user_by_username(username)
             
-        if not self.verify_password(password, user["password_hash"]):
-            print(f"사용자 '{username}'의 비밀번호가 일치하지 않습니다.")
-            return None
-            
-        print(f"사용자 '{username}' 인증 성공")
-        return user
+            if not user:
+                s.set_attribute("auth.result", "unknown_user")
+                logger.info("로그인 실패: 사용자 없음", extra={"username": username})
+                return None
+                
+            if not self.verify_password(password, user["password_hash"]):
+                s.set_attribute("auth.result", "bad_password")
+                logger.info("로그인 실패: 비밀번호 불일치", extra={"username": username})
+                return None
+                
+            s.set_attribute("auth.result", "ok")
+            logger.info("로그인 성공", extra={"username": username, "user_id": user["id"]})
+            return user
     
     async def register_user(self, username: str, email: str, password: str, 
                           full_name: str = None, organization: str = None) -> Dict[str, Any]:
@@ -115,22 +125,23 @@ def get_auth_manager() -> AuthManager:
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
     """현재 로그인한 사용자 정보 가져오기"""
     auth_mgr = get_auth_manager()
-    token_data = auth_mgr.verify_token(credentials.credentials)
-    
-    if token_data is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="유효하지 않은 인증 정보입니다.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = await auth_mgr.db_manager.get_user_by_username(token_data["username"])
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="사용자를 찾을 수 없습니다.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    with span("auth.current_user"):
+        token_data = auth_mgr.verify_token(credentials.credentials)
+        
+        if token_data is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="유효하지 않은 인증 정보입니다.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        user = await auth_mgr.db_manager.get_user_by_username(token_data["username"])
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="사용자를 찾을 수 없습니다.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
     
     return user
 
@@ -143,6 +154,20 @@ async def get_current_active_user(current_user: Dict[str, Any] = Depends(get_cur
         )
     return current_user
 
+def is_admin(user: Dict[str, Any]) -> bool:
+    """role이 admin이거나 ADMIN_USERNAMES(쉼표 구분)에 포함된 사용자"""
+    admin_usernames = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+    return user.get("role") == "admin" or user["username"] in admin_usernames
+
+async def get_current_admin_user(current_user: Dict[str, Any] = Depends(get_current_active_user)) -> Dict[str, Any]:
+    """관리자 확인"""
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="관리자 권한이 필요합니다."
+        )
+    return current_user
+
 # 베타 테스터용 기본 사용자 생성 함수
 async def create_beta_testers():
     """베타 테스터 기본 계정 생성"""
@@ -177,11 +202,11 @@ async def create_beta_testers():
         try:
             user = await auth_mgr.register_user(**tester)
             created_users.append(user)
-            print(f"베타 테스터 생성됨: {tester['username']}")
+            logger.info("베타 테스터 생성됨", extra={"username": tester["username"]})
         except HTTPException as e:
             if "이미 존재하는 사용자명" in str(e.detail):
-                print(f"베타 테스터 이미 존재: {tester['username']}")
+                logger.info("베타 테스터 이미 존재", extra={"username": tester["username"]})
             else:
-                print(f"베타 테스터 생성 실패: {tester['username']} - {e.detail}")
+                logger.warning("베타 테스터 생성 실패", extra={"username": tester["username"], "detail": e.detail})
     
     return created_users
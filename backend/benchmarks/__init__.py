@@ -0,0 +1,4 @@
+"""
+성능 벤치마크 스크립트 모음
+backend 디렉토리에서 `python -m benchmarks.<모듈명>` 형태로 실행한다.
+"""
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+이미지 전처리 파이프라인 벤치마크
+시작할 때 결정적인 합성 현장 사진 코퍼스(12MP/48MP JPEG, HEIC 변환 PNG, RGBA 스크린샷)를 만들고
+현재 경로(image_pipeline.prepare_image → main.encode_image_to_base64)와 대안 전략의 단계별 시간,
+코어당 처리량(장/초), 최대 RSS를 측정한다. 전략마다 새 프로세스에서 실행해 RSS가 섞이지 않게 한다.
+
+실행: python -m benchmarks.bench_images [--inputs 12mp_jpeg,rgba_screenshot] [--iterations 3] [--json 결과.json]
+"""
+
+import argparse
+import base64
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from PIL import Image, ImageFile
+
+from image_pipeline import MAX_IMAGE_SIZE as MAX_SIZE
+
+# 입력 종류: (가로, 세로, 모드, 저장 형식)
+INPUTS = {
+    "12mp_jpeg": (4032, 3024, "RGB", "JPEG"),
+    "48mp_jpeg": (8064, 6048, "RGB", "JPEG"),
+    "heic_converted_png": (4032, 3024, "RGB", "PNG"),
+    "rgba_screenshot": (1170, 2532, "RGBA", "PNG"),
+}
+
+
+def make_input(name: str, seed: int = 0) -> bytes:
+    """저해상도 노이즈를 확대한 합성 사진 - 같은 이름/시드면 항상 같은 바이트"""
+    width, height, mode, fmt = INPUTS[name]
+    rng = random.Random(f"{name}:{seed}")
+    channels = len(mode)
+    small_size = (max(1, width // 32), max(1, height // 32))
+    noise = bytes(rng.getrandbits(8) for _ in range(small_size[0] * small_size[1] * channels))
+    image = Image.frombytes(mode, small_size, noise).resize((width, height), Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        image.save(buffer, format="JPEG", quality=92)
+    else:
+        image.save(buffer, format="PNG", compress_level=6)
+    return buffer.getvalue()
+
+
+def _target_size(size) -> tuple:
+    ratio = MAX_SIZE / max(size)
+    return tuple(int(dim * ratio) for dim in size)
+
+
+def _encode_base64(image: Image.Image) -> str:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# 전략: 각 함수는 단계별 소요 시간(초)을 기록하며 base64 문자열을 반환한다
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def _timed(owner, attribute: str, timings: Dict[str, float], stage: str):
+    """owner.attribute 호출에 걸린 시간을 timings[stage]에 더한다 (블록을 벗어나면 원래 함수로 복구)"""
+    original = getattr(owner, attribute)
+
+    def wrapper(*args, **kwargs):
+        t = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            timings[stage] += time.perf_counter() - t
+
+    setattr(owner, attribute, wrapper)
+    try:
+        yield
+    finally:
+        setattr(owner, attribute, original)
+
+
+def strategy_current(path: str, timings: Dict[str, float]) -> str:
+    """현재 /analyze 경로 그대로 - image_pipeline.prepare_image와 main.encode_image_to_base64를 호출해 잰다
+
+    prepare_image 안의 Image.open과 픽셀 디코딩(ImageFile.load)은 감싸서 따로 재고, 나머지를 resize로 본다.
+    """
+    from image_pipeline import prepare_image
+    from main import encode_image_to_base64
+
+    probes = {"open": 0.0, "decode": 0.0}
+    t = time.perf_counter()
+    with _timed(Image, "open", probes, "open"), _timed(ImageFile.ImageFile, "load", probes, "decode"):
+        image = prepare_image(path)
+    prepare_seconds = time.perf_counter() - t
+    timings["open"] += probes["open"]
+    timings["decode"] += probes["decode"]
+    timings["resize"] += prepare_seconds - probes["open"] - probes["decode"]
+
+    t = time.perf_counter()
+    encoded = encode_image_to_base64(image)
+    timings["encode"] += time.perf_counter() - t
+    return encoded
+
+
+def _strategy(decode_draft: bool, resample, reducing_gap=None, convert_rgb=True) -> Callable:
+    def run(path: str, timings: Dict[str, float]) -> str:
+        t = time.perf_counter()
+        image = Image.open(path)
+        if decode_draft and image.format == "JPEG":
+            # JPEG DCT 단계에서 1/2~1/8로 줄여 디코딩 (목표 크기 이상은 유지)
+            image.draft("RGB", (MAX_SIZE, MAX_SIZE))
+        timings["open"] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        image.load()
+        timings["decode"] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        if convert_rgb and image.mode != "RGB":
+            image = image.convert("RGB")
+        if max(image.size) > MAX_SIZE:
+            image = image.resize(_target_size(image.size), resample, reducing_gap=reducing_gap)
+        timings["resize"] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        encoded = _encode_base64(image)
+        timings["encode"] += time.perf_counter() - t
+        return encoded
+    return run
+
+
+STRATEGIES = {
+    "current": strategy_current,
+    "rgb_lanczos": _strategy(False, Image.Resampling.LANCZOS),
+    "draft_lanczos": _strategy(True, Image.Resampling.LANCZOS),
+    "reducing_gap_lanczos": _strategy(False, Image.Resampling.LANCZOS, reducing_gap=3.0),
+    "draft_reducing_gap": _strategy(True, Image.Resampling.LANCZOS, reducing_gap=2.0),
+    "bicubic": _strategy(False, Image.Resampling.BICUBIC),
+}
+
+
+def _peak_rss_mib() -> float:
+    # Linux는 KiB, macOS는 바이트 단위
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_strategy(strategy_name: str, files: Dict[str, str], iterations: int) -> Dict:
+    """자식 프로세스에서 실행 - 입력별 단계 시간, 처리량, 최대 RSS"""
+    os.environ.setdefault("MODEL_BACKEND", "stub")
+    strategy = STRATEGIES[strategy_name]
+    result = {"strategy": strategy_name, "inputs": {}}
+    if strategy_name == "current":
+        import main  # noqa: F401 - 모듈 임포트 메모리를 기준선에 포함
+    baseline_rss = _peak_rss_mib()
+    for input_name, path in files.items():
+        timings = {"open": 0.0, "decode": 0.0, "resize": 0.0, "encode": 0.0}
+        try:
+            strategy(path, dict(timings))  # 워밍업
+            started = time.perf_counter()
+            for _ in range(iterations):
+                encoded = strategy(path, timings)
+            elapsed = time.perf_counter() - started
+            result["inputs"][input_name] = {
+                "stage_ms": {stage: round(value / iterations * 1000, 2) for stage, value in timings.items()},
+                "total_ms": round(elapsed / iterations * 1000, 2),
+                "images_per_sec_per_core": round(iterations / elapsed, 2),
+                "payload_kib": round(len(encoded) / 1024, 1),
+            }
+        except Exception as e:
+            result["inputs"][input_name] = {"error": f"{type(e).__name__}: {e}"}
+    result["peak_rss_mib"] = _peak_rss_mib()
+    result["import_rss_mib"] = baseline_rss
+    return result
+
+
+def print_results(results: List[Dict]):
+    print(f"\n{'전략':<22}{'입력':<20}{'open':>8}{'decode':>9}{'resize':>9}{'encode':>9}"
+          f"{'합계(ms)':>10}{'장/초/코어':>12}{'KiB':>8}")
+    print("-" * 110)
+    for result in results:
+        for input_name, row in result["inputs"].items():
+            if "error" in row:
+                print(f"{result['strategy']:<22}{input_name:<20}  ❌ {row['error']}")
+                continue
+            stage = row["stage_ms"]
+            print(f"{result['strategy']:<22}{input_name:<20}{stage['open']:>8}{stage['decode']:>9}"
+                  f"{stage['resize']:>9}{stage['encode']:>9}{row['total_ms']:>10}"
+                  f"{row['images_per_sec_per_core']:>12}{row['payload_kib']:>8}")
+        print(f"{'':<22}최대 RSS: {result['peak_rss_mib']} MiB (측정 전 {result['import_rss_mib']} MiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이미지 전처리 파이프라인 벤치마크")
+    parser.add_argument("--inputs", default=",".join(INPUTS), help=f"측정할 입력 종류 ({', '.join(INPUTS)})")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES), help=f"측정할 전략 ({', '.join(STRATEGIES)})")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    input_names = [name for name in args.inputs.split(",") if name]
+    strategy_names = [name for name in args.strategies.split(",") if name]
+
+    with tempfile.TemporaryDirectory(prefix="bench_images_") as workdir:
+        print("🖼️ 합성 코퍼스 생성 중...")
+        files = {}
+        for name in input_names:
+            data = make_input(name)
+            path = Path(workdir) / f"{name}.{INPUTS[name][3].lower()}"
+            path.write_bytes(data)
+            files[name] = str(path)
+            print(f"  • {name}: {INPUTS[name][0]}x{INPUTS[name][1]} {INPUTS[name][2]}, {len(data) / 1024 / 1024:.1f} MiB")
+
+        results = []
+        context = multiprocessing.get_context("spawn")
+        for strategy_name in strategy_names:
+            with context.Pool(1) as pool:
+                results.append(pool.apply(run_strategy, (strategy_name, files, args.iterations)))
+            print(f"✅ {strategy_name} 측정 완료")
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "cpu_count": os.cpu_count(), "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n💾 결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+보고서 파싱/HTML 변환 마이크로벤치마크
+parse_analysis_sections, _extract_first_markdown_table_block, _split_md_row, markdown_table_to_inner_html을
+버전이 고정된 보고서 코퍼스(실제 형식 + 합성: 소형, 일반, 200행 표, 표 없음, 섹션 혼합)로 측정한다.
+호출당 시간과 tracemalloc 기준 최대 할당량을 기록하며, 대체 구현(--candidate)은
+모든 코퍼스 문서에서 결과가 기존 구현과 같아야(정합성) 속도 비교 결과가 출력된다.
+
+실행:
+  python -m benchmarks.bench_parsing --save parsing_baseline.json
+  python -m benchmarks.bench_parsing --candidate my_parser --compare parsing_baseline.json
+  python -m benchmarks.bench_parsing --regenerate-corpus   # 합성 문서 재생성 (코퍼스 버전 변경 시에만)
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import random
+import statistics
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import main as baseline
+
+CORPUS_VERSION = 1
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus" / "reports"
+MANIFEST_PATH = CORPUS_DIR / "MANIFEST.json"
+FUNCTIONS = (
+    "parse_analysis_sections",
+    "_extract_first_markdown_table_block",
+    "_split_md_row",
+    "markdown_table_to_inner_html",
+)
+
+
+# ---------------------------------------------------------------------------
+# 합성 코퍼스 생성 (결정적 - 같은 버전이면 항상 같은 바이트)
+# ---------------------------------------------------------------------------
+
+def _hazard_table(rng: random.Random, rows: int) -> List[str]:
+    words = ["추락", "낙하", "감전", "협착", "충돌", "화재", "질식", "전도", "붕괴", "베임"]
+    lines = [
+        "| 번호 | 잠재 위험요인 | 잠재 위험요인 설명 | 위험성 감소대책 |",
+        "|------|---------------|--------------------|-----------------|",
+    ]
+    for i in range(1, rows + 1):
+        word = rng.choice(words)
+        description = " ".join(rng.choice(words) + "위험" for _ in range(rng.randint(5, 15)))
+        lines.append(f"| {i} | {word} | {description} | ① 점검 ② 교육 ③ 방호 ④ 감독 |")
+    return lines
+
+
+def _checklist_table(rng: random.Random, rows: int) -> List[str]:
+    lines = [
+        "| 항목 | 준수여부 | 세부 내용 |",
+        "|----------------|----------|-------------------|",
+    ]
+    for i in range(1, rows + 1):
+        lines.append(f"| {i}. 체크리스트 항목 {i} | {rng.choice(['O', 'X', '해당없음', '알수없음'])} | 사진 확인 결과 {i} |")
+    return lines
+
+
+def generate_synthetic_corpus() -> Dict[str, str]:
+    rng = random.Random(CORPUS_VERSION)
+    docs = {}
+
+    docs["synthetic_small.md"] = "\n".join(
+        ["### 1. 현장 전체 잠재 위험요인 분석 및 위험성 감소대책"] + _hazard_table(rng, 1)
+        + ["", "### 2. SGR 체크리스트 항목별 통합 체크 결과"] + _checklist_table(rng, 3)
+        + ["", "### 3. 현장 전체 통합 추가 권장사항", "- 안전난간 설치"]
+    )
+
+    docs["synthetic_typical.md"] = "\n".join(
+        ["### 1. 현장 전체 잠재 위험요인 분석 및 위험성 감소대책"] + _hazard_table(rng, 6)
+        + ["", "### 2. SGR 체크리스트 항목별 통합 체크 결과"] + _checklist_table(rng, 16)
+        + ["", "### 3. 현장 전체 통합 추가 권장사항"]
+        + [f"- 권장사항 {i}: 작업 전 점검과 교육을 강화할 것" for i in range(1, 8)]
+    )
+
+    docs["synthetic_table_200rows.md"] = "\n".join(
+        ["### 1. 현장 전체 잠재 위험요인 분석 및 위험성 감소대책"] + _hazard_table(rng, 200)
+        + ["", "### 2. SGR 체크리스트 항목별 통합 체크 결과"] + _checklist_table(rng, 200)
+        + ["", "### 3. 현장 전체 통합 추가 권장사항", "- 표가 매우 긴 병적 입력"]
+    )
+
+    docs["synthetic_no_tables.md"] = "\n".join(
+        ["### 1. 현장 전체 잠재 위험요인 분석", "사진이 흐려 위험요인을 표로 정리할 수 없습니다."]
+        + [f"문단 {i}: 현장 전반의 정리정돈 상태가 양호하지 않습니다." for i in range(1, 40)]
+        + ["### 3. 추가 권장사항", "- 사진을 다시 촬영해 주십시오."]
+    )
+
+    mixed = []
+    for block in range(5):
+        mixed += [f"#### 위험요인 요약 {block}", "위험요인 설명 문단 <b>강조</b> & 특수문자"]
+        mixed += _hazard_table(rng, 5)
+        mixed += ["", f"#### SGR 체크리스트 부분 {block}", "| 항목 | 준수여부 |", "| --- | :---: |"]
+        mixed += [f"| 항목 {i} | {rng.choice(['O', 'X'])} | 추가 셀 | 불규칙 행 |" for i in range(5)]
+        mixed += ["", "권장사항 중간 삽입", "| 잘못된 | 표 |", "본문 줄", ""]
+    docs["synthetic_mixed_sections.md"] = "\n".join(mixed)
+    return docs
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def regenerate_corpus():
+    """합성 문서를 다시 쓰고 전체 코퍼스의 해시를 매니페스트에 기록"""
+    for name, text in generate_synthetic_corpus().items():
+        (CORPUS_DIR / name).write_text(text + "\n", encoding="utf-8")
+    files = {}
+    for path in sorted(CORPUS_DIR.glob("*.md")):
+        text = path.read_text(encoding="utf-8")
+        files[path.name] = {
+            "kind": "synthetic" if path.name.startswith("synthetic_") else "real",
+            "sha256": _sha256(text),
+            "bytes": len(text.encode("utf-8")),
+        }
+    MANIFEST_PATH.write_text(json.dumps({"version": CORPUS_VERSION, "files": files},
+                                        ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"📚 코퍼스 v{CORPUS_VERSION} 재생성: {len(files)}개 문서")
+
+
+def load_corpus() -> Dict[str, str]:
+    """매니페스트 해시를 검증하며 코퍼스 로드 - 문서가 바뀌었으면 결과 비교가 무의미하므로 중단"""
+    manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    if manifest["version"] != CORPUS_VERSION:
+        sys.exit(f"❌ 코퍼스 버전 불일치: 매니페스트 v{manifest['version']}, 벤치마크 v{CORPUS_VERSION}")
+    corpus = {}
+    for name, meta in manifest["files"].items():
+        text = (CORPUS_DIR / name).read_text(encoding="utf-8")
+        if _sha256(text) != meta["sha256"]:
+            sys.exit(f"❌ 코퍼스 문서가 변경되었습니다: {name} (--regenerate-corpus 후 버전을 올리세요)")
+        corpus[name] = text
+    return corpus
+
+
+# ---------------------------------------------------------------------------
+# 측정
+# ---------------------------------------------------------------------------
+
+def _workloads(module, text: str) -> Dict[str, Callable[[], Any]]:
+    """함수별로 실제 호출 패턴에 맞춘 입력을 만든다 (_split_md_row는 표의 모든 행)"""
+    rows = baseline._extract_first_markdown_table_block(text) or [
+        line for line in text.split("\n") if line.strip().startswith("|")
+    ]
+    workloads = {}
+    if hasattr(module, "parse_analysis_sections"):
+        workloads["parse_analysis_sections"] = lambda: module.parse_analysis_sections(text)
+    if hasattr(module, "_extract_first_markdown_table_block"):
+        workloads["_extract_first_markdown_table_block"] = lambda: module._extract_first_markdown_table_block(text)
+    if hasattr(module, "_split_md_row"):
+        workloads["_split_md_row"] = lambda: [module._split_md_row(row) for row in rows]
+    if hasattr(module, "markdown_table_to_inner_html"):
+        workloads["markdown_table_to_inner_html"] = lambda: module.markdown_table_to_inner_html(text)
+    if all(hasattr(module, name) for name in ("parse_analysis_sections", "markdown_table_to_inner_html")):
+        def pipeline():
+            sections = module.parse_analysis_sections(text)
+            return (module.markdown_table_to_inner_html(sections.get("risk_analysis", "")),
+                    module.markdown_table_to_inner_html(sections.get("sgr_checklist", "")))
+        workloads["pipeline"] = pipeline
+    return workloads
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    samples = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 2),
+        "min_us": round(min(samples) * 1e6, 2),
+        "peak_alloc_kib": round((peak - before) / 1024, 2),
+    }
+
+
+def check_parity(candidate, corpus: Dict[str, str]) -> List[str]:
+    """후보 구현의 출력이 모든 문서에서 기존 구현과 같은지 확인 - 불일치 목록 반환"""
+    mismatches = []
+    for name, text in corpus.items():
+        expected = _workloads(baseline, text)
+        actual = _workloads(candidate, text)
+        for function, fn in actual.items():
+            if fn() != expected[function]():
+                mismatches.append(f"{name}: {function}")
+    return mismatches
+
+
+def run(module, corpus: Dict[str, str], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for name, text in corpus.items():
+        results[name] = {function: measure(fn, repeat) for function, fn in _workloads(module, text).items()}
+    return results
+
+
+def print_results(title: str, results, reference=None):
+    print(f"\n📊 {title}")
+    print("-" * 100)
+    header = f"{'문서':<30}{'함수':<38}{'중앙값(µs)':>12}{'최대할당(KiB)':>14}"
+    if reference:
+        header += f"{'대비':>8}"
+    print(header)
+    for doc, functions in results.items():
+        for function, row in functions.items():
+            line = f"{doc:<30}{function:<38}{row['median_us']:>12}{row['peak_alloc_kib']:>14}"
+            base = (reference or {}).get(doc, {}).get(function)
+            if base:
+                line += f"{base['median_us'] / row['median_us']:>7.2f}x"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="보고서 파싱/HTML 변환 마이크로벤치마크")
+    parser.add_argument("--candidate", help="같은 함수 이름을 제공하는 대체 구현 모듈 (예: report_parser_v2)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="이전에 저장한 결과 JSON과 비교")
+    parser.add_argument("--regenerate-corpus", action="store_true")
+    args = parser.parse_args()
+
+    if args.regenerate_corpus:
+        regenerate_corpus()
+        return
+
+    corpus = load_corpus()
+    print(f"📚 코퍼스 v{CORPUS_VERSION}: {len(corpus)}개 문서")
+    baseline_results = run(baseline, corpus, args.repeat)
+    reference = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            reference = json.load(f)["results"]["baseline"]
+    print_results("기존 구현 (main.py)", baseline_results, reference)
+    output = {"corpus_version": CORPUS_VERSION, "results": {"baseline": baseline_results}}
+
+    if args.candidate:
+        candidate = importlib.import_module(args.candidate)
+        mismatches = check_parity(candidate, corpus)
+        if mismatches:
+            print(f"\n❌ 정합성 실패 ({len(mismatches)}건) - 속도 비교를 생략합니다:")
+            for item in mismatches:
+                print(f"  • {item}")
+            sys.exit(1)
+        print("\n✅ 정합성 확인: 모든 코퍼스 문서에서 출력이 동일합니다.")
+        candidate_results = run(candidate, corpus, args.repeat)
+        print_results(f"후보 구현 ({args.candidate}) - 기존 대비 속도", candidate_results, baseline_results)
+        output["results"]["candidate"] = candidate_results
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 결과 저장: {args.save}")
+
+
+if __name__ == "__main__":
+    main()
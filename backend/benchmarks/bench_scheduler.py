@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+분석 스케줄러 혼합 워크로드 벤치마크
+한 조직이 수백 건을 일괄 제출하는 동안 실시간 점검(interactive) 요청이 얼마나 기다리는지
+FIFO 단일 큐(기존 동작)와 레인 + 공정 큐잉 스케줄러를 비교한다.
+
+--real을 주면 작업마다 실제 전처리(image_pipeline.prepare_image, 합성 12MP JPEG)를 한 뒤 모델 응답 시간만큼 기다리고,
+전처리를 이벤트 루프에서 직접 하는 경우와 스케줄러 전처리 스레드 풀(run_in_executor)에서 하는 경우의
+대기 시간, 요청 지연, 이벤트 루프 지연을 비교한다.
+
+실행: python -m benchmarks.bench_scheduler [--bulk-jobs 200] [--json 결과.json]
+      python -m benchmarks.bench_scheduler --real --bulk-jobs 20 --interactive-rate 4 --service-ms 800
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List
+
+from scheduler import FairScheduler, INTERACTIVE, BULK
+from image_pipeline import prepare_image
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+Work = Callable[[FairScheduler, float], Awaitable[None]]
+
+
+async def simulated_work(scheduler: FairScheduler, service: float):
+    await asyncio.sleep(service)
+
+
+def real_work(photo: bytes, in_executor: bool) -> Work:
+    """실제 전처리 후 모델 응답(service초)을 기다리는 작업 - in_executor=False면 전처리가 이벤트 루프를 막는다"""
+    async def work(scheduler: FairScheduler, service: float):
+        if in_executor:
+            await scheduler.run_in_executor(prepare_image, io.BytesIO(photo))
+        else:
+            prepare_image(io.BytesIO(photo))
+        await asyncio.sleep(service)
+    return work
+
+
+async def measure_loop_lag(lags: List[float], interval: float = 0.01):
+    """interval마다 깨어나며 예정보다 늦은 시간을 기록 (다른 작업이 이벤트 루프를 막은 시간)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_scenario(name: str, scheduler: FairScheduler, args, fifo: bool,
+                       work: Work = simulated_work) -> Dict:
+    """워크로드 재생 - fifo=True면 모든 작업을 한 레인, 한 고객으로 취급한다"""
+    rng = random.Random(args.seed)
+    waits: Dict[str, List[float]] = defaultdict(list)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    tenant_waits: Dict[str, List[float]] = defaultdict(list)
+    lags: List[float] = []
+    lag_probe = asyncio.ensure_future(measure_loop_lag(lags))
+
+    async def job(lane: str, tenant: str):
+        service = rng.lognormvariate(0, 0.5) * args.service_ms / 1000
+        lane_name = INTERACTIVE if fifo else lane
+        tenant_name = "all" if fifo else tenant
+        submitted = time.monotonic()
+        async with scheduler.slot(lane_name, tenant_name) as waited:
+            waits[lane].append(waited)
+            tenant_waits[f"{lane}:{tenant}"].append(waited)
+            await work(scheduler, service)
+        latencies[lane].append(time.monotonic() - submitted)
+
+    tasks = []
+    # 조직 A가 일괄 백로그를 한 번에 제출
+    for _ in range(args.bulk_jobs):
+        tasks.append(asyncio.ensure_future(job(BULK, "건설회사 A")))
+    # 조직 C가 조금 뒤 소량의 일괄 작업 제출
+    await asyncio.sleep(args.service_ms / 1000)
+    for _ in range(args.bulk_jobs // 10):
+        tasks.append(asyncio.ensure_future(job(BULK, "건설회사 C")))
+
+    # 여러 조직의 실시간 점검 요청이 포아송 과정으로 도착
+    # 도착 시각을 미리 정해 두어 이벤트 루프가 막혀도 시나리오마다 같은 수의 요청이 들어온다
+    orgs = ["안전관리업체 B", "건설회사 C", "건설회사 D", "건설회사 E"]
+    arrivals = []
+    offset = 0.0
+    while offset < args.duration:
+        arrivals.append((offset, rng.choice(orgs)))
+        offset += rng.expovariate(args.interactive_rate)
+    started = time.monotonic()
+    for offset, org in arrivals:
+        await asyncio.sleep(max(0.0, started + offset - time.monotonic()))
+        tasks.append(asyncio.ensure_future(job(INTERACTIVE, org)))
+
+    await asyncio.gather(*tasks)
+    lag_probe.cancel()
+    scheduler.close()
+
+    summary = {"scenario": name, "lanes": {}, "tenants": {},
+               "loop_lag_ms_p95": round(percentile(lags, 0.95) * 1000, 1),
+               "loop_lag_ms_max": round(max(lags, default=0.0) * 1000, 1)}
+    for lane, values in waits.items():
+        summary["lanes"][lane] = {
+            "jobs": len(values),
+            "wait_ms_p50": round(percentile(values, 0.5) * 1000, 1),
+            "wait_ms_p95": round(percentile(values, 0.95) * 1000, 1),
+            "wait_ms_max": round(max(values) * 1000, 1),
+            "latency_ms_p95": round(percentile(latencies[lane], 0.95) * 1000, 1),
+        }
+    for key, values in tenant_waits.items():
+        summary["tenants"][key] = {
+            "jobs": len(values),
+            "wait_ms_p95": round(percentile(values, 0.95) * 1000, 1),
+        }
+    return summary
+
+
+def print_summary(summary: Dict):
+    print(f"\n📊 {summary['scenario']}")
+    print("-" * 60)
+    print(f"{'레인':<14}{'작업 수':>8}{'p50(ms)':>12}{'p95(ms)':>12}{'max(ms)':>12}{'지연 p95(ms)':>14}")
+    for lane, row in sorted(summary["lanes"].items()):
+        print(f"{lane:<14}{row['jobs']:>8}{row['wait_ms_p50']:>12}{row['wait_ms_p95']:>12}{row['wait_ms_max']:>12}"
+              f"{row['latency_ms_p95']:>14}")
+    print(f"  이벤트 루프 지연: p95 {summary['loop_lag_ms_p95']}ms, max {summary['loop_lag_ms_max']}ms")
+    for key, row in sorted(summary["tenants"].items()):
+        print(f"  • {key}: {row['jobs']}건, p95 {row['wait_ms_p95']}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="분석 스케줄러 혼합 워크로드 벤치마크")
+    parser.add_argument("--bulk-jobs", type=int, default=200, help="조직 A의 일괄 작업 수")
+    parser.add_argument("--interactive-rate", type=float, default=20.0, help="초당 실시간 요청 도착률")
+    parser.add_argument("--duration", type=float, default=3.0, help="실시간 요청 발생 시간(초)")
+    parser.add_argument("--service-ms", type=float, default=40.0, help="작업당 평균 처리시간(ms, 실제 분석 시간의 축소판)")
+    parser.add_argument("--interactive-concurrency", type=int, default=4)
+    parser.add_argument("--bulk-concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--real", action="store_true",
+                        help="실제 전처리(합성 12MP JPEG) + 모델 대기(--service-ms)로 이벤트 루프/스레드 풀 전처리 비교")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    total = args.interactive_concurrency + args.bulk_concurrency
+    lanes = {INTERACTIVE: args.interactive_concurrency, BULK: args.bulk_concurrency}
+    if args.real:
+        from benchmarks.bench_images import make_input
+        photo = make_input("12mp_jpeg")
+        results = [
+            await run_scenario("레인 + 공정 큐잉, 전처리를 이벤트 루프에서 (기존 동작)",
+                               FairScheduler(lanes), args, fifo=False, work=real_work(photo, in_executor=False)),
+            await run_scenario("레인 + 공정 큐잉, 전처리 스레드 풀",
+                               FairScheduler(lanes), args, fifo=False, work=real_work(photo, in_executor=True)),
+        ]
+    else:
+        results = [
+            await run_scenario("FIFO 단일 큐 (기존 동작)",
+                               FairScheduler({INTERACTIVE: total}), args, fifo=True),
+            await run_scenario("레인 + 조직별 공정 큐잉",
+                               FairScheduler(lanes), args, fifo=False),
+        ]
+    for summary in results:
+        print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+FastAPI 앱 종단 간 부하 테스트
+가상 사용자 N명을 등록/로그인시킨 뒤 동시 실행 수를 단계적으로 올리며
+/analyze, /auth/login, /auth/sessions 요청을 보내고 엔드포인트별 처리량, p50/p95/p99 지연시간, 오류율을 측정한다.
+
+기본 동작은 스텁 모델 백엔드(MODEL_BACKEND=stub)와 메모리 DB(DATABASE_BACKEND=memory)로
+임시 디렉토리에서 uvicorn 서버를 띄워 측정한다. --url을 주면 이미 떠 있는 서버를 대상으로 한다.
+
+실행: python -m benchmarks.load_test --stages 1,2,4,8 --stage-duration 20 --out-dir load_results
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from PIL import Image
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ENDPOINTS = ("analyze", "login", "sessions")
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def make_site_photo(width: int, height: int, seed: int) -> bytes:
+    """휴대폰 사진 크기의 합성 JPEG (저해상도 노이즈를 확대해 실제 사진과 비슷한 압축률을 낸다)"""
+    rng = random.Random(seed)
+    small = Image.frombytes("RGB", (width // 16, height // 16),
+                            bytes(rng.getrandbits(8) for _ in range((width // 16) * (height // 16) * 3)))
+    image = small.resize((width, height), Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status_counts: Dict[int, int] = defaultdict(int)
+
+    def record(self, seconds: float, status: int):
+        self.status_counts[status] += 1
+        if 200 <= status < 300:
+            self.latencies.append(seconds)
+        else:
+            self.errors += 1
+
+    def summary(self, duration: float) -> Dict:
+        total = len(self.latencies) + self.errors
+
+        def ms(q: float) -> Optional[float]:
+            value = percentile(self.latencies, q)
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "requests": total,
+            "errors": self.errors,
+            "error_rate": round(self.errors / total, 4) if total else 0.0,
+            "throughput_rps": round(len(self.latencies) / duration, 2) if duration else 0.0,
+            "p50_ms": ms(0.5),
+            "p95_ms": ms(0.95),
+            "p99_ms": ms(0.99),
+            "status_counts": dict(self.status_counts),
+        }
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.base_url = args.url
+        self.server: Optional[subprocess.Popen] = None
+        self.users: List[Tuple[str, str]] = []
+        self.tokens: Dict[str, str] = {}
+        self.photos: List[bytes] = []
+        self.mix = self._parse_mix(args.mix)
+        self.loop_stats: Optional[Dict] = None
+        # 블로킹 스택(/admin/loop)을 읽을 관리자 토큰 - 직접 띄운 서버는 관리자 계정을 만들어 채운다
+        self.admin_token: Optional[str] = args.admin_token
+
+    @staticmethod
+    def _parse_mix(value: str) -> List[Tuple[str, float]]:
+        mix = []
+        for item in value.split(","):
+            name, _, weight = item.partition("=")
+            if name not in ENDPOINTS:
+                raise SystemExit(f"알 수 없는 엔드포인트: {name}")
+            mix.append((name, float(weight or 1)))
+        return mix
+
+    def start_server(self):
+        """스텁 백엔드로 임시 디렉토리에서 uvicorn 서버 실행"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        env = dict(os.environ)
+        env.update({
+            "MODEL_BACKEND": "stub",
+            "DATABASE_BACKEND": "memory",
+            "STUB_LATENCY": self.args.model_latency,
+            "SECRET_KEY": "load-test-secret",
+            "ADMIN_USERNAMES": self.admin_username,
+        })
+        self.workdir = tempfile.mkdtemp(prefix="load_test_")
+        self.server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(BACKEND_DIR),
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=self.workdir, env=env
+        )
+        self.base_url = f"http://127.0.0.1:{port}"
+        print(f"🚀 스텁 서버 시작: {self.base_url} (작업 디렉토리 {self.workdir})")
+
+    @property
+    def admin_username(self) -> str:
+        return f"{self.args.user_prefix}admin"
+
+    async def wait_ready(self, client: httpx.AsyncClient):
+        for _ in range(100):
+            try:
+                if (await client.get("/ping")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+        raise SystemExit("❌ 서버가 준비되지 않았습니다.")
+
+    async def setup_users(self, client: httpx.AsyncClient, count: int):
+        """가상 사용자 등록 및 로그인 (이미 있으면 로그인만)"""
+        run_id = datetime.now().strftime("%H%M%S")
+        for i in range(count):
+            username = f"{self.args.user_prefix}{run_id}_{i}"
+            password = "load-test-123!"
+            await client.post("/auth/register", data={
+                "username": username,
+                "email": f"{username}@example.com",
+                "password": password,
+                "full_name": f"부하 테스트 {i}",
+                "organization": f"조직 {i % self.args.organizations}",
+            })
+            response = await client.post("/auth/login", data={"username": username, "password": password})
+            response.raise_for_status()
+            self.users.append((username, password))
+            self.tokens[username] = response.json()["access_token"]
+        print(f"👥 가상 사용자 {count}명 로그인 완료")
+        if self.server and not self.admin_token:
+            password = "load-test-admin-123!"
+            await client.post("/auth/register", data={
+                "username": self.admin_username, "email": f"{self.admin_username}@example.com",
+                "password": password, "organization": "관리",
+            })
+            response = await client.post("/auth/login", data={"username": self.admin_username, "password": password})
+            if response.status_code == 200:
+                self.admin_token = response.json()["access_token"]
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, username: str, password: str,
+                      rng: random.Random) -> int:
+        headers = {"Authorization": f"Bearer {self.tokens[username]}"}
+        if endpoint == "login":
+            response = await client.post("/auth/login", data={"username": username, "password": password})
+        elif endpoint == "sessions":
+            response = await client.get("/auth/sessions", headers=headers)
+        else:
+            photo_count = rng.randint(self.args.min_photos, self.args.max_photos)
+            files = [
+                ("files", (f"site_{i}.jpg", rng.choice(self.photos), "image/jpeg"))
+                for i in range(photo_count)
+            ]
+            response = await client.post("/analyze", headers=headers, files=files,
+                                         data={"session_name": "부하 테스트"})
+        return response.status_code
+
+    async def run_stage(self, client: httpx.AsyncClient, concurrency: int) -> Dict:
+        stats = {name: EndpointStats() for name in ENDPOINTS}
+        deadline = time.monotonic() + self.args.stage_duration
+        names = [name for name, _ in self.mix]
+        weights = [weight for _, weight in self.mix]
+
+        async def virtual_user(index: int):
+            rng = random.Random(self.args.seed * 10000 + concurrency * 100 + index)
+            username, password = self.users[index % len(self.users)]
+            while time.monotonic() < deadline:
+                endpoint = rng.choices(names, weights)[0]
+                started = time.monotonic()
+                try:
+                    status = await self.request(client, endpoint, username, password, rng)
+                except httpx.HTTPError:
+                    status = 0
+                stats[endpoint].record(time.monotonic() - started, status)
+                if self.args.think_time:
+                    await asyncio.sleep(rng.expovariate(1 / self.args.think_time))
+
+        started = time.monotonic()
+        await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+        duration = time.monotonic() - started
+        return {
+            "concurrency": concurrency,
+            "duration_sec": round(duration, 2),
+            "endpoints": {name: stats[name].summary(duration) for name in ENDPOINTS if stats[name].status_counts},
+        }
+
+    async def fetch_loop_stats(self, client: httpx.AsyncClient) -> Optional[Dict]:
+        """서버의 이벤트 루프 지연 통계 (/system/loop가 없는 서버면 None) - 관리자 토큰이 있으면 블로킹 스택 포함"""
+        try:
+            if self.admin_token:
+                response = await client.get("/admin/loop", headers={"Authorization": f"Bearer {self.admin_token}"})
+            else:
+                response = await client.get("/system/loop")
+        except httpx.HTTPError:
+            return None
+        return response.json() if response.status_code == 200 else None
+
+    async def run(self) -> List[Dict]:
+        stages = [int(c) for c in self.args.stages.split(",")]
+        width, height = (int(v) for v in self.args.photo_size.split("x"))
+        print(f"🖼️ 합성 현장 사진 생성: {self.args.photo_variants}장 ({width}x{height})")
+        self.photos = [make_site_photo(width, height, seed) for seed in range(self.args.photo_variants)]
+
+        if not self.base_url:
+            self.start_server()
+        limits = httpx.Limits(max_connections=max(stages) * 2, max_keepalive_connections=max(stages) * 2)
+        results = []
+        try:
+            async with httpx.AsyncClient(base_url=self.base_url, timeout=self.args.timeout, limits=limits) as client:
+                await self.wait_ready(client)
+                await self.setup_users(client, max(stages))
+                for concurrency in stages:
+                    print(f"\n⏱️ 동시 사용자 {concurrency}명, {self.args.stage_duration}초")
+                    before = await self.fetch_loop_stats(client)
+                    stage = await self.run_stage(client, concurrency)
+                    after = await self.fetch_loop_stats(client)
+                    if before and after:
+                        # 단계 중 이벤트 루프를 임계값 이상 막은 횟수 (블로킹 회귀 확인용)
+                        stage["event_loop_blocked"] = after["blocked_total"] - before["blocked_total"]
+                    results.append(stage)
+                    print_stage(stage)
+                self.loop_stats = await self.fetch_loop_stats(client)
+                if self.loop_stats:
+                    print_loop_stats(self.loop_stats)
+        finally:
+            if self.server:
+                self.server.terminate()
+                self.server.wait(timeout=10)
+                shutil.rmtree(self.workdir, ignore_errors=True)
+        return results
+
+
+def print_stage(stage: Dict):
+    print(f"{'엔드포인트':<12}{'요청':>7}{'오류율':>9}{'RPS':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, row in stage["endpoints"].items():
+        print(f"{name:<12}{row['requests']:>7}{row['error_rate']:>9.1%}{row['throughput_rps']:>9}"
+              f"{str(row['p50_ms']):>10}{str(row['p95_ms']):>10}{str(row['p99_ms']):>10}")
+
+
+def print_loop_stats(stats: Dict):
+    print(f"\n🔁 이벤트 루프 지연: p50 {stats['lag_p50_ms']} ms, p99 {stats['lag_p99_ms']} ms, "
+          f"최대 {stats['lag_max_ms']} ms, 블로킹 {stats['blocked_total']}회")
+    sites: Dict[str, int] = defaultdict(int)
+    for report in stats.get("recent_blocks", []):
+        sites[report.get("call_site") or report.get("blocking_frame") or "알 수 없음"] += 1
+    for site, count in sorted(sites.items(), key=lambda item: -item[1])[:5]:
+        print(f"  • {site}: {count}회")
+
+
+def save_results(out_dir: Path, args, results: List[Dict], loop_stats: Optional[Dict] = None) -> Path:
+    """비교 가능한 기계 판독용 결과 저장 (run.json + summary.csv)"""
+    run_dir = out_dir / datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_dir.mkdir(parents=True, exist_ok=True)
+    with open(run_dir / "run.json", "w", encoding="utf-8") as f:
+        json.dump({"args": vars(args), "stages": results, "event_loop": loop_stats}, f, ensure_ascii=False, indent=2)
+    with open(run_dir / "summary.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["concurrency", "endpoint", "requests", "errors", "error_rate",
+                         "throughput_rps", "p50_ms", "p95_ms", "p99_ms"])
+        for stage in results:
+            for name, row in stage["endpoints"].items():
+                writer.writerow([stage["concurrency"], name, row["requests"], row["errors"], row["error_rate"],
+                                 row["throughput_rps"], row["p50_ms"], row["p95_ms"], row["p99_ms"]])
+    return run_dir
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="FastAPI 앱 종단 간 부하 테스트")
+    parser.add_argument("--url", help="대상 서버 주소 (미지정 시 스텁 백엔드로 서버를 직접 실행)")
+    parser.add_argument("--stages", default="1,2,4,8", help="단계별 동시 사용자 수 (쉼표 구분)")
+    parser.add_argument("--stage-duration", type=float, default=20.0, help="단계별 측정 시간(초)")
+    parser.add_argument("--mix", default="analyze=1,sessions=2,login=1", help="엔드포인트 가중치")
+    parser.add_argument("--think-time", type=float, default=0.0, help="요청 사이 평균 대기시간(초)")
+    parser.add_argument("--min-photos", type=int, default=2)
+    parser.add_argument("--max-photos", type=int, default=5)
+    parser.add_argument("--photo-size", default="4032x3024", help="합성 사진 해상도 (12MP 기본)")
+    parser.add_argument("--photo-variants", type=int, default=3)
+    parser.add_argument("--organizations", type=int, default=3, help="가상 사용자가 나뉘는 조직 수")
+    parser.add_argument("--user-prefix", default="loadtest_")
+    parser.add_argument("--model-latency", default="lognormal:1500,0.5", help="스텁 모델 지연 분포")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--admin-token", help="--url 서버에서 블로킹 호출 위치(/admin/loop)를 읽을 관리자 토큰")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out-dir", default="load_results", help="결과 저장 디렉토리")
+    return parser.parse_args(argv)
+
+
+async def main():
+    args = parse_args()
+    load_test = LoadTest(args)
+    results = await load_test.run()
+    run_dir = save_results(Path(args.out_dir), args, results, load_test.loop_stats)
+    print(f"\n💾 결과 저장: {run_dir}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+현장 사진 폴더 일괄 위험성 평가 CLI
+디렉토리 트리를 순회하며 이미지가 들어 있는 폴더(현장/일자별 1개 폴더)를 하나의 분석 단위로 처리한다.
+
+- 동시 실행 수 제한 (--concurrency)
+- 체크포인트 파일로 중단된 실행 이어서 처리 (완료된 폴더, JSONL에 이미 성공 기록이 있는 폴더는 건너뜀)
+- 폴더별 결과를 JSONL로 즉시 기록
+- --username 지정 시 분석 세션/이미지/결과를 DB와 FileStorageManager에 저장
+
+실행 예: python bulk_assess.py /data/archive --output results.jsonl --concurrency 4 --username tester1
+"""
+
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+# 환경변수 로드 (main 모듈 import 전에 로드해야 설정이 반영된다)
+load_dotenv()
+
+from main import analyze_images_with_openai
+from image_pipeline import prepare_image
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+
+
+def find_site_folders(root: Path) -> List[Path]:
+    """이미지 파일을 직접 포함한 폴더 목록 (정렬된 순서로 반환해 재실행 시 순서가 같도록)"""
+    folders = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if any(Path(name).suffix.lower() in IMAGE_EXTENSIONS for name in filenames):
+            folders.append(Path(dirpath))
+    return folders
+
+
+def list_images(folder: Path, max_images: int) -> List[Path]:
+    images = sorted(
+        entry for entry in folder.iterdir()
+        if entry.is_file() and entry.suffix.lower() in IMAGE_EXTENSIONS
+    )
+    return images[:max_images]
+
+
+def recorded_folders(output_path: Path) -> Set[str]:
+    """결과 JSONL에 성공 기록이 있는 폴더 (기록 후 체크포인트 저장 전에 중단된 폴더를 다시 분석하지 않도록)"""
+    folders: Set[str] = set()
+    if not output_path.exists():
+        return folders
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 쓰다가 중단된 마지막 줄
+                continue
+            if record.get("status") == "ok":
+                folders.add(record["folder"])
+    return folders
+
+
+class Checkpoint:
+    """완료된 폴더 목록과 DB에 저장 중인 폴더의 세션 ID를 원자적으로 저장하는 체크포인트 파일"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.completed: Set[str] = set()
+        # 폴더 → 저장을 시작한 DB 세션 ID (결과 기록 전에 중단되면 재실행 시 이 세션부터 확인)
+        self.in_progress: Dict[str, str] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.completed = set(data.get("completed", []))
+            self.in_progress = dict(data.get("in_progress", {}))
+
+    def mark_started(self, key: str, session_id: str):
+        self.in_progress[key] = session_id
+        self._save()
+
+    def mark_done(self, key: str):
+        self.completed.add(key)
+        self.in_progress.pop(key, None)
+        self._save()
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"completed": sorted(self.completed), "in_progress": self.in_progress}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class BulkAssessment:
+    def __init__(self, args):
+        self.args = args
+        self.root = Path(args.root).resolve()
+        self.output_path = Path(args.output)
+        self.checkpoint = Checkpoint(Path(args.checkpoint or f"{args.output}.checkpoint.json"))
+        self.output_lock = asyncio.Lock()
+        self.user: Optional[Dict[str, Any]] = None
+        self.stats = {"folders_ok": 0, "folders_failed": 0, "images": 0, "tokens": 0}
+        self.folder_latencies: List[float] = []
+
+    async def _load_user(self):
+        if not self.args.username:
+            return
+        from database import get_db_manager
+        self.user = await get_db_manager().get_user_by_username(self.args.username)
+        if self.user is None:
+            raise SystemExit(f"❌ 사용자 '{self.args.username}'을 찾을 수 없습니다.")
+
+    async def _resume_persisted(self, folder_key: str) -> Optional[Dict[str, Any]]:
+        """이전 실행이 이 폴더를 DB에 저장하다 중단되었으면 그 세션을 확인
+
+        저장까지 끝난 세션이면 그 분석 결과를 돌려주어 다시 분석/저장하지 않는다.
+        저장 중에 끊긴 세션은 failed로 바꿔 두고 None (새 세션으로 다시 분석).
+        """
+        session_id = self.checkpoint.in_progress.get(folder_key)
+        if session_id is None or not self.user:
+            return None
+        from database import get_db_manager
+        db_manager = get_db_manager()
+        session = await db_manager.get_session(session_id)
+        if session is not None and session.get("analysis_status") == "completed":
+            return session["analysis_result"]
+        if session is not None:
+            await db_manager.transition_session_status(session_id, session["analysis_status"], "failed")
+        return None
+
+    async def _persist(self, folder_key: str, image_paths: List[Path], result: Dict[str, Any]):
+        """DB 세션 생성 + 원본 이미지/결과 파일 저장 (웹 업로드와 같은 경로 사용)
+
+        세션을 만들자마자 체크포인트에 기록해, 결과를 JSONL에 쓰기 전에 중단되어도 재실행이 세션을 또 만들지 않는다.
+        """
+        from starlette.datastructures import Headers, UploadFile
+        from database import get_db_manager
+        from file_storage import get_file_storage_manager
+
+        db_manager = get_db_manager()
+        file_storage = get_file_storage_manager()
+        session = await db_manager.create_analysis_session(
+            user_id=self.user["id"],
+            session_name=f"{self.args.session_prefix}{folder_key}",
+            image_count=len(image_paths)
+        )
+        self.checkpoint.mark_started(folder_key, session["id"])
+        uploads = []
+        try:
+            for path in image_paths:
+                mime_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                uploads.append(UploadFile(
+                    file=open(path, "rb"),
+                    filename=path.name,
+                    headers=Headers({"content-type": mime_type})
+                ))
+            await file_storage.save_uploaded_images(session["id"], self.user["id"], uploads)
+        finally:
+            for upload in uploads:
+                upload.file.close()
+
+        result["session_id"] = session["id"]
+        result["user_id"] = self.user["id"]
+        await file_storage.save_analysis_results(session["id"], self.user["id"], result)
+
+    def _end_partial_line(self):
+        """쓰다가 중단된 마지막 줄 뒤에 새 기록이 이어 붙지 않도록 줄바꿈을 넣는다"""
+        if not self.output_path.exists() or self.output_path.stat().st_size == 0:
+            return
+        with open(self.output_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    async def _write_record(self, record: Dict[str, Any]):
+        async with self.output_lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def process_folder(self, folder: Path, semaphore: asyncio.Semaphore):
+        folder_key = folder.relative_to(self.root).as_posix() or "."
+        async with semaphore:
+            started = time.monotonic()
+            image_paths = list_images(folder, self.args.max_images)
+            record: Dict[str, Any] = {"folder": folder_key, "image_count": len(image_paths)}
+            try:
+                result = await self._resume_persisted(folder_key)
+                if result is not None:
+                    print(f"↩️ {folder_key}: 이전 실행에서 저장까지 끝난 세션을 사용")
+                    image_count = len(result.get("image_names") or image_paths)
+                else:
+                    # PIL 디코딩/리사이즈는 스레드에서 수행해 다른 폴더의 모델 호출을 막지 않는다
+                    images = []
+                    image_names = []
+                    for path in image_paths:
+                        try:
+                            images.append(await asyncio.to_thread(prepare_image, str(path)))
+                            image_names.append(path.name)
+                        except Exception as img_error:
+                            print(f"⚠️ 이미지 로드 실패: {folder_key}/{path.name}, 오류: {img_error}")
+                    if not images:
+                        raise ValueError("유효한 이미지 파일이 없습니다.")
+
+                    result = await analyze_images_with_openai(images, image_names)
+                    if self.user:
+                        await self._persist(folder_key, image_paths, result)
+                    image_count = len(images)
+
+                record.update({"status": "ok", "result": result})
+                self.stats["folders_ok"] += 1
+                self.stats["images"] += image_count
+                self.stats["tokens"] += result.get("model_call", {}).get("total_tokens") or 0
+            except HTTPException as e:
+                record.update({"status": "error", "error": e.detail})
+            except Exception as e:
+                record.update({"status": "error", "error": str(e)})
+
+            elapsed = time.monotonic() - started
+            record["elapsed_sec"] = round(elapsed, 2)
+            await self._write_record(record)
+            if record["status"] == "ok":
+                self.folder_latencies.append(elapsed)
+                self.checkpoint.mark_done(folder_key)
+                print(f"✅ {folder_key}: {record['image_count']}장, {elapsed:.1f}초")
+            else:
+                self.stats["folders_failed"] += 1
+                print(f"❌ {folder_key}: {record['error']}")
+
+    async def run(self):
+        # 결과는 기록했지만 체크포인트에 반영하기 전에 중단된 폴더도 완료로 본다 (같은 폴더가 두 번 기록되지 않도록)
+        recorded = recorded_folders(self.output_path) - self.checkpoint.completed
+        folders = find_site_folders(self.root)
+        pending = [
+            folder for folder in folders
+            if (folder.relative_to(self.root).as_posix() or ".") not in self.checkpoint.completed | recorded
+        ]
+        print(f"📂 분석 대상 폴더: {len(folders)}개 (완료 {len(folders) - len(pending)}개 건너뜀)")
+        if self.args.dry_run:
+            for folder in pending:
+                print(f"  • {folder.relative_to(self.root).as_posix() or '.'}")
+            return
+
+        for folder_key in recorded:
+            self.checkpoint.mark_done(folder_key)
+        self._end_partial_line()
+
+        await self._load_user()
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        started = time.monotonic()
+        await asyncio.gather(*(self.process_folder(folder, semaphore) for folder in pending))
+        self.print_summary(time.monotonic() - started)
+
+    def print_summary(self, elapsed: float):
+        latencies = sorted(self.folder_latencies)
+
+        def pct(q: float) -> float:
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+        print("\n📊 일괄 분석 요약")
+        print("=" * 50)
+        print(f"  • 성공 폴더: {self.stats['folders_ok']}개")
+        print(f"  • 실패 폴더: {self.stats['folders_failed']}개")
+        print(f"  • 분석 이미지: {self.stats['images']}장")
+        print(f"  • 사용 토큰: {self.stats['tokens']:,}")
+        print(f"  • 소요 시간: {elapsed:.1f}초")
+        if elapsed > 0:
+            print(f"  • 처리량: {self.stats['folders_ok'] / elapsed * 60:.1f} 폴더/분, "
+                  f"{self.stats['images'] / elapsed:.2f} 장/초")
+        print(f"  • 폴더별 소요 시간: p50 {pct(0.5):.1f}초, p95 {pct(0.95):.1f}초")
+        print(f"  • 결과 파일: {self.output_path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="현장 사진 폴더 일괄 위험성 평가")
+    parser.add_argument("root", help="현장/일자별 사진 폴더들이 들어 있는 최상위 디렉토리")
+    parser.add_argument("--output", default="bulk_results.jsonl", help="결과 JSONL 파일 경로")
+    parser.add_argument("--checkpoint", help="체크포인트 파일 경로 (기본값: <output>.checkpoint.json)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 분석할 폴더 수")
+    parser.add_argument("--max-images", type=int, default=10, help="폴더당 분석할 최대 이미지 수")
+    parser.add_argument("--username", help="결과를 저장할 사용자명 (지정 시 DB와 storage에 저장)")
+    parser.add_argument("--session-prefix", default="일괄 분석: ", help="DB 세션 이름 접두어")
+    parser.add_argument("--dry-run", action="store_true", help="분석하지 않고 대상 폴더만 출력")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(BulkAssessment(parse_args()).run())
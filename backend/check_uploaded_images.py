@@ -21,55 +21,63 @@ async def check_uploaded_images():
     try:
         db_manager = get_db_manager()
         
-        # 1. 모든 이미지 조회
+        # 1. 모든 이미지 조회 (배치 단위 스트리밍 - 테이블 크기와 관계없이 메모리 일정)
         print("\n📸 업로드된 이미지 목록:")
         print("-" * 40)
-        images = await db_manager.get_all_images()
+        image_count = 0
+        total_size = 0
+        user_ids = set()
+        session_ids = set()
+        mime_types = {}
+        recent_images = []
+        seoul_tz = timezone(timedelta(hours=9))
         
-        if images:
-            for i, image in enumerate(images, 1):
-                print(f"\n{i}. {image['filename']}")
-                print(f"   📁 파일 경로: {image['file_path']}")
-                print(f"   📏 파일 크기: {image['file_size']:,} bytes")
-                print(f"   🏷️ MIME 타입: {image['mime_type']}")
-                print(f"   👤 사용자 ID: {image['user_id']}")
-                print(f"   🔗 세션 ID: {image['session_id']}")
-                # UTC 시간을 서울 시간으로 변환
-                try:
-                    utc_time = datetime.fromisoformat(image['uploaded_at'].replace('Z', '+00:00'))
-                    seoul_tz = timezone(timedelta(hours=9))
-                    seoul_time = utc_time.astimezone(seoul_tz)
-                    print(f"   📅 업로드 시간 (서울): {seoul_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                except:
-                    print(f"   📅 업로드 시간: {image['uploaded_at']}")
-                
-                # 파일 존재 여부 확인
-                if os.path.exists(image['file_path']):
-                    print(f"   ✅ 파일 존재: 예")
-                else:
-                    print(f"   ❌ 파일 존재: 아니오 (삭제됨)")
-        else:
+        async for image in db_manager.iter_images(
+            columns="filename,file_path,file_size,mime_type,user_id,session_id,uploaded_at"
+        ):
+            image_count += 1
+            print(f"\n{image_count}. {image['filename']}")
+            print(f"   📁 파일 경로: {image['file_path']}")
+            print(f"   📏 파일 크기: {image['file_size'] or 0:,} bytes")
+            print(f"   🏷️ MIME 타입: {image['mime_type']}")
+            print(f"   👤 사용자 ID: {image['user_id']}")
+            print(f"   🔗 세션 ID: {image['session_id']}")
+            # UTC 시간을 서울 시간으로 변환
+            try:
+                utc_time = datetime.fromisoformat(image['uploaded_at'].replace('Z', '+00:00'))
+                seoul_time = utc_time.astimezone(seoul_tz)
+                print(f"   📅 업로드 시간 (서울): {seoul_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            except:
+                print(f"   📅 업로드 시간: {image['uploaded_at']}")
+            
+            # 파일 존재 여부 확인
+            if os.path.exists(image['file_path']):
+                print(f"   ✅ 파일 존재: 예")
+            else:
+                print(f"   ❌ 파일 존재: 아니오 (삭제됨)")
+            
+            # 통계는 누적값만 유지
+            total_size += image['file_size'] or 0
+            user_ids.add(image['user_id'])
+            session_ids.add(image['session_id'])
+            mime_types[image['mime_type']] = mime_types.get(image['mime_type'], 0) + 1
+            # 최신순으로 순회하므로 앞의 5개가 최근 업로드
+            if len(recent_images) < 5:
+                recent_images.append((image['filename'], image['uploaded_at']))
+        
+        if image_count == 0:
             print("  ❌ 업로드된 이미지가 없습니다.")
         
         # 2. 통계 정보
         print(f"\n📊 이미지 통계:")
         print("-" * 40)
-        if images:
-            total_size = sum(img['file_size'] for img in images)
-            unique_users = len(set(img['user_id'] for img in images))
-            unique_sessions = len(set(img['session_id'] for img in images))
-            
-            print(f"  • 총 이미지 수: {len(images)}장")
+        if image_count:
+            print(f"  • 총 이미지 수: {image_count}장")
             print(f"  • 총 파일 크기: {total_size:,} bytes ({total_size/1024/1024:.2f} MB)")
-            print(f"  • 사용자 수: {unique_users}명")
-            print(f"  • 세션 수: {unique_sessions}개")
+            print(f"  • 사용자 수: {len(user_ids)}명")
+            print(f"  • 세션 수: {len(session_ids)}개")
             
             # MIME 타입별 통계
-            mime_types = {}
-            for img in images:
-                mime_type = img['mime_type']
-                mime_types[mime_type] = mime_types.get(mime_type, 0) + 1
-            
             print(f"\n  📋 MIME 타입별 분포:")
             for mime_type, count in mime_types.items():
                 print(f"    • {mime_type}: {count}장")
@@ -77,10 +85,8 @@ async def check_uploaded_images():
         # 3. 최근 업로드된 이미지 (최대 5개)
         print(f"\n🕒 최근 업로드된 이미지 (최대 5개):")
         print("-" * 40)
-        if images:
-            recent_images = sorted(images, key=lambda x: x['uploaded_at'], reverse=True)[:5]
-            for i, image in enumerate(recent_images, 1):
-                print(f"  {i}. {image['filename']} - {image['uploaded_at']}")
+        for i, (filename, uploaded_at) in enumerate(recent_images, 1):
+            print(f"  {i}. {filename} - {uploaded_at}")
         
         print("\n✅ 이미지 확인 완료!")
         
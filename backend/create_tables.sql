@@ -26,7 +26,8 @@ CREATE TABLE IF NOT EXISTS analysis_sessions (
     completed_at TIMESTAMP WITH TIME ZONE,
     analysis_result JSONB,
     feedback TEXT,
-    feedback_rating INTEGER CHECK (feedback_rating >= 1 AND feedback_rating <= 5)
+    feedback_rating INTEGER CHECK (feedback_rating >= 1 AND feedback_rating <= 5),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 -- 테이블 3: 업로드된 이미지 테이블
@@ -46,15 +47,38 @@ CREATE TABLE IF NOT EXISTS analysis_files (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
     session_id UUID REFERENCES analysis_sessions(id) ON DELETE CASCADE,
     user_id UUID REFERENCES users(id) ON DELETE CASCADE,
-    file_type VARCHAR(50) NOT NULL, -- 'risk_analysis', 'sgr_checklist', 'recommendations', 'full_report'
+    file_type VARCHAR(50) NOT NULL, -- 'risk_analysis', 'sgr_checklist', 'recommendations', 'full_report', 'image:<이미지ID>'
     file_path VARCHAR(500) NOT NULL,
     file_size INTEGER,
+    sha256 VARCHAR(64),
+    mime_type VARCHAR(100),
+    storage_tier VARCHAR(20) DEFAULT 'hot', -- 'hot', 'compressed'(재압축 원본), 'archived'(일별 zstd 아카이브)
+    archive_offset BIGINT, -- archived: 아카이브 파일 안의 압축 프레임 위치
+    archive_length INTEGER,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- 기존 DB 마이그레이션: 아티팩트 매니페스트 컬럼
+ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS sha256 VARCHAR(64);
+ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS mime_type VARCHAR(100);
+-- 기존 DB 마이그레이션: 저장 계층(tiering) 컬럼
+ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS storage_tier VARCHAR(20) DEFAULT 'hot';
+ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS archive_offset BIGINT;
+ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS archive_length INTEGER;
+-- 기존 DB 마이그레이션: 세션 캐시 재검증용 변경 시각
+ALTER TABLE analysis_sessions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
 -- 인덱스 생성
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_analysis_sessions_user_id ON analysis_sessions(user_id);
+-- 세션 히스토리 키셋 페이지네이션 (user_id 조건 + created_at, id 내림차순 정렬을 인덱스만으로 처리)
+CREATE INDEX IF NOT EXISTS idx_analysis_sessions_user_created ON analysis_sessions(user_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_uploaded_images_session_id ON uploaded_images(session_id);
+-- 전체 테이블 키셋 스캔 (DatabaseManager.iter_users / iter_sessions / iter_images)
+CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_analysis_sessions_created ON analysis_sessions(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_uploaded_images_uploaded ON uploaded_images(uploaded_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_analysis_files_session_id ON analysis_files(session_id);
+-- 아티팩트 매니페스트 조회/업서트 키 (세션 → 파일 종류)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_files_session_type ON analysis_files(session_id, file_type);
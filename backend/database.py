@@ -1,9 +1,65 @@
 import os
+import uuid
+import base64
 import asyncio
 from supabase import create_client, Client
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime, timezone, timedelta
 import json
+import logging
+from metrics import track_db_call, record_db_error
+
+logger = logging.getLogger(__name__)
+
+# 세션 목록(히스토리)에 필요한 컬럼만 조회 - analysis_result(JSONB 보고서)는 가져오지 않는다
+SESSION_LIST_COLUMNS = "id,session_name,created_at,image_count,analysis_status,feedback,feedback_rating"
+
+# 전체 테이블 스캔(iter_*) 기본 컬럼 - password_hash, analysis_result처럼 크거나 민감한 컬럼은 제외
+USER_SCAN_COLUMNS = "id,username,email,full_name,organization,role,is_active,created_at"
+SESSION_SCAN_COLUMNS = ("id,user_id,session_name,image_count,analysis_status,created_at,completed_at,"
+                        "feedback,feedback_rating")
+# 세션 상세(GET /sessions/{id}) 컬럼
+SESSION_DETAIL_COLUMNS = ("id,user_id,session_name,image_count,analysis_status,created_at,completed_at,"
+                          "analysis_result,feedback,feedback_rating,updated_at")
+# 아티팩트 매니페스트(analysis_files) 컬럼
+ARTIFACT_COLUMNS = ("session_id,user_id,file_type,file_path,file_size,sha256,mime_type,storage_tier,"
+                    "archive_offset,archive_length,created_at")
+IMAGE_SCAN_COLUMNS = "id,session_id,user_id,filename,file_path,file_size,mime_type,uploaded_at"
+SCAN_BATCH_SIZE = 500
+
+
+def encode_session_cursor(created_at: str, session_id: str) -> str:
+    """(created_at, id) 키셋 커서를 불투명한 문자열로 인코딩"""
+    raw = json.dumps([created_at, session_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _keyset_filter(order_column: str, after: tuple) -> str:
+    """(order_column, id) 내림차순에서 after 다음 행을 고르는 PostgREST or 필터"""
+    value, row_id = after
+    return f'{order_column}.lt."{value}",and({order_column}.eq."{value}",id.lt.{row_id})'
+
+
+def _with_keys(columns: str, order_column: str) -> str:
+    """키셋 커서에 필요한 정렬 컬럼과 id를 프로젝션에 포함"""
+    names = columns.split(",")
+    return ",".join(names + [key for key in ("id", order_column) if key not in names])
+
+
+def decode_session_cursor(cursor: str) -> tuple:
+    """커서를 (created_at, id)로 디코딩 - 형식이 맞지 않으면 ValueError
+
+    값이 PostgREST 필터 문자열에 들어가므로 타임스탬프/UUID 형식을 반드시 검증한다.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, session_id = json.loads(raw)
+        datetime.fromisoformat(created_at)
+        uuid.UUID(session_id)
+    except Exception:
+        raise ValueError("잘못된 커서입니다.")
+    return created_at, session_id
+
 
 class DatabaseManager:
     def __init__(self):
@@ -20,7 +76,7 @@ class DatabaseManager:
                 self.supabase_key
             )
         except Exception as e:
-            print(f"Supabase 클라이언트 초기화 오류: {e}")
+            logger.error("Supabase 클라이언트 초기화 오류", extra={"error": str(e)})
             # 임시로 None으로 설정하여 오류 방지
             self.supabase = None
     
@@ -55,7 +111,8 @@ class DatabaseManager:
                 completed_at TIMESTAMP WITH TIME ZONE,
                 analysis_result JSONB,
                 feedback TEXT,
-                feedback_rating INTEGER CHECK (feedback_rating >= 1 AND feedback_rating <= 5)
+                feedback_rating INTEGER CHECK (feedback_rating >= 1 AND feedback_rating <= 5),
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
             );
             """,
             
@@ -79,11 +136,39 @@ class DatabaseManager:
                 id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
                 session_id UUID REFERENCES analysis_sessions(id) ON DELETE CASCADE,
                 user_id UUID REFERENCES users(id) ON DELETE CASCADE,
-                file_type VARCHAR(50) NOT NULL, -- 'risk_analysis', 'sgr_checklist', 'recommendations', 'full_report'
+                file_type VARCHAR(50) NOT NULL, -- 'risk_analysis', 'sgr_checklist', 'recommendations', 'full_report', 'image:<이미지ID>'
                 file_path VARCHAR(500) NOT NULL,
                 file_size INTEGER,
+                sha256 VARCHAR(64),
+                mime_type VARCHAR(100),
+                storage_tier VARCHAR(20) DEFAULT 'hot', -- 'hot', 'compressed'(재압축 원본), 'archived'(일별 zstd 아카이브)
+                archive_offset BIGINT, -- archived: 아카이브 파일 안의 압축 프레임 위치
+                archive_length INTEGER,
                 created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
             );
+            """,
+            
+            # 아티팩트 매니페스트 - 기존 테이블에 컬럼 추가 및 (세션, 파일 종류) 유일 인덱스
+            """
+            ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS sha256 VARCHAR(64);
+            ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS mime_type VARCHAR(100);
+            ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS storage_tier VARCHAR(20) DEFAULT 'hot';
+            ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS archive_offset BIGINT;
+            ALTER TABLE analysis_files ADD COLUMN IF NOT EXISTS archive_length INTEGER;
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_files_session_type ON analysis_files(session_id, file_type);
+            """,
+            
+            # 세션 히스토리 키셋 페이지네이션용 복합 인덱스
+            """
+            CREATE INDEX IF NOT EXISTS idx_analysis_sessions_user_created
+                ON analysis_sessions(user_id, created_at DESC, id DESC);
+            """,
+            
+            # 전체 테이블 키셋 스캔(iter_users/iter_sessions/iter_images)용 인덱스
+            """
+            CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_analysis_sessions_created ON analysis_sessions(created_at DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_uploaded_images_uploaded ON uploaded_images(uploaded_at DESC, id DESC);
             """
         ]
         
@@ -92,6 +177,7 @@ class DatabaseManager:
             print(f"\n-- 테이블 {i}")
             print(sql)
     
+    @track_db_call
     async def create_user(self, username: str, email: str, password_hash: str, 
                          full_name: str = None, organization: str = None) -> Dict[str, Any]:
         """새 사용자 생성"""
@@ -111,22 +197,23 @@ class DatabaseManager:
         except Exception as e:
             raise Exception(f"사용자 생성 중 오류: {str(e)}")
     
+    @track_db_call
     async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """사용자명으로 사용자 조회"""
         try:
             result = self.supabase.table('users').select('*').eq('username', username).execute()
-            print(f"사용자 조회 결과: {result}")
-            print(f"결과 데이터: {result.data}")
             
             if result.data and len(result.data) > 0:
                 return result.data[0]
             else:
-                print(f"사용자 '{username}'을 찾을 수 없습니다.")
+                logger.debug("사용자를 찾을 수 없습니다.", extra={"username": username})
                 return None
         except Exception as e:
-            print(f"사용자 조회 중 오류: {str(e)}")
+            record_db_error()
+            logger.error("사용자 조회 중 오류", extra={"username": username, "error": str(e)})
             return None
     
+    @track_db_call
     async def create_analysis_session(self, user_id: str, session_name: str, 
                                     image_count: int) -> Dict[str, Any]:
         """새 분석 세션 생성"""
@@ -144,6 +231,7 @@ class DatabaseManager:
         except Exception as e:
             raise Exception(f"분석 세션 생성 중 오류: {str(e)}")
     
+    @track_db_call
     async def save_uploaded_image(self, session_id: str, user_id: str, 
                                 filename: str, file_path: str, 
                                 file_size: int, mime_type: str) -> Dict[str, Any]:
@@ -165,6 +253,7 @@ class DatabaseManager:
         except Exception as e:
             raise Exception(f"이미지 정보 저장 중 오류: {str(e)}")
     
+    @track_db_call
     async def save_analysis_result(self, session_id: str, user_id: str, 
                                  analysis_result: Dict[str, Any]) -> Dict[str, Any]:
         """분석 결과 저장"""
@@ -176,7 +265,8 @@ class DatabaseManager:
             result = self.supabase.table('analysis_sessions').update({
                 'analysis_result': analysis_result,
                 'analysis_status': 'completed',
-                'completed_at': seoul_time.isoformat()
+                'completed_at': seoul_time.isoformat(),
+                'updated_at': datetime.now(timezone.utc).isoformat()
             }).eq('id', session_id).execute()
             
             if result.data:
@@ -186,12 +276,14 @@ class DatabaseManager:
         except Exception as e:
             raise Exception(f"분석 결과 저장 중 오류: {str(e)}")
     
+    @track_db_call
     async def save_feedback(self, session_id: str, feedback: str, rating: int) -> Dict[str, Any]:
         """피드백 저장"""
         try:
             result = self.supabase.table('analysis_sessions').update({
                 'feedback': feedback,
-                'feedback_rating': rating
+                'feedback_rating': rating,
+                'updated_at': datetime.now(timezone.utc).isoformat()
             }).eq('id', session_id).execute()
             
             if result.data:
@@ -201,47 +293,230 @@ class DatabaseManager:
         except Exception as e:
             raise Exception(f"피드백 저장 중 오류: {str(e)}")
     
+    @track_db_call
+    async def save_artifacts(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """아티팩트 매니페스트 행 일괄 저장 ((session_id, file_type)이 같으면 덮어씀)"""
+        try:
+            result = self.supabase.table('analysis_files').upsert(
+                records, on_conflict='session_id,file_type'
+            ).execute()
+            return result.data if result.data else []
+        except Exception as e:
+            raise Exception(f"아티팩트 정보 저장 중 오류: {str(e)}")
+    
+    @track_db_call
+    async def get_session_artifacts(self, session_id: str) -> List[Dict[str, Any]]:
+        """세션의 아티팩트 매니페스트 행 조회"""
+        try:
+            result = self.supabase.table('analysis_files').select(ARTIFACT_COLUMNS).eq('session_id', session_id).execute()
+            return result.data if result.data else []
+        except Exception as e:
+            raise Exception(f"아티팩트 정보 조회 중 오류: {str(e)}")
+    
+    @track_db_call
+    async def delete_artifacts_by_paths(self, file_paths: List[str]) -> List[str]:
+        """경로가 일치하는 analysis_files/uploaded_images 행 삭제 - 영향받은 세션 ID 목록 반환
+
+        경로 목록이 URL 필터로 전달되므로 50개씩 나눠 요청한다.
+        """
+        session_ids = set()
+        try:
+            for i in range(0, len(file_paths), 50):
+                chunk = file_paths[i:i + 50]
+                for table in ('analysis_files', 'uploaded_images'):
+                    result = self.supabase.table(table).delete().in_('file_path', chunk).execute()
+                    session_ids.update(str(row['session_id']) for row in (result.data or []))
+            return sorted(session_ids)
+        except Exception as e:
+            raise Exception(f"파일 정보 삭제 중 오류: {str(e)}")
+    
+    @track_db_call
+    async def update_artifact_location(self, file_path: str, updates: Dict[str, Any]) -> List[str]:
+        """경로가 file_path인 파일의 위치/크기 정보 갱신 (재압축, 아카이브 이동) - 영향받은 세션 ID 목록 반환
+
+        analysis_files에는 updates 전체를, uploaded_images에는 공통 컬럼(file_path, file_size, mime_type)만 반영한다.
+        """
+        image_updates = {key: updates[key] for key in ('file_path', 'file_size', 'mime_type') if key in updates}
+        try:
+            result = self.supabase.table('analysis_files').update(updates).eq('file_path', file_path).execute()
+            session_ids = {str(row['session_id']) for row in (result.data or [])}
+            if image_updates:
+                result = self.supabase.table('uploaded_images').update(image_updates).eq('file_path', file_path).execute()
+                session_ids.update(str(row['session_id']) for row in (result.data or []))
+            return sorted(session_ids)
+        except Exception as e:
+            raise Exception(f"파일 정보 갱신 중 오류: {str(e)}")
+    
+    @track_db_call
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """세션 상세 조회 (분석 결과 포함) - 없으면 None"""
+        try:
+            result = self.supabase.table('analysis_sessions').select(SESSION_DETAIL_COLUMNS).eq('id', session_id).execute()
+            return result.data[0] if result.data else None
+        except Exception as e:
+            raise Exception(f"세션 조회 중 오류: {str(e)}")
+    
+    @track_db_call
+    async def get_session_updated_at(self, session_id: str) -> Optional[str]:
+        """세션 행의 마지막 변경 시각만 조회 (캐시 재검증용) - 세션이 없으면 None"""
+        try:
+            result = self.supabase.table('analysis_sessions').select('updated_at').eq('id', session_id).execute()
+            return result.data[0]['updated_at'] if result.data else None
+        except Exception as e:
+            raise Exception(f"세션 변경 시각 조회 중 오류: {str(e)}")
+    
+    @track_db_call
+    async def transition_session_status(self, session_id: str, from_status: str, to_status: str) -> bool:
+        """세션 상태가 from_status일 때만 to_status로 바꾼다 - 바꿨으면 True
+
+        조건부 UPDATE 한 번이므로 여러 API 인스턴스가 같은 세션을 동시에 처리하려 해도 하나만 성공한다.
+        """
+        try:
+            result = self.supabase.table('analysis_sessions').update({
+                'analysis_status': to_status,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }).eq('id', session_id).eq('analysis_status', from_status).execute()
+            return bool(result.data)
+        except Exception as e:
+            raise Exception(f"세션 상태 변경 중 오류: {str(e)}")
+    
+    @track_db_call
+    async def get_stale_sessions(self, status: str, created_before: str,
+                                 limit: int = SCAN_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """상태가 status이고 created_before 이전에 만든 세션 (오래된 순, 최대 limit개)"""
+        try:
+            result = self.supabase.table('analysis_sessions').select('id,user_id,created_at').eq(
+                'analysis_status', status).lt('created_at', created_before).order('created_at').limit(limit).execute()
+            return result.data if result.data else []
+        except Exception as e:
+            raise Exception(f"세션 조회 중 오류: {str(e)}")
+    
+    @track_db_call
+    async def get_session_images(self, session_id: str) -> List[Dict[str, Any]]:
+        """세션에 업로드된 이미지 목록 (업로드 순)"""
+        try:
+            result = self.supabase.table('uploaded_images').select(IMAGE_SCAN_COLUMNS).eq(
+                'session_id', session_id).order('uploaded_at').order('id').execute()
+            return result.data if result.data else []
+        except Exception as e:
+            raise Exception(f"세션 이미지 조회 중 오류: {str(e)}")
+    
+    @track_db_call
     async def get_user_sessions(self, user_id: str) -> List[Dict[str, Any]]:
         """사용자의 분석 세션 목록 조회"""
         try:
             result = self.supabase.table('analysis_sessions').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
             return result.data if result.data else []
         except Exception as e:
-            print(f"세션 목록 조회 중 오류: {str(e)}")
+            record_db_error()
+            logger.error("세션 목록 조회 중 오류", extra={"error": str(e)})
+            return []
+    
+    @track_db_call
+    async def get_user_sessions_page(self, user_id: str, limit: int,
+                                     after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """사용자의 분석 세션 목록 한 페이지 조회 (created_at, id 내림차순 키셋 페이지네이션)
+
+        after는 이전 페이지 마지막 행의 (created_at, id)이다. 다음 페이지 존재 여부를 알 수 있도록
+        limit + 1개까지 반환하며, (user_id, created_at DESC, id DESC) 인덱스를 그대로 탄다.
+        """
+        try:
+            query = self.supabase.table('analysis_sessions').select(SESSION_LIST_COLUMNS).eq('user_id', user_id)
+            if after is not None:
+                query = query.or_(_keyset_filter('created_at', after))
+            result = query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+            return result.data if result.data else []
+        except Exception as e:
+            record_db_error()
+            logger.error("세션 목록 조회 중 오류", extra={"error": str(e)})
             return []
     
+    @track_db_call
     async def get_all_users(self) -> List[Dict[str, Any]]:
         """모든 사용자 조회"""
         try:
             result = self.supabase.table('users').select('*').order('created_at', desc=True).execute()
             return result.data if result.data else []
         except Exception as e:
-            print(f"사용자 목록 조회 중 오류: {str(e)}")
+            record_db_error()
+            logger.error("사용자 목록 조회 중 오류", extra={"error": str(e)})
             return []
     
+    @track_db_call
     async def get_all_sessions(self) -> List[Dict[str, Any]]:
         """모든 분석 세션 조회"""
         try:
             result = self.supabase.table('analysis_sessions').select('*').order('created_at', desc=True).execute()
             return result.data if result.data else []
         except Exception as e:
-            print(f"세션 목록 조회 중 오류: {str(e)}")
+            record_db_error()
+            logger.error("세션 목록 조회 중 오류", extra={"error": str(e)})
             return []
     
+    @track_db_call
     async def get_all_images(self) -> List[Dict[str, Any]]:
         """모든 업로드된 이미지 조회"""
         try:
             result = self.supabase.table('uploaded_images').select('*').order('uploaded_at', desc=True).execute()
             return result.data if result.data else []
         except Exception as e:
-            print(f"이미지 목록 조회 중 오류: {str(e)}")
+            record_db_error()
+            logger.error("이미지 목록 조회 중 오류", extra={"error": str(e)})
             return []
+    
+    @track_db_call
+    async def scan_page(self, table: str, columns: str, order_column: str, limit: int,
+                        after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """테이블 키셋 스캔의 한 배치 ((order_column, id) 내림차순, 최대 limit개)
+
+        중간 배치가 실패했을 때 스캔이 조용히 잘리지 않도록 빈 목록 대신 예외를 올린다.
+        """
+        try:
+            query = self.supabase.table(table).select(_with_keys(columns, order_column))
+            if after is not None:
+                query = query.or_(_keyset_filter(order_column, after))
+            result = query.order(order_column, desc=True).order('id', desc=True).limit(limit).execute()
+            return result.data if result.data else []
+        except Exception as e:
+            raise Exception(f"{table} 테이블 조회 중 오류: {str(e)}")
+    
+    async def _iter_table(self, table: str, columns: str, order_column: str,
+                          batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        """batch_size개씩 키셋으로 넘기며 행을 하나씩 내보낸다 - 메모리에는 한 배치만 유지"""
+        after = None
+        while True:
+            rows = await self.scan_page(table, columns, order_column, batch_size, after)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            after = (rows[-1][order_column], rows[-1]['id'])
+    
+    def iter_users(self, columns: str = USER_SCAN_COLUMNS,
+                   batch_size: int = SCAN_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """모든 사용자를 최신순으로 순회 (get_all_users의 스트리밍 버전)"""
+        return self._iter_table('users', columns, 'created_at', batch_size)
+    
+    def iter_sessions(self, columns: str = SESSION_SCAN_COLUMNS,
+                      batch_size: int = SCAN_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """모든 분석 세션을 최신순으로 순회 (get_all_sessions의 스트리밍 버전)"""
+        return self._iter_table('analysis_sessions', columns, 'created_at', batch_size)
+    
+    def iter_images(self, columns: str = IMAGE_SCAN_COLUMNS,
+                    batch_size: int = SCAN_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """모든 업로드 이미지를 최신순으로 순회 (get_all_images의 스트리밍 버전)"""
+        return self._iter_table('uploaded_images', columns, 'uploaded_at', batch_size)
 
 # 전역 데이터베이스 매니저 인스턴스
 db_manager = None
 
 def get_db_manager() -> DatabaseManager:
+    """DATABASE_BACKEND 환경변수로 선택 - supabase(기본값) | memory(부하 테스트용 메모리 DB)"""
     global db_manager
     if db_manager is None:
-        db_manager = DatabaseManager()
+        if os.getenv("DATABASE_BACKEND", "supabase") == "memory":
+            from memory_database import InMemoryDatabaseManager
+            db_manager = InMemoryDatabaseManager()
+        else:
+            db_manager = DatabaseManager()
     return db_manager
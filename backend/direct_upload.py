@@ -0,0 +1,285 @@
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+
+from database import get_db_manager
+from artifact_manifest import Artifact, get_artifact_manifest, image_file_type
+from file_storage import get_file_storage_manager
+
+logger = logging.getLogger(__name__)
+
+# 직접 업로드 세션 상태 (analysis_sessions.analysis_status)
+AWAITING_UPLOAD = "awaiting_upload"
+PROCESSING = "processing"
+# 기한 안에 업로드를 끝내지 않아 만료된 세션
+FAILED = "failed"
+# 업로드 URL은 발급했지만 아직 확인하지 않은 원본 (analysis_files.storage_tier)
+PENDING_TIER = "pending"
+# finalize가 원본을 받아 둘 임시 파일 - 이 크기까지만 메모리에 두고 넘으면 디스크로 옮긴다 (UploadFile과 같은 기준)
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class DirectUploadFile(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str = Field(..., pattern=r"^image/[\w.+-]+$")
+    size: int = Field(..., gt=0)
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+
+
+class DirectUploadRequest(BaseModel):
+    session_name: str = Field("분석 세션", max_length=255)
+    files: List[DirectUploadFile] = Field(..., min_length=1)
+
+
+class DirectUploadManager:
+    """사진을 API 서버를 거치지 않고 객체 저장소로 바로 올리는 업로드 흐름
+
+    1. create(): 세션과 이미지 행을 만들고 파일별 presigned PUT URL 발급
+       (크기/형식/SHA-256 체크섬이 서명되어 있어 선언과 다른 업로드는 저장소가 거부)
+    2. 클라이언트가 URL로 직접 업로드
+    3. finalize(): 본문을 받지 않고 HEAD로 크기/체크섬을 확인한 뒤, 분석할 원본만 load_concurrency개씩
+       임시 파일로 스트리밍하며(해시 재확인) 반환한다. 축소본은 백그라운드로 만든다.
+    세션 상태는 조건부 UPDATE로 awaiting_upload → processing 으로 옮기므로 여러 인스턴스가 같은 세션을 중복 처리하지 않는다.
+    URL이 만료되면 refresh_urls()로 다시 발급받고, expire_after가 지나도록 끝내지 않은 세션은
+    expire_abandoned()(보존 기간 정리 작업이 호출)가 failed로 바꾸고 올라온 원본과 대기 행을 지운다.
+    """
+
+    def __init__(self, max_files: int, max_file_bytes: int, url_ttl: int, expire_after: float,
+                 load_concurrency: int = 4):
+        self.max_files = max_files
+        self.max_file_bytes = max_file_bytes
+        self.url_ttl = url_ttl
+        self.expire_after = expire_after
+        self.load_concurrency = load_concurrency
+
+    async def create(self, user: Dict[str, Any], request: DirectUploadRequest) -> Dict[str, Any]:
+        if len(request.files) > self.max_files:
+            raise HTTPException(status_code=400, detail=f"한 번에 최대 {self.max_files}개 파일까지 올릴 수 있습니다.")
+        too_large = [file.filename for file in request.files if file.size > self.max_file_bytes]
+        if too_large:
+            raise HTTPException(status_code=413, detail={
+                "message": f"파일당 최대 {self.max_file_bytes // (1024 * 1024)}MB까지 올릴 수 있습니다.",
+                "files": too_large,
+            })
+
+        storage = get_file_storage_manager()
+        session_dir = storage.session_prefix(user["id"])
+        keys = [session_dir / f"{uuid.uuid4()}{Path(file.filename).suffix}" for file in request.files]
+        uploads = [storage.backend.presign_put(str(key), file.content_type, file.size, self.url_ttl, file.sha256)
+                   for key, file in zip(keys, request.files)]
+        if any(upload is None for upload in uploads):
+            raise HTTPException(status_code=501, detail="직접 업로드는 객체 저장소 백엔드(STORAGE_BACKEND=s3)에서만 지원합니다.")
+
+        db_manager = get_db_manager()
+        session = await db_manager.create_analysis_session(
+            user_id=user["id"], session_name=request.session_name, image_count=len(request.files))
+        await db_manager.transition_session_status(session["id"], "pending", AWAITING_UPLOAD)
+
+        artifacts = []
+        response_uploads = []
+        for key, file, upload in zip(keys, request.files, uploads):
+            image_info = await db_manager.save_uploaded_image(
+                session_id=session["id"], user_id=user["id"], filename=file.filename,
+                file_path=str(key), file_size=file.size, mime_type=file.content_type)
+            artifacts.append(Artifact(session["id"], user["id"], image_file_type(image_info["id"]), key,
+                                      file.size, file.sha256, file.content_type, PENDING_TIER))
+            response_uploads.append({"image_id": image_info["id"], "filename": file.filename, **upload})
+        await get_artifact_manifest().record(artifacts)
+
+        return self._upload_response(session["id"], response_uploads)
+
+    def _upload_response(self, session_id: str, uploads: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "session_id": session_id,
+            "expires_in": self.url_ttl,
+            "uploads": uploads,
+            "finalize_url": f"/uploads/{session_id}/finalize",
+        }
+
+    async def refresh_urls(self, session_id: str, user: Dict[str, Any]) -> Dict[str, Any]:
+        """아직 확인되지 않은 원본의 업로드 URL을 다시 발급 - 응답은 create()와 같다
+
+        이미 확인된 원본(이전 finalize가 모델 호출 등에서 실패한 경우)은 다시 올릴 필요가 없으므로 빠진다.
+        """
+        db_manager = get_db_manager()
+        session = await db_manager.get_session(session_id)
+        if session is None or str(session["user_id"]) != str(user["id"]):
+            raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+        if session["analysis_status"] != AWAITING_UPLOAD:
+            raise HTTPException(status_code=409, detail="업로드 대기 중인 세션이 아닙니다.")
+        created_at = datetime.fromisoformat(session["created_at"])
+        if datetime.now(timezone.utc) - created_at > timedelta(seconds=self.expire_after):
+            raise HTTPException(status_code=410, detail="업로드 기한이 지난 세션입니다. 새로 업로드하세요.")
+
+        storage = get_file_storage_manager()
+        files = await get_artifact_manifest().session_files(session_id)
+        uploads = []
+        for image in await db_manager.get_session_images(session_id):
+            artifact = files.get(image_file_type(image["id"]))
+            if artifact is None or artifact.tier != PENDING_TIER:
+                continue
+            upload = storage.backend.presign_put(str(artifact.path), artifact.mime_type, artifact.size, self.url_ttl,
+                                                 artifact.sha256)
+            if upload is None:
+                raise HTTPException(status_code=501, detail="직접 업로드는 객체 저장소 백엔드(STORAGE_BACKEND=s3)에서만 지원합니다.")
+            uploads.append({"image_id": image["id"], "filename": image["filename"], **upload})
+        return self._upload_response(session_id, uploads)
+
+    async def expire_abandoned(self, dry_run: bool = False) -> Dict[str, int]:
+        """업로드 대기로 expire_after보다 오래 남은 세션을 failed로 바꾸고 확인 전 원본과 그 행을 지운다
+
+        이미 확인된 원본은 일반 파일이므로 남겨 두고 날짜별 보존 기간 정리에 맡긴다.
+        상태를 조건부로 바꾼 세션만 정리하므로 같은 순간 finalize가 시작된 세션은 건드리지 않는다.
+        """
+        db_manager = get_db_manager()
+        storage = get_file_storage_manager()
+        manifest = get_artifact_manifest()
+        stats = {"sessions_expired": 0, "uploads_removed": 0, "failed": 0}
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=self.expire_after)).isoformat()
+        while True:
+            sessions = await db_manager.get_stale_sessions(AWAITING_UPLOAD, cutoff)
+            if not sessions:
+                return stats
+            if dry_run:
+                # 상태를 바꾸지 않으므로 마지막 세션 이후부터 이어서 센다
+                stats["sessions_expired"] += len(sessions)
+                cutoff = sessions[-1]["created_at"]
+                continue
+            for session in sessions:
+                if not await db_manager.transition_session_status(session["id"], AWAITING_UPLOAD, FAILED):
+                    continue
+                stats["sessions_expired"] += 1
+                files = await manifest.session_files(session["id"])
+                deleted = []
+                for artifact in files.values():
+                    if artifact.tier != PENDING_TIER:
+                        continue
+                    try:
+                        await storage.backend.delete(str(artifact.path))
+                        deleted.append(str(artifact.path))
+                    except Exception as e:
+                        stats["failed"] += 1
+                        logger.warning("만료된 직접 업로드 원본 삭제 실패",
+                                       extra={"session_id": session["id"], "key": str(artifact.path), "error": str(e)})
+                if deleted:
+                    await db_manager.delete_artifacts_by_paths(deleted)
+                manifest.forget(session["id"])
+                stats["uploads_removed"] += len(deleted)
+
+    async def finalize(self, session_id: str, user: Dict[str, Any],
+                       renditions_after: Optional[asyncio.Event] = None) -> List[Tuple[str, BinaryIO]]:
+        """업로드 확인 후 분석할 (파일명, 이미지) 목록 반환 - 실패하면 세션을 다시 업로드 대기로 돌린다
+
+        축소본은 renditions_after가 설정된 뒤 백그라운드로 만든다.
+        """
+        db_manager = get_db_manager()
+        session = await db_manager.get_session(session_id)
+        if session is None or str(session["user_id"]) != str(user["id"]):
+            raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+        if not await db_manager.transition_session_status(session_id, AWAITING_UPLOAD, PROCESSING):
+            raise HTTPException(status_code=409, detail="업로드 대기 중인 세션이 아닙니다.")
+        try:
+            return await self._verify_and_load(session_id, user, renditions_after)
+        except BaseException:
+            await self.release(session_id)
+            raise
+
+    async def release(self, session_id: str):
+        """처리에 실패한 세션을 다시 finalize할 수 있게 업로드 대기 상태로 돌린다"""
+        try:
+            await get_db_manager().transition_session_status(session_id, PROCESSING, AWAITING_UPLOAD)
+        except Exception as e:
+            logger.warning("직접 업로드 세션 상태 복구 실패", extra={"session_id": session_id, "error": str(e)})
+
+    async def _verify_and_load(self, session_id: str, user: Dict[str, Any],
+                               renditions_after: Optional[asyncio.Event]) -> List[Tuple[str, BinaryIO]]:
+        storage = get_file_storage_manager()
+        manifest = get_artifact_manifest()
+        images = await get_db_manager().get_session_images(session_id)
+        files = await manifest.session_files(session_id)
+
+        async def check(image: Dict[str, Any]) -> Optional[str]:
+            """HEAD로 크기/체크섬만 확인 - 문제는 None, "missing", "mismatched" 중 하나"""
+            artifact = files.get(image_file_type(image["id"]))
+            if artifact is None:
+                return "missing"
+            try:
+                stored = await storage.backend.stat(str(artifact.path))
+            except FileNotFoundError:
+                return "missing"
+            if stored.size != artifact.size or (stored.sha256 is not None and stored.sha256 != artifact.sha256):
+                return "mismatched"
+            return None
+
+        def reject(problems: Dict[str, List[str]]):
+            raise HTTPException(status_code=400, detail={
+                "message": "업로드가 완료되지 않았거나 내용이 선언한 SHA-256과 다릅니다. 다시 올린 뒤 finalize하세요.",
+                **problems,
+            })
+
+        problems = {"missing": [], "mismatched": []}
+        for image, problem in zip(images, await asyncio.gather(*(check(image) for image in images))):
+            if problem is not None:
+                problems[problem].append(image["id"])
+        if problems["missing"] or problems["mismatched"]:
+            reject(problems)
+
+        # 분석할 원본을 load_concurrency개씩 임시 파일로 받는다 - 체크섬을 기록하지 않는 저장소도 있으므로 받으면서 해시를 다시 확인
+        semaphore = asyncio.Semaphore(self.load_concurrency)
+
+        async def load(image: Dict[str, Any]) -> BinaryIO:
+            artifact = files[image_file_type(image["id"])]
+            spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            hasher = hashlib.sha256()
+            try:
+                async with semaphore:
+                    async for chunk in storage.backend.iter_range(str(artifact.path), 0, artifact.size):
+                        hasher.update(chunk)
+                        spool.write(chunk)
+            except BaseException:
+                spool.close()
+                raise
+            spool.seek(0)
+            if hasher.hexdigest() != artifact.sha256:
+                problems["mismatched"].append(image["id"])
+            return spool
+
+        loaded = await asyncio.gather(*(load(image) for image in images))
+        if problems["mismatched"]:
+            for spool in loaded:
+                spool.close()
+            reject(problems)
+
+        # 처음 확인한 원본만 매니페스트를 일반 계층으로 바꾸고 축소본을 백그라운드로 만든다 (재시도한 finalize는 건너뜀)
+        verified = [(image, files[image_file_type(image["id"])]) for image in images]
+        verified = [(image, artifact) for image, artifact in verified if artifact.tier == PENDING_TIER]
+        await manifest.record([artifact._replace(tier="hot") for _, artifact in verified])
+        for image, artifact in verified:
+            storage.schedule_renditions(session_id, str(user["id"]), image["id"], artifact.path, renditions_after)
+
+        return [(image["filename"], spool) for image, spool in zip(images, loaded)]
+
+
+# 전역 직접 업로드 매니저
+direct_upload_manager = None
+
+def get_direct_upload_manager() -> DirectUploadManager:
+    global direct_upload_manager
+    if direct_upload_manager is None:
+        direct_upload_manager = DirectUploadManager(
+            max_files=int(os.getenv("DIRECT_UPLOAD_MAX_FILES", "20")),
+            max_file_bytes=int(float(os.getenv("DIRECT_UPLOAD_MAX_FILE_MB", "25")) * 1024 * 1024),
+            url_ttl=int(os.getenv("DIRECT_UPLOAD_URL_TTL_SECONDS", "900")),
+            expire_after=float(os.getenv("DIRECT_UPLOAD_EXPIRE_HOURS", "24")) * 3600,
+            load_concurrency=int(os.getenv("DIRECT_UPLOAD_LOAD_CONCURRENCY", "4")),
+        )
+    return direct_upload_manager
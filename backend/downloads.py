@@ -0,0 +1,181 @@
+from typing import Callable, Mapping, Optional, Tuple, TYPE_CHECKING
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+if TYPE_CHECKING:
+    from storage_backend import StorageBackend
+
+# zerocopysend를 지원하지 않는 서버에서 한 번에 읽어 보내는 크기 (요청당 메모리 상한)
+CHUNK_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Range 헤더를 (시작, 끝 포함) 바이트 위치로 해석
+
+    헤더가 없거나 여러 구간/다른 단위처럼 지원하지 않는 형식이면 None (전체 응답).
+    구간이 파일 밖이면 RangeNotSatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if not start_text:
+            # bytes=-N: 마지막 N바이트
+            length = int(end_text)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+class ArtifactFileResponse(Response):
+    """저장 파일의 일부/전체를 보내는 응답 - 헤더는 호출자가 매니페스트로 만든다 (파일을 stat/읽지 않음)
+
+    서버가 ASGI zerocopysend 확장을 제공하면 파일 디스크립터를 넘겨 sendfile로 보내고,
+    아니면 CHUNK_SIZE씩 읽어 스트리밍하므로 큰 사진도 파이썬 메모리에 통째로 올라가지 않는다.
+    파일이 없으면 404를 보내기 전에 on_missing을 호출한다 (호출자가 오래된 매니페스트를 버리도록).
+    """
+
+    def __init__(self, path: str, offset: int, count: int, status_code: int,
+                 headers: Mapping[str, str], media_type: Optional[str],
+                 on_missing: Optional[Callable[[], None]] = None):
+        self.path = path
+        self.on_missing = on_missing
+        self.offset = offset
+        self.count = count
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            file = await anyio.open_file(self.path, mode="rb")
+        except (FileNotFoundError, IsADirectoryError):
+            # 매니페스트에는 있지만 파일이 지워진 경우 (보존 기간 정리 등)
+            if self.on_missing is not None:
+                self.on_missing()
+            await Response("파일을 찾을 수 없습니다.", status_code=404, media_type="text/plain; charset=utf-8")(
+                scope, receive, send)
+            return
+
+        async with file:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope["method"].upper() == "HEAD" or self.count == 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.wrapped,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 파일이 매니페스트 크기보다 짧아진 경우에도 응답은 닫는다
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class ObjectStreamResponse(Response):
+    """로컬 파일이 아닌 저장소 백엔드(S3 등)의 객체 일부/전체를 Range 요청으로 받아 그대로 흘려보내는 응답"""
+
+    def __init__(self, backend: "StorageBackend", key: str, offset: int, count: int, status_code: int,
+                 headers: Mapping[str, str], media_type: Optional[str],
+                 on_missing: Optional[Callable[[], None]] = None):
+        self.backend = backend
+        self.on_missing = on_missing
+        self.key = key
+        self.offset = offset
+        self.count = count
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["method"].upper() == "HEAD" or self.count == 0:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        chunks = self.backend.iter_range(self.key, self.offset, self.count)
+        try:
+            # 첫 조각을 받은 뒤에 상태 코드를 보내야 없는 객체를 404로 돌려줄 수 있다
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = b""
+            except FileNotFoundError:
+                if self.on_missing is not None:
+                    self.on_missing()
+                await Response("파일을 찾을 수 없습니다.", status_code=404, media_type="text/plain; charset=utf-8")(
+                    scope, receive, send)
+                return
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": first, "more_body": True})
+            async for chunk in chunks:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await chunks.aclose()
+
+
+def artifact_response(path: str, size: int, etag: str, media_type: Optional[str],
+                      range_header: Optional[str], if_range: Optional[str],
+                      extra_headers: Mapping[str, str], content: Optional[bytes] = None,
+                      backend: Optional["StorageBackend"] = None,
+                      on_missing: Optional[Callable[[], None]] = None) -> Response:
+    """Range/If-Range를 반영해 200, 206, 416 중 하나를 만든다
+
+    content를 주면(아카이브에서 푼 멤버 등) 파일 대신 메모리의 바이트에서 같은 방식으로 잘라 보낸다.
+    backend가 로컬 파일이 아닌 저장소면 파일 대신 백엔드에서 스트리밍한다.
+    저장 파일이 없어 404가 되면 on_missing을 호출한다.
+    """
+    def stored_response(offset: int, count: int, status_code: int, headers: Mapping[str, str]) -> Response:
+        if backend is not None and backend.local_path(path) is None:
+            return ObjectStreamResponse(backend, path, offset, count, status_code, headers, media_type, on_missing)
+        return ArtifactFileResponse(path, offset, count, status_code, headers, media_type, on_missing)
+
+    headers = {"Accept-Ranges": "bytes", "ETag": etag, **extra_headers}
+    # If-Range가 현재 ETag와 다르면 파일이 바뀐 것이므로 전체를 보낸다
+    if if_range is not None and if_range != etag:
+        range_header = None
+    try:
+        byte_range = parse_byte_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        if content is not None:
+            return Response(content, status_code=200, headers=headers, media_type=media_type)
+        return stored_response(0, size, 200, {**headers, "Content-Length": str(size)})
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if content is not None:
+        return Response(content[start:end + 1], status_code=206, headers=headers, media_type=media_type)
+    headers["Content-Length"] = str(end - start + 1)
+    return stored_response(start, end - start + 1, 206, headers)
@@ -1,12 +1,32 @@
 import os
 import uuid
 import shutil
+import asyncio
+import logging
+import contextvars
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Set, Union
 from datetime import datetime, timezone, timedelta
-import aiofiles
 from fastapi import UploadFile, HTTPException
-from database import get_db_manager
+from database import get_db_manager, encode_session_cursor, decode_session_cursor
+from tracing import span
+from session_cache import get_session_cache
+from artifact_manifest import Artifact, get_artifact_manifest, image_file_type, rendition_file_type
+from image_pipeline import make_renditions
+from scheduler import get_scheduler
+from storage_backend import CHUNK_SIZE, get_storage_backend
+
+logger = logging.getLogger(__name__)
+
+
+async def _upload_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    """업로드 파일(디스크에 스풀된 임시 파일)을 CHUNK_SIZE씩 읽는다 - 전체를 메모리에 올리지 않음"""
+    await file.seek(0)
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
 
 class FileStorageManager:
     def __init__(self):
@@ -14,9 +34,13 @@ class FileStorageManager:
         self.images_path = self.base_storage_path / "images"
         self.results_path = self.base_storage_path / "results"
         self.reports_path = self.base_storage_path / "reports"
+        # 파일 쓰기/읽기는 저장소 백엔드(STORAGE_BACKEND)를 거친다 - 위 경로는 로컬 경로이자 S3 객체 키
+        self.backend = get_storage_backend()
+        self._rendition_jobs: Set[asyncio.Task] = set()
         
-        # 디렉토리 생성
-        self._create_directories()
+        # 디렉토리 생성 (로컬 백엔드만)
+        if self.backend.local_path(str(self.base_storage_path)) is not None:
+            self._create_directories()
     
     def _create_directories(self):
         """저장 디렉토리 생성"""
@@ -42,17 +66,30 @@ class FileStorageManager:
         time_str = seoul_time.strftime("%H-%M-%S")
         user_time_folder = f"{user_id}_{time_str}"
         
-        # 전체 경로: storage/images/2025-09-03/tester1_14-30-25/
+        # 전체 경로: storage/images/2025-09-03/tester1_14-30-25/ (디렉터리는 로컬 백엔드가 쓸 때 만든다)
         session_dir = base_path / date_folder / user_time_folder
-        session_dir.mkdir(parents=True, exist_ok=True)
         return session_dir
     
+    def session_prefix(self, user_id: str) -> Path:
+        """새 세션의 업로드 사진 키 접두사 (storage/images/<날짜>/<사용자ID>_<시간>) - 직접 업로드가 객체 키를 정할 때 사용"""
+        return self._get_session_directory(user_id, None, self.images_path)
+    
     async def save_uploaded_images(self, session_id: str, user_id: str, 
-                                 files: List[UploadFile]) -> List[Dict[str, Any]]:
-        """업로드된 이미지 파일들 저장"""
+                                 files: List[UploadFile],
+                                 renditions_after: Optional[asyncio.Event] = None) -> List[Dict[str, Any]]:
+        """업로드된 이미지 파일들 저장 - 축소본은 renditions_after가 설정된 뒤 백그라운드로 만든다"""
+        with span("storage.save_uploaded_images", file_count=len(files)) as s:
+            saved_images = await self._save_uploaded_images(session_id, user_id, files, renditions_after)
+            s.set_attribute("bytes_written", sum(image["file_size"] for image in saved_images))
+        return saved_images
+
+    async def _save_uploaded_images(self, session_id: str, user_id: str, files: List[UploadFile],
+                                  renditions_after: Optional[asyncio.Event]) -> List[Dict[str, Any]]:
         db_manager = get_db_manager()
         session_dir = self._get_session_directory(user_id, session_id, self.images_path)
         saved_images = []
+        artifacts = []
+        renditions = []
         
         for file in files:
             if not file.content_type.startswith('image/'):
@@ -63,10 +100,10 @@ class FileStorageManager:
             unique_filename = f"{uuid.uuid4()}{file_extension}"
             file_path = session_dir / unique_filename
             
-            # 파일 저장
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
+            # 파일 저장 (조각 단위로 저장소에 흘려 보내며 크기/SHA-256 계산, 큰 파일은 S3 멀티파트 업로드)
+            stored = await self.backend.put_stream(str(file_path), _upload_chunks(file), file.content_type)
+            # 전처리가 같은 파일 객체를 처음부터 다시 읽는다
+            await file.seek(0)
             
             # 데이터베이스에 정보 저장
             image_info = await db_manager.save_uploaded_image(
@@ -74,76 +111,137 @@ class FileStorageManager:
                 user_id=user_id,
                 filename=file.filename,
                 file_path=str(file_path),
-                file_size=len(content),
+                file_size=stored.size,
                 mime_type=file.content_type
             )
+            artifacts.append(Artifact(session_id, user_id, image_file_type(image_info["id"]), file_path,
+                                      stored.size, stored.sha256, file.content_type))
+            renditions.append((image_info["id"], file_path))
             
             saved_images.append({
                 "id": image_info["id"],
                 "original_filename": file.filename,
                 "stored_filename": unique_filename,
                 "file_path": str(file_path),
-                "file_size": len(content),
+                "file_size": stored.size,
                 "mime_type": file.content_type
             })
         
+        await get_artifact_manifest().record(artifacts)
+        for image_id, file_path in renditions:
+            self.schedule_renditions(session_id, user_id, image_id, file_path, renditions_after)
         return saved_images
     
+    def schedule_renditions(self, session_id: str, user_id: str, image_id: str, file_path: Path,
+                            start_after: Optional[asyncio.Event] = None) -> asyncio.Task:
+        """축소본 생성 → 저장 → 매니페스트 기록을 백그라운드 작업으로 등록 (요청은 기다리지 않는다)
+
+        저장된 원본을 읽어 만든다 (로컬 백엔드는 파일 경로를 그대로 열고, S3는 객체를 받아 온다).
+
+        start_after를 주면 그 이벤트가 설정된 뒤(분석 요청은 모델 호출 직전)에 디코딩을 시작해
+        전처리와 CPU를 다투지 않는다. 끝나기 전까지 GET .../{thumb|preview}는 404이므로 클라이언트는 원본으로 대신 보여준다.
+        요청의 추적/단계 시간에 섞이지 않도록 빈 컨텍스트에서 실행한다.
+        """
+        job = contextvars.Context().run(
+            asyncio.create_task,
+            self._store_renditions(session_id, user_id, image_id, file_path, start_after))
+        self._rendition_jobs.add(job)
+        job.add_done_callback(self._rendition_jobs.discard)
+        return job
+    
+    async def _store_renditions(self, session_id: str, user_id: str, image_id: str, file_path: Path,
+                                start_after: Optional[asyncio.Event]):
+        """make_renditions 결과를 원본 옆(<stem>.<이름>.webp)에 저장하고 매니페스트에 기록"""
+        try:
+            if start_after is not None:
+                await start_after.wait()
+            source: Union[bytes, Path] = (self.backend.local_path(str(file_path))
+                                          or await self.backend.read(str(file_path)))
+            # 분석 전처리와 같은 스레드 풀 - 동시에 도는 디코딩 작업 수가 레인 동시 실행 한도의 합을 넘지 않는다
+            renditions = await get_scheduler().run_in_executor(make_renditions, source)
+            artifacts = []
+            for name, data in renditions.items():
+                rendition_path = file_path.with_name(f"{file_path.stem}.{name}.webp")
+                stored = await self.backend.put_bytes(str(rendition_path), data, "image/webp")
+                artifacts.append(Artifact(session_id, user_id, rendition_file_type(image_id, name), rendition_path,
+                                          stored.size, stored.sha256, "image/webp"))
+            await get_artifact_manifest().record(artifacts)
+        except Exception as e:
+            # 축소본은 목록 화면 최적화일 뿐이므로 실패해도 원본과 분석 결과에는 영향이 없다
+            logger.warning("이미지 축소본 생성 실패", extra={"image_id": image_id, "error": str(e)})
+    
+    async def wait_for_renditions(self):
+        """진행 중인 축소본 작업이 모두 끝날 때까지 대기 (서버 종료 시 저장 백엔드를 닫기 전에 호출)"""
+        while self._rendition_jobs:
+            await asyncio.gather(*list(self._rendition_jobs), return_exceptions=True)
+    
+    async def close(self):
+        await self.wait_for_renditions()
+    
     async def save_analysis_results(self, session_id: str, user_id: str, 
                                   analysis_result: Dict[str, Any]) -> Dict[str, Any]:
         """분석 결과 파일들 저장"""
+        with span("storage.save_analysis_results"):
+            return await self._save_analysis_results(session_id, user_id, analysis_result)
+
+    async def _save_analysis_results(self, session_id: str, user_id: str,
+                                   analysis_result: Dict[str, Any]) -> Dict[str, Any]:
         db_manager = get_db_manager()
         session_dir = self._get_session_directory(user_id, session_id, self.results_path)
         saved_files = {}
+        artifacts = []
+        
+        async def write_text(file_type: str, filename: str, text: str, mime_type: str):
+            path = session_dir / filename
+            stored = await self.backend.put_bytes(str(path), text.encode('utf-8'), mime_type)
+            artifacts.append(Artifact(session_id, user_id, file_type, path, stored.size, stored.sha256, mime_type))
+            saved_files[file_type] = {
+                "filename": filename,
+                "file_path": str(path),
+                "file_size": stored.size
+            }
         
         # 전체 보고서 저장
         if "full_report" in analysis_result:
-            report_filename = f"full_report_{session_id}.md"
-            report_path = session_dir / report_filename
-            
-            async with aiofiles.open(report_path, 'w', encoding='utf-8') as f:
-                await f.write(analysis_result["full_report"])
-            
-            saved_files["full_report"] = {
-                "filename": report_filename,
-                "file_path": str(report_path),
-                "file_size": len(analysis_result["full_report"].encode('utf-8'))
-            }
+            await write_text("full_report", f"full_report_{session_id}.md", analysis_result["full_report"],
+                             "text/markdown; charset=utf-8")
         
         # 섹션별 파일 저장
         sections = analysis_result.get("sections", {})
         for section_name, section_content in sections.items():
             if section_content:
-                section_filename = f"{section_name}_{session_id}.html"
-                section_path = session_dir / section_filename
-                
-                async with aiofiles.open(section_path, 'w', encoding='utf-8') as f:
-                    await f.write(section_content)
-                
-                saved_files[section_name] = {
-                    "filename": section_filename,
-                    "file_path": str(section_path),
-                    "file_size": len(section_content.encode('utf-8'))
-                }
-        
-        # 데이터베이스에 분석 결과 저장
-        await db_manager.save_analysis_result(session_id, user_id, analysis_result)
+                await write_text(section_name, f"{section_name}_{session_id}.html", section_content,
+                                 "text/html; charset=utf-8")
+        
+        await get_artifact_manifest().record(artifacts)
+        
+        # 데이터베이스에 분석 결과 저장 후 세션 상세 캐시(GET /sessions/{id})를 미리 채운다
+        session_row = await db_manager.save_analysis_result(session_id, user_id, analysis_result)
+        await get_session_cache().store(session_row)
         
         return saved_files
     
-    async def get_user_files(self, user_id: str) -> Dict[str, List[Dict[str, Any]]]:
-        """사용자의 모든 파일 정보 조회"""
+    async def get_user_files(self, user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """사용자의 분석 세션 목록 한 페이지 조회 (최신순)
+
+        cursor는 이전 응답의 next_cursor 값이며, 잘못된 커서면 ValueError가 발생한다.
+        """
         db_manager = get_db_manager()
+        after = decode_session_cursor(cursor) if cursor else None
         
-        # 사용자의 세션 목록 조회
-        sessions = await db_manager.get_user_sessions(user_id)
+        # limit + 1개를 받아 다음 페이지 존재 여부를 판단
+        rows = await db_manager.get_user_sessions_page(user_id, limit, after)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         user_files = {
             "sessions": [],
-            "total_sessions": len(sessions)
+            "count": len(rows),
+            "has_more": has_more,
+            "next_cursor": encode_session_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
         }
         
-        for session in sessions:
+        for session in rows:
             session_info = {
                 "session_id": session["id"],
                 "session_name": session["session_name"],
@@ -157,21 +255,19 @@ class FileStorageManager:
         
         return user_files
     
-    async def cleanup_old_files(self, days_old: int = 30):
-        """오래된 파일들 정리 (선택적 기능)"""
-        cutoff_date = datetime.now() - timedelta(days=days_old)
-        
-        # 구현 예정: 오래된 파일들을 찾아서 삭제
-        # 실제 운영에서는 더 정교한 정리 로직이 필요
-        pass
+    async def cleanup_old_files(self, days_old: Optional[int] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """보존 기간이 지난 저장 파일과 DB 행 정리 - 정리 보고서(삭제 파일 수, 확보 바이트) 반환
+
+        days_old를 주면 모든 종류에 같은 기간을 적용하고, 없으면 종류별 설정(RETENTION_*_DAYS)을 따른다.
+        """
+        from retention import get_retention_engine
+        return await get_retention_engine().run(dry_run=dry_run, days_override=days_old)
     
-    def get_file_path(self, user_id: str, session_id: str, filename: str) -> Optional[Path]:
-        """파일 경로 조회"""
-        session_dir = self._get_session_directory(user_id, session_id, self.results_path)
-        file_path = session_dir / filename
-        
-        if file_path.exists():
-            return file_path
+    async def get_file_path(self, session_id: str, file_type: str) -> Optional[Path]:
+        """세션의 저장 파일 경로 조회 (아티팩트 매니페스트 - 디렉터리를 만들지 않는다)"""
+        artifact = await get_artifact_manifest().lookup(session_id, file_type)
+        if artifact is not None and await self.backend.exists(str(artifact.path)):
+            return artifact.path
         return None
 
 # 전역 파일 저장 매니저
@@ -0,0 +1,55 @@
+import io
+from pathlib import Path
+from typing import BinaryIO, Dict, Union
+from PIL import Image, ImageOps
+
+# 모델 입력 이미지 최대 변 길이 (API 제한 고려)
+MAX_IMAGE_SIZE = 1024
+
+# 업로드 사진과 함께 저장하는 WebP 축소본: 이름 → (최대 변 길이, 품질)
+# thumb는 이력/갤러리 목록, preview는 상세 화면용 - 원본은 내려받기에서만 쓴다
+RENDITIONS = {
+    "thumb": (256, 70),
+    "preview": (1280, 80),
+}
+# 축소본 파일명 접미사 (<원본 파일명 stem>.<이름>.webp)
+RENDITION_SUFFIXES = tuple(f".{name}.webp" for name in RENDITIONS)
+
+
+def prepare_image(source: Union[str, BinaryIO], max_size: int = MAX_IMAGE_SIZE) -> Image.Image:
+    """이미지를 열고 최대 변 길이가 max_size를 넘으면 LANCZOS로 축소
+
+    /analyze 업로드와 일괄 분석 CLI가 같은 전처리를 쓰도록 한 곳에 모아 둔다.
+    원본 파일을 닫아도 쓸 수 있도록 픽셀 데이터를 메모리에 올린 이미지를 반환한다.
+    """
+    image = Image.open(source)
+    if max(image.size) > max_size:
+        ratio = max_size / max(image.size)
+        new_size = tuple(int(dim * ratio) for dim in image.size)
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    else:
+        image.load()
+    return image
+
+
+def make_renditions(source: Union[bytes, str, Path]) -> Dict[str, bytes]:
+    """업로드 원본(바이트 또는 파일 경로)에서 RENDITIONS의 WebP 축소본을 만들어 {이름: 바이트}로 반환 (워커 스레드에서 호출)
+
+    가장 큰 축소본 크기로 한 번만 디코딩하고(JPEG는 draft로 1/2, 1/4 ... 축소 디코딩),
+    작은 축소본은 바로 위 축소본에서 다시 줄인다. EXIF 방향은 픽셀에 반영하고 메타데이터(GPS 등)는 싣지 않는다.
+    """
+    sizes = sorted(RENDITIONS.items(), key=lambda item: item[1][0], reverse=True)
+    largest = sizes[0][1][0]
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as original:
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    renditions = {}
+    for name, (max_side, quality) in sizes:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=quality, method=4)
+        renditions[name] = buffer.getvalue()
+    return renditions
@@ -0,0 +1,201 @@
+import os
+import re
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from tracing import current_trace_id
+
+# 로그 레코드 기본 속성 - 이 외의 속성은 extra로 넘긴 구조화 필드로 취급한다
+_RESERVED_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+# 값을 가릴 필드명 (대소문자 무시) - total_tokens 같은 사용량 필드는 가리지 않도록 token은 정확히 맞춘다
+_REDACT_KEY = re.compile(r"(?i)password|secret|api_?key|authorization|credential|(^|_)token$")
+REDACTED = "***"
+
+# 메시지 본문에 섞여 들어온 비밀값 패턴 (Bearer 토큰, JWT, OpenAI 키)
+_SECRET_PATTERNS = (
+    re.compile(r"(?i)(bearer\s+)[A-Za-z0-9._~+/=-]+"),
+    re.compile(r"eyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+"),
+    re.compile(r"sk-[A-Za-z0-9_-]{10,}"),
+)
+
+
+def redact_text(text: str) -> str:
+    for pattern in _SECRET_PATTERNS:
+        text = pattern.sub(lambda m: (m.group(1) if m.groups() else "") + REDACTED, text)
+    return text
+
+
+def redact_value(key: str, value: Any) -> Any:
+    """필드명이 비밀값을 가리키면 가리고, dict/list는 재귀적으로 처리"""
+    if _REDACT_KEY.search(key):
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: redact_value(str(k), v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact_value(key, v) for v in value]
+    if isinstance(value, str):
+        return redact_text(value)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄짜리 JSON 로그 (ts, level, logger, msg + extra 필드), 비밀값은 가린다"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact_text(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = redact_value(key, value)
+        if record.exc_info:
+            entry["exc"] = redact_text(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """로컬 개발용 사람이 읽기 쉬운 형식 - extra 필드는 key=value로 덧붙인다"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(
+            f"{key}={redact_value(key, value)}" for key, value in record.__dict__.items()
+            if key not in _RESERVED_ATTRS and not key.startswith("_")
+        )
+        line = f"{datetime.fromtimestamp(record.created).strftime('%H:%M:%S')} {record.levelname:<7} " \
+               f"{record.name}: {redact_text(record.getMessage())}"
+        if fields:
+            line = f"{line} | {fields}"
+        if record.exc_info:
+            line = f"{line}\n{redact_text(self.formatException(record.exc_info))}"
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """로거별 샘플링 - WARNING 미만 레코드만 지정 비율로 통과시킨다 (경고/오류는 항상 기록)
+
+    rates: {"auth": 0.01, "database": 0.1} - 로거 이름 또는 상위 이름(점 구분)으로 찾는다
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: Dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split(".")
+            for i in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:i])
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class TraceContextFilter(logging.Filter):
+    """요청 스레드에서 현재 추적 ID를 레코드에 붙인다 (리스너 스레드에서는 컨텍스트를 알 수 없으므로)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace_id = current_trace_id()
+        if trace_id is not None:
+            record.trace_id = trace_id
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """요청 경로에서는 레코드를 큐에 넣기만 한다
+
+    기본 QueueHandler와 달리 prepare()에서 메시지 포맷을 하지 않고 (스레드 큐라 피클링이 필요 없다)
+    큐가 가득 차면 기다리지 않고 버린 뒤 개수만 센다. 포맷/리다크션/출력은 리스너 스레드가 맡는다.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """"auth=0.01,database=0.1" 형식의 로거별 샘플링 비율 파싱"""
+    rates = {}
+    for item in (value or "").split(","):
+        name, sep, rate = item.strip().partition("=")
+        if sep and name:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def setup_logging():
+    """루트 로거에 큐 핸들러를 연결하고 백그라운드 리스너 스레드를 시작 (여러 번 호출해도 한 번만 적용)
+
+    환경변수: LOG_LEVEL(기본 INFO), LOG_FORMAT(json/text, 기본 json),
+    LOG_SAMPLE_RATES(로거별 샘플링 비율), LOG_QUEUE_SIZE(기본 10000)
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(TraceContextFilter())
+    rates = parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+    if rates:
+        _queue_handler.addFilter(SamplingFilter(rates))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if os.getenv("LOG_FORMAT", "json").lower() == "text" else JsonFormatter())
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """남은 로그를 모두 출력하고 리스너 스레드 종료"""
+    global _listener
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        if _queue_handler is not None and _queue_handler.dropped:
+            print(f"⚠️ 로그 큐가 가득 차 {_queue_handler.dropped}건을 버렸습니다.", file=sys.stderr)
+
+
+def dropped_log_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
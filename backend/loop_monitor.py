@@ -0,0 +1,172 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _format_frame(frame: traceback.FrameSummary) -> str:
+    filename = frame.filename
+    if filename.startswith(BACKEND_DIR):
+        filename = os.path.relpath(filename, BACKEND_DIR)
+    return f"{filename}:{frame.lineno} ({frame.name})"
+
+
+def _call_site(stack: List[traceback.FrameSummary]) -> Optional[str]:
+    """스택에서 가장 안쪽의 애플리케이션 코드 위치 (라이브러리 내부가 아닌 우리 코드 중 블로킹을 부른 곳)"""
+    for frame in reversed(stack):
+        if (frame.filename.startswith(BACKEND_DIR) and frame.filename != __file__
+                and "site-packages" not in frame.filename):
+            return _format_frame(frame)
+    return None
+
+
+class LoopLagMonitor:
+    """이벤트 루프 지연 감시
+
+    - 루프 안의 틱 코루틴이 interval마다 깨어나 예정 시각과의 차이(스케줄링 지연)를 기록한다
+    - 별도 감시 스레드는 틱이 threshold 이상 멈추면 그 순간 루프 스레드의 스택을 잡아 둔다
+    - 루프가 풀려 틱이 돌아오면 전체 지연 시간과 잡아 둔 스택(호출 위치)을 함께 로그/통계에 남긴다
+    """
+
+    def __init__(self, interval: float, threshold: float, window: int = 3000, max_reports: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=max_reports)
+        self.blocked_total = 0
+        self.max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._beat = 0
+        self._capture: Optional[Dict[str, Any]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._stop.clear()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("이벤트 루프 감시 시작", extra={
+            "interval_ms": self.interval * 1000, "threshold_ms": self.threshold * 1000,
+        })
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _tick(self):
+        while True:
+            self._beat += 1
+            self._heartbeat = time.monotonic()
+            expected = self._heartbeat + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - expected)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            metrics.event_loop_lag_seconds.observe(lag)
+            if lag >= self.threshold:
+                self._report(lag)
+
+    def _watch(self):
+        """감시 스레드 - 틱이 멈춘 동안 한 번만 스택을 잡는다"""
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled < self.threshold or (self._capture is not None and self._capture["beat"] == beat):
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)[-40:]
+            self._capture = {"beat": beat, "stalled": stalled, "stack": stack}
+
+    def _report(self, lag: float):
+        capture = self._capture
+        if capture is not None and capture["beat"] != self._beat:
+            capture = None
+        self._capture = None
+
+        stack = capture["stack"] if capture else []
+        report = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "lag_ms": round(lag * 1000, 1),
+            "call_site": _call_site(stack),
+            "blocking_frame": _format_frame(stack[-1]) if stack else None,
+            "stack": [f"{f.filename}:{f.lineno} in {f.name}" for f in stack],
+        }
+        self.blocked_total += 1
+        self.reports.append(report)
+        metrics.event_loop_blocked_total.inc()
+        logger.warning("이벤트 루프 블로킹 감지", extra={
+            "lag_ms": report["lag_ms"], "call_site": report["call_site"],
+            "blocking_frame": report["blocking_frame"],
+            "stack": "".join(traceback.format_list(stack[-15:])) if stack else None,
+        })
+
+    def stats(self, include_reports: bool = False) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def ms(q: float) -> Optional[float]:
+            value = _percentile(ordered, q)
+            return round(value * 1000, 2) if value is not None else None
+
+        stats = {
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "samples": len(ordered),
+            "lag_p50_ms": ms(0.5),
+            "lag_p95_ms": ms(0.95),
+            "lag_p99_ms": ms(0.99),
+            "lag_max_ms": round(self.max_lag * 1000, 2),
+            "blocked_total": self.blocked_total,
+        }
+        if include_reports:
+            stats["recent_blocks"] = list(self.reports)[::-1]
+        return stats
+
+
+# 전역 루프 감시기
+loop_monitor = None
+
+def get_loop_monitor() -> LoopLagMonitor:
+    global loop_monitor
+    if loop_monitor is None:
+        loop_monitor = LoopLagMonitor(
+            interval=float(os.getenv("LOOP_LAG_INTERVAL", "0.1")),
+            threshold=float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.1")),
+        )
+    return loop_monitor
@@ -1,26 +1,81 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Form, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, FileResponse
 from fastapi.security import HTTPBearer
 from fastapi.staticfiles import StaticFiles
 import os
 import base64
+import uuid
 from PIL import Image
 import io
 import json
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional
+from typing import Awaitable, BinaryIO, Callable, List, Dict, Optional, Tuple
 import pandas as pd
-from openai import OpenAI
 from dotenv import load_dotenv
-from auth import get_auth_manager, get_current_active_user, create_beta_testers
+from auth import get_auth_manager, get_current_active_user, get_current_admin_user, is_admin, create_beta_testers
 from database import get_db_manager
 from file_storage import get_file_storage_manager
+from resilience import get_model_caller, CircuitOpenError, ModelCallError
+from admission import get_admission_controller, estimate_request_tokens, AdmissionRejected, AdmissionTimeout
+from scheduler import get_scheduler, tenant_for_user, LANES, INTERACTIVE
+from image_pipeline import prepare_image, RENDITIONS
+from model_backend import get_model_backend
+import metrics
+from metrics import stage_timer, observe_stage, start_request_timings, timings_ms, server_timing_header
+import time
+import logging
+from logging_config import setup_logging
+from tracing import TracingMiddleware
+from loop_monitor import get_loop_monitor
+from profiler import SamplingProfiler, ProfilingMiddleware, get_profile_store, profile_lock
+import memory_tracker
+from session_cache import get_session_cache, make_etag
+from artifact_manifest import (get_artifact_manifest, image_file_type, rendition_file_type,
+                               IMAGE_FILE_TYPE_PREFIX, RESULT_FILE_TYPES)
+from downloads import artifact_response
+from retention import get_retention_engine
+from tiering import get_tiering_engine, decompress_member
+from storage_backend import get_storage_backend
+from direct_upload import get_direct_upload_manager, DirectUploadRequest
+import asyncio
+from contextlib import asynccontextmanager
 
 # 환경변수 로드
 load_dotenv()
 
-app = FastAPI(title="AI Safety Assessment API", version="1.0.0")
+# 구조화 로그 (백그라운드 큐로 출력해 요청 경로에서 stdout I/O를 하지 않는다)
+setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 시작/종료 시 백그라운드 작업 관리"""
+    # 이벤트 루프 지연 감시 (블로킹 호출 위치를 로그와 /system/loop로 보고)
+    loop_monitor = get_loop_monitor()
+    if os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true":
+        loop_monitor.start()
+    # 단계별 메모리 피크 추적 (tracemalloc, opt-in - /admin/memory/start로 실행 중에도 켤 수 있음)
+    if os.getenv("MEMORY_TRACKING", "false").lower() == "true":
+        memory_tracker.start(int(os.getenv("MEMORY_TRACKING_FRAMES", "1")))
+    # 저장 파일 보존 기간 정리 (파일 삭제가 일어나므로 opt-in)
+    retention_engine = get_retention_engine()
+    if os.getenv("RETENTION_ENABLED", "false").lower() == "true":
+        retention_engine.start()
+    # 오래된 사진 재압축/결과 파일 아카이브 (원본을 바꾸므로 opt-in)
+    tiering_engine = get_tiering_engine()
+    if os.getenv("TIERING_ENABLED", "false").lower() == "true":
+        tiering_engine.start()
+    yield
+    await tiering_engine.stop()
+    await retention_engine.stop()
+    # 남은 축소본 작업을 마친 뒤 저장 백엔드 연결을 닫는다
+    await get_file_storage_manager().close()
+    await get_storage_backend().close()
+    get_scheduler().close()
+    await loop_monitor.stop()
+
+app = FastAPI(title="AI Safety Assessment API", version="1.0.0", lifespan=lifespan)
 
 # CORS 설정 (외부 접속 허용)
 app.add_middleware(
@@ -31,18 +86,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 요청 추적 (X-Trace-Id 헤더, TRACE_SAMPLE_RATE 비율로 traces/spans.jsonl에 기록)
+app.add_middleware(TracingMiddleware, exclude_paths=("/metrics", "/ping", "/status", "/health"))
+
+# 요청 단위 CPU 프로파일링 (X-Profile: <PROFILE_TOKEN> 헤더가 붙은 요청만, 토큰 미설정 시 미들웨어 자체를 등록하지 않음)
+if os.getenv("PROFILE_TOKEN"):
+    app.add_middleware(
+        ProfilingMiddleware,
+        token=os.getenv("PROFILE_TOKEN"),
+        interval=float(os.getenv("PROFILE_INTERVAL_MS", "2")) / 1000,
+        fmt=os.getenv("PROFILE_FORMAT", "speedscope"),
+        store=get_profile_store(),
+    )
+
 # 정적 파일 서빙 설정
 frontend_path = os.path.join(os.path.dirname(__file__), "..", "frontend")
 if os.path.exists(frontend_path):
     app.mount("/static", StaticFiles(directory=frontend_path), name="static")
 
-# OpenAI 클라이언트 초기화
-def get_openai_client():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API 키가 설정되지 않았습니다.")
-    return OpenAI(api_key=api_key)
-
 # 기본 체크리스트 생성
 def create_default_checklist():
     checklist_data = {
@@ -175,7 +236,7 @@ def markdown_table_to_inner_html(markdown_text: str) -> str:
 
 # 이미지 분석 수행
 async def analyze_images_with_openai(images: List[Image.Image], image_names: List[str]) -> Dict:
-    client = get_openai_client()
+    backend = get_model_backend()
     
     # 체크리스트 로드
     checklist_df = create_default_checklist()
@@ -245,61 +306,131 @@ async def analyze_images_with_openai(images: List[Image.Image], image_names: Lis
 총 이미지 수: {len(images)}장
 """
     
-    # 이미지들을 base64로 인코딩
+    # 이미지들을 base64로 인코딩 (JPEG 인코딩도 전처리 스레드 풀에서)
     image_contents = []
-    for image in images:
-        base64_image = encode_image_to_base64(image)
-        image_contents.append({
-            "type": "image_url",
-            "image_url": {
-                "url": f"data:image/jpeg;base64,{base64_image}"
-            }
-        })
+    with stage_timer("encode"):
+        encoded = await get_scheduler().run_in_executor(
+            lambda: [encode_image_to_base64(image) for image in images])
+        for base64_image in encoded:
+            image_contents.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{base64_image}"
+                }
+            })
     
-    # OpenAI API 호출
+    # OpenAI API 호출 (시도별 데드라인, 재시도, 서킷 브레이커, 헤징 적용)
+    model_name = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+    max_tokens = 4000
+    caller = get_model_caller()
+    admission = get_admission_controller()
+    logger.info("모델 호출 시작", extra={
+        "model": model_name, "backend": backend.name,
+        "prompt_chars": len(prompt), "image_count": len(image_contents),
+    })
+
+    # RPM/TPM 예산 확보 (예산이 없으면 대기열에서 대기)
+    estimated_tokens = estimate_request_tokens(prompt, [image.size for image in images], max_tokens)
     try:
-        model_name = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
-        print(f"🤖 OpenAI API 호출 시작 - 모델: {model_name}")
-        print(f"📝 프롬프트 길이: {len(prompt)} 문자")
-        print(f"🖼️ 이미지 수: {len(image_contents)}장")
-        
-        response = client.chat.completions.create(
-            model=model_name,  # 환경변수에서 가져온 모델명 사용
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        *image_contents
-                    ]
-                }
-            ],
-            max_tokens=4000,
-            temperature=0.3
+        first_ticket = await admission.acquire(estimated_tokens)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail="분석 요청이 많아 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
         )
-        
-        print(f"✅ OpenAI API 응답 성공")
-        
-        analysis_result = response.choices[0].message.content
+    except AdmissionTimeout as e:
+        raise HTTPException(status_code=503, detail=f"분석 대기시간이 초과되었습니다. ({e})")
+
+    observe_stage("admission_wait", first_ticket.waited)
+    prepaid = [first_ticket]
+    tickets = []
+
+    async def call_model():
+        # 공급자 요청마다 예산을 차감한다 - 첫 요청은 위에서 확보한 예산, 재시도/헤징 요청은 각자 새로 확보
+        ticket = prepaid.pop() if prepaid else await admission.acquire(estimated_tokens)
+        tickets.append(ticket)
+        actual_tokens = None
+        try:
+            result = await backend.complete(
+                model=model_name,  # 환경변수에서 가져온 모델명 사용
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            *image_contents
+                        ]
+                    }
+                ],
+                max_tokens=max_tokens,
+                temperature=0.3,
+                timeout=caller.attempt_timeout
+            )
+            actual_tokens = result.total_tokens
+            return result
+        finally:
+            # 실패하거나 취소된 요청(진 헤징 요청)은 추정치를 그대로 차감한 채로 둔다
+            admission.release(ticket, actual_tokens)
+
+    try:
+        with stage_timer("model_call"):
+            response, call_stats = await caller.call(call_model)
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"OpenAI API가 일시적으로 불안정합니다. 잠시 후 다시 시도해주세요. ({e})",
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
+    except ModelCallError as e:
+        if isinstance(e.__cause__, (AdmissionRejected, AdmissionTimeout)):
+            # 재시도 요청이 예산을 확보하지 못함
+            raise HTTPException(status_code=503, detail=f"분석 대기시간이 초과되었습니다. ({e})")
+        status_code = 503 if e.retryable else 502
+        raise HTTPException(
+            status_code=status_code,
+            detail=f"OpenAI API 호출 중 오류 발생 (시도 {e.stats['attempts']}회): {str(e)}"
+        )
+    finally:
+        # 한 번도 쓰지 못한 예산(첫 시도 전 서킷 브레이커 거부 등)은 돌려준다
+        for ticket in prepaid:
+            admission.release(ticket, 0)
+
+    call_stats["admission_wait_ms"] = round(sum(ticket.waited for ticket in tickets) * 1000, 1)
+    call_stats["provider_requests"] = len(tickets)
+    call_stats["estimated_tokens"] = estimated_tokens
+    call_stats["total_tokens"] = response.total_tokens
+    call_stats["backend"] = backend.name
+    if response.ttft_ms is not None:
+        call_stats["ttft_ms"] = response.ttft_ms
+
+    metrics.record_model_usage(response.prompt_tokens, response.completion_tokens,
+                               call_stats["retries"], call_stats["hedges"])
+    logger.info("모델 호출 성공", extra={"model_call": call_stats})
+
+    try:
+        analysis_result = response.content
         
         # 결과 파싱 및 표 변환
-        sections_raw = parse_analysis_sections(analysis_result)
-        sections = {
-            "risk_analysis": markdown_table_to_inner_html(sections_raw.get("risk_analysis", "")),
-            "sgr_checklist": markdown_table_to_inner_html(sections_raw.get("sgr_checklist", "")),
-            "recommendations": sections_raw.get("recommendations", "")
-        }
+        with stage_timer("parse"):
+            sections_raw = parse_analysis_sections(analysis_result)
+            sections = {
+                "risk_analysis": markdown_table_to_inner_html(sections_raw.get("risk_analysis", "")),
+                "sgr_checklist": markdown_table_to_inner_html(sections_raw.get("sgr_checklist", "")),
+                "recommendations": sections_raw.get("recommendations", "")
+            }
         
         return {
             "image_names": image_names,
             "image_count": len(images),
             "full_report": analysis_result,
             "sections": sections,
+            "model_call": call_stats,
             "timestamp": datetime.now(timezone(timedelta(hours=9))).strftime("%Y-%m-%d %H:%M:%S")
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OpenAI API 호출 중 오류 발생: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"OpenAI API 응답 처리 중 오류 발생: {str(e)}")
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -338,93 +469,216 @@ async def root():
     """루트 경로 - Railway 헬스체크용"""
     return {"message": "AI Safety Assessment API is running"}
 
+def _prepare_images(sources: List[Tuple[str, BinaryIO]]) -> Tuple[List[Image.Image], List[str]]:
+    """이미지 로드 및 크기 조정 - 열 수 없는 파일은 건너뛴다 (전처리 스레드 풀에서 실행)"""
+    images = []
+    image_names = []
+    for filename, source in sources:
+        try:
+            image = prepare_image(source)
+            images.append(image)
+            image_names.append(filename)
+            logger.debug("이미지 로드 성공", extra={"image_name": filename, "size": image.size})
+        except Exception as img_error:
+            logger.warning("이미지 로드 실패", extra={"image_name": filename, "error": str(img_error)})
+    return images, image_names
+
+async def _run_analysis(
+    response: Response,
+    current_user: dict,
+    priority: str,
+    ingest: Callable[[asyncio.Event], Awaitable[Tuple[str, List[Tuple[str, BinaryIO]]]]]
+) -> Dict:
+    """/analyze와 직접 업로드 finalize가 함께 쓰는 분석 경로 (스케줄링 → 전처리 → 모델 호출 → 저장)
+
+    ingest(renditions_after)는 세션을 준비하고 (세션 ID, [(파일명, 이미지 파일 객체)])를 반환한다 - 이 시간도 단계별 시간에 포함된다.
+    축소본 생성은 renditions_after가 설정될 때(모델 호출 직전, 실패 시 종료 시점)까지 미뤄 전처리를 늦추지 않는다.
+    """
+    metrics.analyses_in_flight.inc()
+    # 단계별 소요 시간 - Server-Timing 헤더와 응답/저장 결과의 timings로 내보낸다
+    request_started = time.perf_counter()
+    timings = start_request_timings()
+    memory_peaks = memory_tracker.start_request()
+    renditions_after = asyncio.Event()
+    try:
+        file_storage = get_file_storage_manager()
+        
+        # 세션 생성과 이미지 저장(또는 직접 업로드 확인)
+        session_id, sources = await ingest(renditions_after)
+        
+        # 조직별 공정 큐잉 + 레인별 동시 실행 한도 (대량 제출이 실시간 점검을 굶기지 않도록)
+        scheduler = get_scheduler()
+        async with scheduler.slot(priority, tenant_for_user(current_user), cost=len(sources)) as queue_wait:
+            observe_stage("queue_wait", queue_wait)
+            # 이미지 로드 및 분석 준비 (디코딩/축소는 스케줄러의 전처리 스레드 풀에서)
+            with stage_timer("preprocess"):
+                images, image_names = await scheduler.run_in_executor(_prepare_images, sources)
+            
+            if not images:
+                raise HTTPException(status_code=400, detail="유효한 이미지 파일이 없습니다.")
+            
+            # AI 분석 수행 - 모델 응답을 기다리는 동안 축소본을 만든다
+            renditions_after.set()
+            result = await analyze_images_with_openai(images, image_names)
+        
+        # 분석 결과에 세션 정보 추가
+        result["session_id"] = session_id
+        result["scheduler"] = {"lane": priority, "queue_wait_ms": round(queue_wait * 1000, 1)}
+        result["user_id"] = current_user["id"]
+        # 저장 시점까지의 단계별 시간을 세션과 함께 남겨 느린 세션을 사후에 진단할 수 있게 한다
+        result["timings"] = {**timings_ms(timings), "total": round((time.perf_counter() - request_started) * 1000, 1)}
+        
+        # 분석 결과 파일들 저장
+        with stage_timer("persist"):
+            await file_storage.save_analysis_results(
+                session_id=session_id,
+                user_id=current_user["id"],
+                analysis_result=result
+            )
+        
+        timings["total"] = time.perf_counter() - request_started
+        result = {**result, "timings": timings_ms(timings)}
+        if memory_peaks is not None:
+            result["memory_peak_kib"] = memory_tracker.peaks_kib(memory_peaks)
+        response.headers["Server-Timing"] = server_timing_header(timings)
+        metrics.analyze_requests_total.labels("ok").inc()
+        logger.info("분석 완료", extra={
+            "session_id": session_id, "user_id": current_user["id"],
+            "image_count": len(images), "timings_ms": result["timings"],
+        })
+        return result
+        
+    except HTTPException as e:
+        metrics.analyze_requests_total.labels(str(e.status_code)).inc()
+        timings["total"] = time.perf_counter() - request_started
+        e.headers = {**(e.headers or {}), "Server-Timing": server_timing_header(timings)}
+        raise
+    except Exception as e:
+        metrics.analyze_requests_total.labels("500").inc()
+        logger.exception("이미지 분석 중 오류", extra={"user_id": current_user["id"]})
+        timings["total"] = time.perf_counter() - request_started
+        raise HTTPException(
+            status_code=500,
+            detail=f"이미지 분석 중 오류 발생: {str(e)}",
+            headers={"Server-Timing": server_timing_header(timings)}
+        )
+    finally:
+        renditions_after.set()
+        metrics.analyses_in_flight.dec()
+
 @app.post("/analyze")
 async def analyze_images(
+    response: Response,
     files: List[UploadFile] = File(...),
     session_name: str = Form("분석 세션"),
+    priority: str = Form(INTERACTIVE),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """이미지 분석 API (인증 필요)"""
+    """이미지 분석 API (인증 필요)
+
+    priority: "interactive"(실시간 점검, 기본값) 또는 "bulk"(일괄/백그라운드 제출)
+    """
     if not files:
         raise HTTPException(status_code=400, detail="업로드된 파일이 없습니다.")
+    if priority not in LANES:
+        raise HTTPException(status_code=400, detail=f"priority는 {', '.join(LANES)} 중 하나여야 합니다.")
     
-    try:
-        # 데이터베이스 및 파일 저장 매니저 초기화
+    async def ingest(renditions_after: asyncio.Event):
         db_manager = get_db_manager()
         file_storage = get_file_storage_manager()
         
         # 분석 세션 생성
-        session = await db_manager.create_analysis_session(
-            user_id=current_user["id"],
-            session_name=session_name,
-            image_count=len(files)
-        )
-        session_id = session["id"]
+        with stage_timer("session_create"):
+            session = await db_manager.create_analysis_session(
+                user_id=current_user["id"],
+                session_name=session_name,
+                image_count=len(files)
+            )
         
         # 이미지 파일들 저장
-        saved_images = await file_storage.save_uploaded_images(
-            session_id=session_id,
-            user_id=current_user["id"],
-            files=files
-        )
-        
-        # 이미지 로드 및 분석 준비
-        images = []
-        image_names = []
-        
-        for file in files:
-            if not file.content_type.startswith('image/'):
-                continue
-                
-            try:
-                # 이미지 로드 (file.file을 직접 사용)
-                image = Image.open(file.file)
-                
-                # 이미지 크기 조정 (API 제한 고려)
-                max_size = 1024
-                if max(image.size) > max_size:
-                    ratio = max_size / max(image.size)
-                    new_size = tuple(int(dim * ratio) for dim in image.size)
-                    image = image.resize(new_size, Image.Resampling.LANCZOS)
-                
-                images.append(image)
-                image_names.append(file.filename)
-                print(f"이미지 로드 성공: {file.filename}, 크기: {image.size}")
-                
-            except Exception as img_error:
-                print(f"이미지 로드 실패: {file.filename}, 오류: {img_error}")
-                continue
-        
-        if not images:
-            raise HTTPException(status_code=400, detail="유효한 이미지 파일이 없습니다.")
-        
-        # AI 분석 수행
-        print(f"🔍 AI 분석 시작: {len(images)}장의 이미지")
-        result = await analyze_images_with_openai(images, image_names)
-        print(f"✅ AI 분석 완료: {result.get('timestamp', 'N/A')}")
-        
-        # 분석 결과에 세션 정보 추가
-        result["session_id"] = session_id
-        result["user_id"] = current_user["id"]
-        
-        # 분석 결과 파일들 저장
-        await file_storage.save_analysis_results(
-            session_id=session_id,
-            user_id=current_user["id"],
-            analysis_result=result
-        )
-        
-        return result
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"이미지 분석 중 오류 발생: {str(e)}")
+        with stage_timer("image_save"):
+            await file_storage.save_uploaded_images(
+                session_id=session["id"],
+                user_id=current_user["id"],
+                files=files,
+                renditions_after=renditions_after
+            )
+        return session["id"], [(file.filename, file.file) for file in files if file.content_type.startswith('image/')]
+    
+    return await _run_analysis(response, current_user, priority, ingest)
+
+@app.post("/uploads")
+async def create_direct_upload(
+    upload_request: DirectUploadRequest,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """직접 업로드 세션 생성 - 파일별 presigned PUT URL 발급 (STORAGE_BACKEND=s3)
+
+    files: [{filename, content_type, size, sha256}]. 각 URL로 Content-Type(과 Content-Length)을 선언한 값 그대로
+    보내 업로드한 뒤 POST /uploads/{session_id}/finalize를 호출한다.
+    """
+    return await get_direct_upload_manager().create(current_user, upload_request)
+
+@app.post("/uploads/{session_id}/urls")
+async def refresh_direct_upload_urls(
+    session_id: str,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """아직 확인되지 않은 사진의 업로드 URL 재발급 - 응답은 POST /uploads와 같다
+
+    URL이 만료된 뒤 이어 올릴 때 쓴다. 업로드 대기 중인 본인 세션만 가능하며(아니면 404/409),
+    DIRECT_UPLOAD_EXPIRE_HOURS가 지난 세션은 410이다.
+    """
+    try:
+        session_id = str(uuid.UUID(session_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+    return await get_direct_upload_manager().refresh_urls(session_id, current_user)
+
+@app.post("/uploads/{session_id}/finalize")
+async def finalize_direct_upload(
+    session_id: str,
+    response: Response,
+    priority: str = Query(INTERACTIVE),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """직접 업로드 확인(크기/SHA-256) 후 분석 시작 - 응답은 /analyze와 같다
+
+    업로드가 빠졌거나 내용이 다르면 400(missing/mismatched 이미지 ID)을 돌려주며, 다시 올린 뒤 재시도할 수 있다.
+    """
+    if priority not in LANES:
+        raise HTTPException(status_code=400, detail=f"priority는 {', '.join(LANES)} 중 하나여야 합니다.")
+    try:
+        session_id = str(uuid.UUID(session_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+    
+    direct_uploads = get_direct_upload_manager()
+    verified = False
+    
+    async def ingest(renditions_after: asyncio.Event):
+        nonlocal verified
+        with stage_timer("upload_verify"):
+            sources = await direct_uploads.finalize(session_id, current_user, renditions_after)
+        verified = True
+        return session_id, sources
+    
+    try:
+        return await _run_analysis(response, current_user, priority, ingest)
+    except BaseException:
+        # 확인 이후(모델 호출 등)에 실패하면 다시 finalize할 수 있게 업로드 대기로 돌린다 (확인 실패는 finalize가 직접 되돌림)
+        if verified:
+            await direct_uploads.release(session_id)
+        raise
 
 # 인증 관련 API 엔드포인트들
 @app.post("/auth/login")
 async def login(username: str = Form(...), password: str = Form(...)):
     """사용자 로그인"""
     auth_manager = get_auth_manager()
+    login_started = time.perf_counter()
     user = await auth_manager.authenticate_user(username, password)
+    metrics.login_seconds.labels("ok" if user else "rejected").observe(time.perf_counter() - login_started)
     
     if not user:
         raise HTTPException(
@@ -492,12 +746,187 @@ async def get_current_user_info(current_user: dict = Depends(get_current_active_
         "role": current_user.get("role", "beta_tester")
     }
 
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 헤더가 etag와 일치하는지 (약한 비교, 목록/와일드카드 지원)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def json_response_with_etag(request: Request, payload: Dict, cache_control: str = "private, no-cache") -> Response:
+    """본문 해시로 ETag를 붙인 JSON 응답 - 클라이언트가 같은 ETag를 보내면 본문 없이 304"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json_bytes_response(request, body, make_etag(body), cache_control)
+
+
+def json_bytes_response(request: Request, body: bytes, etag: str, cache_control: str = "private, no-cache") -> Response:
+    """이미 직렬화된 JSON 본문을 그대로 응답 (If-None-Match 일치 시 304)"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/auth/sessions")
-async def get_user_sessions(current_user: dict = Depends(get_current_active_user)):
-    """사용자의 분석 세션 목록 조회"""
+async def get_user_sessions(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=200),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """사용자의 분석 세션 목록 조회 (최신순 키셋 페이지네이션 - 다음 페이지는 next_cursor로 요청)"""
     file_storage = get_file_storage_manager()
-    sessions = await file_storage.get_user_files(current_user["id"])
-    return sessions
+    try:
+        sessions = await file_storage.get_user_files(current_user["id"], limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response_with_etag(request, sessions)
+
+@app.get("/sessions/{session_id}")
+async def get_session_detail(
+    session_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """지난 분석 세션 다시 열기 (본인 세션 또는 관리자)
+
+    직렬화된 응답 바이트를 메모리 LRU → 디스크 아티팩트 → DB 순으로 찾아 그대로 내려보낸다.
+    """
+    try:
+        session_id = str(uuid.UUID(session_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+    
+    try:
+        cached = await get_session_cache().get(session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"세션 조회 중 오류: {str(e)}")
+    # 다른 사용자의 세션은 존재 여부도 드러내지 않는다
+    if cached is None or (cached.owner_id != str(current_user["id"]) and not is_admin(current_user)):
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+    return json_bytes_response(request, cached.body, cached.etag)
+
+async def _owned_session_files(session_id: str, current_user: dict) -> Dict:
+    """세션 아티팩트 매니페스트 (본인 세션 또는 관리자만, 아니면 404)"""
+    try:
+        session_id = str(uuid.UUID(session_id))
+        files = await get_artifact_manifest().session_files(session_id)
+    except ValueError:
+        files = {}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"파일 정보 조회 중 오류: {str(e)}")
+    owners = {artifact.user_id for artifact in files.values()}
+    if not files or (owners != {str(current_user["id"])} and not is_admin(current_user)):
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+    return files
+
+async def _download_response(request: Request, artifact, disposition: str,
+                             cache_control: str = "private, max-age=86400") -> Response:
+    """매니페스트 값만으로 헤더를 만들어 파일을 보낸다 (If-None-Match → 304, Range → 206)
+
+    아카이브된 결과 파일은 해당 멤버의 압축 프레임만 읽어 풀고, ETag/크기는 원본 기준 그대로 둔다.
+    """
+    archived = artifact.archive_offset is not None
+    if archived:
+        extension = ".md" if (artifact.mime_type or "").startswith("text/markdown") else ".html"
+        filename = f"{artifact.file_type}_{artifact.session_id}{extension}"
+    else:
+        filename = artifact.path.name
+    etag = f'"{artifact.sha256[:32]}"' if artifact.sha256 else f'"{artifact.size:x}-{filename}"'
+    headers = {
+        "Cache-Control": cache_control,
+        "Content-Disposition": f'{disposition}; filename="{filename}"',
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+    backend = get_storage_backend()
+    manifest = get_artifact_manifest()
+    content = None
+    if archived:
+        try:
+            frame = await backend.read(str(artifact.path), artifact.archive_offset,
+                                       artifact.archive_offset + artifact.archive_length - 1)
+        except FileNotFoundError:
+            # 다른 인스턴스가 옮기거나 지운 파일일 수 있으므로 다음 요청은 매니페스트를 DB에서 다시 읽는다
+            manifest.forget(artifact.session_id)
+            raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+        content = await asyncio.to_thread(decompress_member, frame)
+    return artifact_response(str(artifact.path), artifact.size, etag, artifact.mime_type,
+                             request.headers.get("range"), request.headers.get("if-range"), headers,
+                             content, backend, lambda: manifest.forget(artifact.session_id))
+
+@app.get("/sessions/{session_id}/files")
+async def list_session_files(session_id: str, current_user: dict = Depends(get_current_active_user)):
+    """세션에 저장된 이미지/결과 파일 목록"""
+    files = await _owned_session_files(session_id, current_user)
+    listing = []
+    for file_type, artifact in files.items():
+        kind, _, image_id = file_type.partition(":")
+        if file_type.startswith(IMAGE_FILE_TYPE_PREFIX):
+            url = f"/sessions/{artifact.session_id}/images/{image_id}"
+        elif kind in RENDITIONS:
+            url = f"/sessions/{artifact.session_id}/images/{image_id}/{kind}"
+        else:
+            url = f"/sessions/{artifact.session_id}/results/{file_type}"
+        listing.append({"file_type": file_type, "size": artifact.size, "sha256": artifact.sha256,
+                        "mime_type": artifact.mime_type, "url": url})
+    return {"session_id": session_id, "files": listing}
+
+@app.api_route("/sessions/{session_id}/images/{image_id}", methods=["GET", "HEAD"])
+async def download_session_image(
+    session_id: str,
+    image_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """업로드한 원본 사진 내려받기 (Range / If-None-Match 지원)"""
+    files = await _owned_session_files(session_id, current_user)
+    artifact = files.get(image_file_type(image_id))
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    return await _download_response(request, artifact, "inline")
+
+@app.api_route("/sessions/{session_id}/images/{image_id}/{rendition}", methods=["GET", "HEAD"])
+async def download_session_image_rendition(
+    session_id: str,
+    image_id: str,
+    rendition: str,
+    request: Request,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """업로드 사진의 WebP 축소본 (thumb: 목록/갤러리, preview: 상세 화면)
+
+    축소본은 저장 후 바뀌지 않으므로 브라우저가 재검증 없이 1년간 캐시하도록 immutable로 내려보낸다.
+    """
+    if rendition not in RENDITIONS:
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    files = await _owned_session_files(session_id, current_user)
+    artifact = files.get(rendition_file_type(image_id, rendition))
+    if artifact is None and image_file_type(image_id) in files:
+        # 축소본은 업로드 후 백그라운드로 기록되므로, 그 전에 읽어 둔 매니페스트라면 한 번 다시 읽는다
+        get_artifact_manifest().forget(files[image_file_type(image_id)].session_id)
+        files = await _owned_session_files(session_id, current_user)
+        artifact = files.get(rendition_file_type(image_id, rendition))
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    return await _download_response(request, artifact, "inline", "private, max-age=31536000, immutable")
+
+@app.api_route("/sessions/{session_id}/results/{file_type}", methods=["GET", "HEAD"])
+async def download_session_result(
+    session_id: str,
+    file_type: str,
+    request: Request,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """분석 결과 파일 내려받기 (full_report, risk_analysis, sgr_checklist, recommendations)"""
+    if file_type not in RESULT_FILE_TYPES:
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    files = await _owned_session_files(session_id, current_user)
+    artifact = files.get(file_type)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    return await _download_response(request, artifact, "attachment")
 
 # 피드백 관련 API
 @app.post("/feedback/{session_id}")
@@ -510,11 +939,17 @@ async def submit_feedback(
     """분석 세션에 대한 피드백 제출"""
     if not 1 <= rating <= 5:
         raise HTTPException(status_code=400, detail="평점은 1-5 사이여야 합니다.")
+    # 세션 캐시 키(get_session_detail)와 같은 표기로 맞춘다 - 대문자/중괄호 UUID도 DB에서는 같은 세션이다
+    try:
+        session_id = str(uuid.UUID(session_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
     
     db_manager = get_db_manager()
     
     try:
         await db_manager.save_feedback(session_id, feedback, rating)
+        get_session_cache().invalidate(session_id)
         return {"message": "피드백이 성공적으로 저장되었습니다."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"피드백 저장 중 오류: {str(e)}")
@@ -541,6 +976,142 @@ async def get_app_js():
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="JavaScript file not found")
 
+@app.get("/system/admission")
+async def admission_status():
+    """모델 호출 진입 제어 상태 (대기열 길이, 대기시간, 남은 RPM/TPM 예산)"""
+    return get_admission_controller().stats()
+
+@app.get("/system/scheduler")
+async def scheduler_status():
+    """분석 스케줄러 레인별 상태 (실행 중/대기 수, 대기시간 분포)"""
+    return get_scheduler().stats()
+
+@app.get("/system/loop")
+async def loop_status():
+    """이벤트 루프 지연 백분위수와 블로킹 횟수 (스택은 /admin/loop)"""
+    return get_loop_monitor().stats()
+
+@app.get("/admin/loop")
+async def loop_status_with_reports(current_user: dict = Depends(get_current_admin_user)):
+    """이벤트 루프 지연 통계와 최근 블로킹 호출 위치/스택 (관리자 전용 - 서버 파일 경로가 포함됨)"""
+    return get_loop_monitor().stats(include_reports=True)
+
+@app.post("/admin/profile")
+async def profile_cpu(
+    seconds: float = 10,
+    format: str = "speedscope",
+    interval_ms: float = 5,
+    include_idle: bool = False,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """프로세스 전체를 seconds초 동안 샘플링해 플레임그래프 파일로 반환 (관리자 전용)
+
+    format: "speedscope"(https://www.speedscope.app 에서 열기) 또는 "collapsed"(flamegraph.pl 입력 형식)
+    include_idle: 대기 중인 스레드(select, 락 대기 등) 샘플도 포함할지 여부
+    """
+    if format not in ("speedscope", "collapsed"):
+        raise HTTPException(status_code=400, detail="format은 speedscope 또는 collapsed여야 합니다.")
+    if not 0 < seconds <= 120 or not 1 <= interval_ms <= 100:
+        raise HTTPException(status_code=400, detail="seconds는 0~120, interval_ms는 1~100 사이여야 합니다.")
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="이미 프로파일링이 진행 중입니다.")
+    try:
+        profiler = SamplingProfiler(interval_ms / 1000, f"CPU {seconds:g}초 ({current_user['username']})",
+                                    include_idle=include_idle).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile = profiler.stop()
+    finally:
+        profile_lock.release()
+
+    body, content_type, extension = profile.render(format)
+    filename = f"cpu_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(content=body, media_type=content_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Samples": str(profile.sample_count),
+    })
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """X-Profile 헤더로 프로파일링한 요청의 결과 파일 (응답의 X-Profile-Id) 내려받기 (관리자 전용)"""
+    path = get_profile_store().find(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다.")
+    return FileResponse(path, filename=path.name)
+
+@app.get("/admin/retention")
+async def retention_status(current_user: dict = Depends(get_current_admin_user)):
+    """보존 기간 정책과 마지막 정리 보고서 (관리자 전용)"""
+    return get_retention_engine().stats()
+
+@app.post("/admin/retention/run")
+async def retention_run(
+    dry_run: bool = False,
+    days: Optional[int] = Query(None, ge=1),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """보존 기간 정리 즉시 실행 (dry_run=true면 삭제 없이 대상만 집계, days를 주면 모든 종류에 적용)"""
+    return await get_file_storage_manager().cleanup_old_files(days_old=days, dry_run=dry_run)
+
+@app.get("/admin/tiering")
+async def tiering_status(current_user: dict = Depends(get_current_admin_user)):
+    """저장소 계층화 설정과 마지막 실행 보고서 (관리자 전용)"""
+    return get_tiering_engine().stats()
+
+@app.post("/admin/tiering/run")
+async def tiering_run(current_user: dict = Depends(get_current_admin_user)):
+    """오래된 사진 재압축과 결과 파일 아카이브 즉시 실행"""
+    return await get_tiering_engine().run()
+
+@app.get("/admin/memory")
+async def memory_status(current_user: dict = Depends(get_current_admin_user)):
+    """추적 메모리/RSS와 /analyze 단계별 피크 할당 통계 (관리자 전용)"""
+    return memory_tracker.status()
+
+@app.post("/admin/memory/start")
+async def memory_start(frames: int = 1, current_user: dict = Depends(get_current_admin_user)):
+    """tracemalloc 추적 시작 (frames: 할당 위치별로 보관할 스택 깊이, 클수록 비용 증가)"""
+    if not 1 <= frames <= 25:
+        raise HTTPException(status_code=400, detail="frames는 1~25 사이여야 합니다.")
+    memory_tracker.start(frames)
+    return memory_tracker.status()
+
+@app.post("/admin/memory/stop")
+async def memory_stop(current_user: dict = Depends(get_current_admin_user)):
+    """tracemalloc 추적 중지 (추적 비용 제거, 누적 통계 초기화)"""
+    memory_tracker.stop()
+    return memory_tracker.status()
+
+@app.get("/admin/memory/snapshot")
+async def memory_snapshot(
+    limit: int = 25,
+    group_by: str = "lineno",
+    compare: bool = False,
+    baseline: bool = False,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """현재 상위 할당 위치 (관리자 전용)
+
+    group_by: lineno / filename / traceback, compare=true면 기준 스냅샷 대비 증가분,
+    baseline=true면 이번 스냅샷을 새 기준으로 저장
+    """
+    if not memory_tracker.is_tracking():
+        raise HTTPException(status_code=409, detail="메모리 추적이 꺼져 있습니다. /admin/memory/start로 먼저 켜세요.")
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by는 lineno, filename, traceback 중 하나여야 합니다.")
+    # 스냅샷은 수백 ms 걸릴 수 있으므로 이벤트 루프 밖에서 찍는다
+    allocations = await asyncio.to_thread(
+        memory_tracker.top_allocations, max(1, min(limit, 200)), group_by, compare, baseline
+    )
+    return {"status": memory_tracker.status(), "compared_to_baseline": compare, "top_allocations": allocations}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 스크레이프 엔드포인트"""
+    body, content_type = metrics.render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health")
 async def health_check():
     """헬스 체크 - Railway 배포용"""
@@ -0,0 +1,249 @@
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List
+from metrics import track_db_call
+from database import DatabaseManager, SESSION_LIST_COLUMNS, SESSION_DETAIL_COLUMNS, SCAN_BATCH_SIZE, _with_keys
+
+
+class InMemoryDatabaseManager:
+    """Supabase 없이 동작하는 메모리 기반 DatabaseManager 대체 구현 (부하 테스트/로컬 실험용)
+
+    DATABASE_BACKEND=memory 로 선택하며, DatabaseManager와 같은 메서드와 반환 형식을 가진다.
+    프로세스가 종료되면 데이터는 사라진다.
+    """
+
+    def __init__(self):
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.users_by_username: Dict[str, Dict[str, Any]] = {}
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.images: Dict[str, Dict[str, Any]] = {}
+        self.artifacts: Dict[tuple, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    async def create_tables(self):
+        print("메모리 DB는 테이블 생성이 필요하지 않습니다.")
+
+    @track_db_call
+    async def create_user(self, username: str, email: str, password_hash: str,
+                         full_name: str = None, organization: str = None) -> Dict[str, Any]:
+        """새 사용자 생성"""
+        if username in self.users_by_username:
+            raise Exception("사용자 생성 중 오류: duplicate key value violates unique constraint")
+        user = {
+            'id': str(uuid.uuid4()),
+            'username': username,
+            'email': email,
+            'password_hash': password_hash,
+            'full_name': full_name,
+            'organization': organization,
+            'role': 'beta_tester',
+            'is_active': True,
+            'created_at': self._now(),
+            'updated_at': self._now()
+        }
+        self.users[user['id']] = user
+        self.users_by_username[username] = user
+        return dict(user)
+
+    @track_db_call
+    async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        """사용자명으로 사용자 조회"""
+        user = self.users_by_username.get(username)
+        return dict(user) if user else None
+
+    @track_db_call
+    async def create_analysis_session(self, user_id: str, session_name: str,
+                                    image_count: int) -> Dict[str, Any]:
+        """새 분석 세션 생성"""
+        session = {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'session_name': session_name,
+            'image_count': image_count,
+            'analysis_status': 'pending',
+            'created_at': self._now(),
+            'completed_at': None,
+            'analysis_result': None,
+            'feedback': None,
+            'feedback_rating': None,
+            'updated_at': self._now()
+        }
+        self.sessions[session['id']] = session
+        return dict(session)
+
+    @track_db_call
+    async def save_uploaded_image(self, session_id: str, user_id: str,
+                                filename: str, file_path: str,
+                                file_size: int, mime_type: str) -> Dict[str, Any]:
+        """업로드된 이미지 정보 저장"""
+        image = {
+            'id': str(uuid.uuid4()),
+            'session_id': session_id,
+            'user_id': user_id,
+            'filename': filename,
+            'file_path': file_path,
+            'file_size': file_size,
+            'mime_type': mime_type,
+            'uploaded_at': self._now()
+        }
+        self.images[image['id']] = image
+        return dict(image)
+
+    @track_db_call
+    async def save_analysis_result(self, session_id: str, user_id: str,
+                                 analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+        """분석 결과 저장"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise Exception("분석 결과 저장 중 오류: 분석 결과 저장 실패")
+        seoul_tz = timezone(timedelta(hours=9))
+        session.update({
+            'analysis_result': analysis_result,
+            'analysis_status': 'completed',
+            'completed_at': datetime.now(seoul_tz).isoformat(),
+            'updated_at': self._now()
+        })
+        return dict(session)
+
+    @track_db_call
+    async def save_feedback(self, session_id: str, feedback: str, rating: int) -> Dict[str, Any]:
+        """피드백 저장"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise Exception("피드백 저장 중 오류: 피드백 저장 실패")
+        session.update({'feedback': feedback, 'feedback_rating': rating, 'updated_at': self._now()})
+        return dict(session)
+
+    @track_db_call
+    async def save_artifacts(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """아티팩트 매니페스트 행 일괄 저장 ((session_id, file_type)이 같으면 덮어씀)"""
+        saved = []
+        for record in records:
+            row = {'created_at': self._now(), 'storage_tier': 'hot', 'archive_offset': None,
+                   'archive_length': None, **record}
+            self.artifacts[(row['session_id'], row['file_type'])] = row
+            saved.append(dict(row))
+        return saved
+
+    @track_db_call
+    async def get_session_artifacts(self, session_id: str) -> List[Dict[str, Any]]:
+        """세션의 아티팩트 매니페스트 행 조회"""
+        return [dict(row) for (sid, _), row in self.artifacts.items() if sid == session_id]
+
+    @track_db_call
+    async def delete_artifacts_by_paths(self, file_paths: List[str]) -> List[str]:
+        """경로가 일치하는 analysis_files/uploaded_images 행 삭제 - 영향받은 세션 ID 목록 반환"""
+        paths = set(file_paths)
+        session_ids = set()
+        for key, row in list(self.artifacts.items()):
+            if row['file_path'] in paths:
+                session_ids.add(row['session_id'])
+                del self.artifacts[key]
+        for image_id, image in list(self.images.items()):
+            if image['file_path'] in paths:
+                session_ids.add(image['session_id'])
+                del self.images[image_id]
+        return sorted(session_ids)
+
+    @track_db_call
+    async def update_artifact_location(self, file_path: str, updates: Dict[str, Any]) -> List[str]:
+        """경로가 file_path인 파일의 위치/크기 정보 갱신 (재압축, 아카이브 이동) - 영향받은 세션 ID 목록 반환"""
+        session_ids = set()
+        for row in self.artifacts.values():
+            if row['file_path'] == file_path:
+                row.update(updates)
+                session_ids.add(row['session_id'])
+        for image in self.images.values():
+            if image['file_path'] == file_path:
+                image.update({key: updates[key] for key in ('file_path', 'file_size', 'mime_type') if key in updates})
+                session_ids.add(image['session_id'])
+        return sorted(session_ids)
+
+    @track_db_call
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """세션 상세 조회 (분석 결과 포함) - 없으면 None"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        return {column: session.get(column) for column in SESSION_DETAIL_COLUMNS.split(",")}
+
+    @track_db_call
+    async def get_session_updated_at(self, session_id: str) -> Optional[str]:
+        """세션 행의 마지막 변경 시각만 조회 (캐시 재검증용) - 세션이 없으면 None"""
+        session = self.sessions.get(session_id)
+        return session['updated_at'] if session is not None else None
+
+    @track_db_call
+    async def transition_session_status(self, session_id: str, from_status: str, to_status: str) -> bool:
+        """세션 상태가 from_status일 때만 to_status로 바꾼다 - 바꿨으면 True"""
+        session = self.sessions.get(session_id)
+        if session is None or session['analysis_status'] != from_status:
+            return False
+        session.update({'analysis_status': to_status, 'updated_at': self._now()})
+        return True
+
+    @track_db_call
+    async def get_stale_sessions(self, status: str, created_before: str,
+                                 limit: int = SCAN_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """상태가 status이고 created_before 이전에 만든 세션 (오래된 순, 최대 limit개)"""
+        sessions = [s for s in self.sessions.values()
+                    if s['analysis_status'] == status and s['created_at'] < created_before]
+        sessions.sort(key=lambda s: s['created_at'])
+        return [{column: s[column] for column in ('id', 'user_id', 'created_at')} for s in sessions[:limit]]
+
+    @track_db_call
+    async def get_session_images(self, session_id: str) -> List[Dict[str, Any]]:
+        """세션에 업로드된 이미지 목록 (업로드 순)"""
+        images = [image for image in self.images.values() if image['session_id'] == session_id]
+        images.sort(key=lambda image: image['uploaded_at'])
+        return [dict(image) for image in images]
+
+    @track_db_call
+    async def get_user_sessions(self, user_id: str) -> List[Dict[str, Any]]:
+        """사용자의 분석 세션 목록 조회"""
+        sessions = [s for s in self.sessions.values() if s['user_id'] == user_id]
+        return sorted(sessions, key=lambda s: s['created_at'], reverse=True)
+
+    @track_db_call
+    async def get_user_sessions_page(self, user_id: str, limit: int,
+                                     after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """사용자의 분석 세션 목록 한 페이지 조회 (created_at, id 내림차순 키셋, 최대 limit + 1개)"""
+        sessions = [s for s in self.sessions.values() if s['user_id'] == user_id
+                    and (after is None or (s['created_at'], s['id']) < tuple(after))]
+        sessions.sort(key=lambda s: (s['created_at'], s['id']), reverse=True)
+        return [{column: s.get(column) for column in SESSION_LIST_COLUMNS.split(",")}
+                for s in sessions[:limit + 1]]
+
+    @track_db_call
+    async def get_all_users(self) -> List[Dict[str, Any]]:
+        """모든 사용자 조회"""
+        return sorted(self.users.values(), key=lambda u: u['created_at'], reverse=True)
+
+    @track_db_call
+    async def get_all_sessions(self) -> List[Dict[str, Any]]:
+        """모든 분석 세션 조회"""
+        return sorted(self.sessions.values(), key=lambda s: s['created_at'], reverse=True)
+
+    @track_db_call
+    async def get_all_images(self) -> List[Dict[str, Any]]:
+        """모든 업로드된 이미지 조회"""
+        return sorted(self.images.values(), key=lambda i: i['uploaded_at'], reverse=True)
+
+    @track_db_call
+    async def scan_page(self, table: str, columns: str, order_column: str, limit: int,
+                        after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """테이블 키셋 스캔의 한 배치 ((order_column, id) 내림차순, 최대 limit개)"""
+        rows = {'users': self.users, 'analysis_sessions': self.sessions, 'uploaded_images': self.images}[table]
+        selected = [r for r in rows.values() if after is None or (r[order_column], r['id']) < tuple(after)]
+        selected.sort(key=lambda r: (r[order_column], r['id']), reverse=True)
+        names = _with_keys(columns, order_column).split(",")
+        return [{name: r.get(name) for name in names} for r in selected[:limit]]
+
+    # 배치 순회 로직은 scan_page에만 의존하므로 DatabaseManager 구현을 그대로 쓴다
+    _iter_table = DatabaseManager._iter_table
+    iter_users = DatabaseManager.iter_users
+    iter_sessions = DatabaseManager.iter_sessions
+    iter_images = DatabaseManager.iter_images
@@ -0,0 +1,176 @@
+import os
+import sys
+import resource
+import linecache
+import tracemalloc
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+# 동시에 진행 중인 추적 단계 수 - 0일 때만 피크를 초기화해 다른 요청의 단계 측정을 지우지 않는다
+_active_stages = 0
+
+# 단계별 누적 통계 {stage: {"count", "max_bytes", "total_bytes", "last_bytes", "rss_max_growth"}}
+_stage_stats: Dict[str, Dict[str, int]] = {}
+
+# 현재 요청의 단계별 피크 증가량(바이트)
+_request_peaks: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_peaks", default=None)
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+# 스냅샷에서 제외할 내부 할당
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def is_tracking() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def start(frames: int = 1):
+    """tracemalloc 시작 - 켜져 있는 동안 모든 할당에 추적 비용이 든다 (opt-in)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop():
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+    _stage_stats.clear()
+
+
+def _current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def start_request() -> Optional[Dict[str, int]]:
+    """현재 요청의 단계별 피크 기록 시작 (추적 중이 아니면 None)"""
+    if not tracemalloc.is_tracing():
+        return None
+    peaks: Dict[str, int] = {}
+    _request_peaks.set(peaks)
+    return peaks
+
+
+def stage_start() -> Optional[Tuple[int, Optional[int]]]:
+    """단계 시작 시 (현재 추적 메모리, 현재 RSS) - 추적 중이 아니면 None (호출 비용만 든다)"""
+    global _active_stages
+    if not tracemalloc.is_tracing():
+        return None
+    if _active_stages == 0:
+        tracemalloc.reset_peak()
+    _active_stages += 1
+    return tracemalloc.get_traced_memory()[0], _current_rss_bytes()
+
+
+def stage_end(stage: str, started: Tuple[int, Optional[int]]) -> int:
+    """단계 동안의 피크 증가량(바이트)을 기록하고 반환
+
+    다른 요청의 단계와 겹치면 피크를 초기화하지 않으므로 값이 실제보다 클 수 있다 (정확한 값은 동시 요청 1개로 측정).
+    PIL 픽셀 버퍼처럼 C 확장이 직접 잡는 메모리는 tracemalloc에 보이지 않으므로 RSS 증가량을 함께 기록한다.
+    """
+    global _active_stages
+    _active_stages = max(0, _active_stages - 1)
+    if not tracemalloc.is_tracing():
+        return 0
+    start_bytes, start_rss = started
+    peak_growth = max(0, tracemalloc.get_traced_memory()[1] - start_bytes)
+    end_rss = _current_rss_bytes()
+    rss_growth = max(0, end_rss - start_rss) if start_rss is not None and end_rss is not None else 0
+
+    stats = _stage_stats.setdefault(stage, {
+        "count": 0, "max_bytes": 0, "total_bytes": 0, "last_bytes": 0, "rss_max_growth": 0,
+    })
+    stats["count"] += 1
+    stats["max_bytes"] = max(stats["max_bytes"], peak_growth)
+    stats["total_bytes"] += peak_growth
+    stats["last_bytes"] = peak_growth
+    stats["rss_max_growth"] = max(stats["rss_max_growth"], rss_growth)
+
+    peaks = _request_peaks.get()
+    if peaks is not None:
+        peaks[stage] = max(peaks.get(stage, 0), peak_growth)
+    return peak_growth
+
+
+def peaks_kib(peaks: Dict[str, int]) -> Dict[str, float]:
+    return {stage: round(value / 1024, 1) for stage, value in peaks.items()}
+
+
+def rss_mib() -> Dict[str, Optional[float]]:
+    """현재/최대 RSS (현재 값은 /proc이 있는 Linux에서만)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mib = peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    current = _current_rss_bytes()
+    return {
+        "current": round(current / (1024 * 1024), 1) if current is not None else None,
+        "peak": round(peak_mib, 1),
+    }
+
+
+def status() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracking": tracing,
+        "traceback_frames": tracemalloc.get_traceback_limit() if tracing else None,
+        "traced_current_mib": round(current / 1024 / 1024, 2),
+        "traced_peak_mib": round(peak / 1024 / 1024, 2),
+        "tracemalloc_overhead_mib": round(tracemalloc.get_tracemalloc_memory() / 1024 / 1024, 2) if tracing else 0,
+        "rss_mib": rss_mib(),
+        "has_baseline": _baseline is not None,
+        "stages": {
+            stage: {
+                "count": s["count"],
+                "peak_max_kib": round(s["max_bytes"] / 1024, 1),
+                "peak_avg_kib": round(s["total_bytes"] / s["count"] / 1024, 1),
+                "peak_last_kib": round(s["last_bytes"] / 1024, 1),
+                "rss_max_growth_kib": round(s["rss_max_growth"] / 1024, 1),
+            }
+            for stage, s in _stage_stats.items()
+        },
+    }
+
+
+def top_allocations(limit: int = 25, group_by: str = "lineno", compare: bool = False,
+                    save_baseline: bool = False) -> List[Dict[str, Any]]:
+    """현재 스냅샷의 상위 할당 위치 (compare=True면 기준 스냅샷 대비 증가분)
+
+    스냅샷을 찍는 동안 GIL을 오래 잡으므로 이벤트 루프 밖(스레드)에서 호출한다.
+    """
+    global _baseline
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    if compare and _baseline is not None:
+        stats = snapshot.compare_to(_baseline, group_by)
+        rows = [{
+            "site": _format_traceback(stat.traceback, group_by),
+            "size_kib": round(stat.size / 1024, 1),
+            "size_diff_kib": round(stat.size_diff / 1024, 1),
+            "count": stat.count,
+            "count_diff": stat.count_diff,
+        } for stat in stats[:limit]]
+    else:
+        rows = [{
+            "site": _format_traceback(stat.traceback, group_by),
+            "size_kib": round(stat.size / 1024, 1),
+            "count": stat.count,
+        } for stat in snapshot.statistics(group_by)[:limit]]
+    if save_baseline:
+        _baseline = snapshot
+    return rows
+
+
+def _format_traceback(traceback: tracemalloc.Traceback, group_by: str):
+    if group_by == "traceback":
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+    frame = traceback[0]
+    return frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
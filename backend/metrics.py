@@ -0,0 +1,231 @@
+import time
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+import memory_tracker
+from tracing import span
+
+# 전용 레지스트리 - 라벨 값은 아래에 정해진 단계명/메서드명만 쓰므로 카디널리티가 고정된다
+registry = CollectorRegistry()
+
+# /analyze 단계는 수 ms(파싱)부터 수 분(모델 호출)까지 걸친다
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+DB_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+ANALYZE_STAGES = (
+    "session_create", "image_save", "upload_verify", "queue_wait", "preprocess", "encode",
+    "admission_wait", "model_call", "parse", "persist",
+)
+
+analyze_stage_seconds = Histogram(
+    "analyze_stage_seconds", "/analyze 단계별 소요 시간",
+    ["stage"], buckets=STAGE_BUCKETS, registry=registry,
+)
+analyze_requests_total = Counter(
+    "analyze_requests_total", "/analyze 요청 수 (결과별)",
+    ["outcome"], registry=registry,
+)
+analyses_in_flight = Gauge(
+    "analyses_in_flight", "진행 중인 /analyze 요청 수", registry=registry,
+)
+login_seconds = Histogram(
+    "auth_login_seconds", "/auth/login 전체 소요 시간",
+    ["outcome"], buckets=DB_BUCKETS, registry=registry,
+)
+password_verify_seconds = Histogram(
+    "auth_password_verify_seconds", "bcrypt 비밀번호 검증 소요 시간",
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2), registry=registry,
+)
+db_call_seconds = Histogram(
+    "db_call_seconds", "DatabaseManager 메서드별 호출 소요 시간",
+    ["method", "outcome"], buckets=DB_BUCKETS, registry=registry,
+)
+db_errors_total = Counter(
+    "db_errors_total", "DatabaseManager 메서드별 오류 횟수 (예외를 잡아 빈 값을 반환한 경우 포함)",
+    ["method"], registry=registry,
+)
+model_tokens_total = Counter(
+    "model_tokens_total", "모델 호출 토큰 사용량",
+    ["kind"], registry=registry,
+)
+model_call_retries_total = Counter(
+    "model_call_retries_total", "모델 호출 재시도 횟수", registry=registry,
+)
+model_call_hedges_total = Counter(
+    "model_call_hedges_total", "모델 호출 헤징(중복 요청) 횟수", registry=registry,
+)
+analyze_stage_peak_bytes = Histogram(
+    "analyze_stage_peak_bytes", "/analyze 단계별 추적 메모리 피크 증가량 (MEMORY_TRACKING 사용 시)",
+    ["stage"], buckets=tuple(2 ** n * 1024 * 1024 for n in range(-2, 12)), registry=registry,
+)
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds", "이벤트 루프 스케줄링 지연",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10), registry=registry,
+)
+event_loop_blocked_total = Counter(
+    "event_loop_blocked_total", "임계값을 넘는 이벤트 루프 블로킹 횟수", registry=registry,
+)
+session_cache_requests_total = Counter(
+    "session_cache_requests_total", "GET /sessions/{id} 응답 출처별 요청 수 (lru, disk, db, stale: 다른 인스턴스가 바꿔 다시 읽음)",
+    ["tier"], registry=registry,
+)
+session_cache_bytes = Gauge(
+    "session_cache_bytes", "세션 LRU 캐시에 올라간 직렬화 응답 바이트", registry=registry,
+)
+retention_files_deleted_total = Counter(
+    "retention_files_deleted_total", "보존 기간 정리로 삭제한 파일 수",
+    ["type"], registry=registry,
+)
+retention_bytes_reclaimed_total = Counter(
+    "retention_bytes_reclaimed_total", "보존 기간 정리로 확보한 바이트",
+    ["type"], registry=registry,
+)
+tiering_bytes_saved_total = Counter(
+    "tiering_bytes_saved_total", "저장소 계층화(재압축/아카이브)로 줄인 바이트",
+    ["type"], registry=registry,
+)
+
+
+# 현재 요청의 단계별 소요 시간(초) - /analyze 핸들러가 start_request_timings()로 시작한다
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> Dict[str, float]:
+    """현재 요청(태스크 컨텍스트)의 단계별 시간 기록 시작"""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def observe_stage(stage: str, seconds: float):
+    """단계 소요 시간을 히스토그램과 현재 요청의 timings에 함께 기록"""
+    analyze_stage_seconds.labels(stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """with stage_timer("model_call"): ... - 단계 소요 시간을 기록하고 추적 스팬(analyze.<단계>)을 연다
+
+    메모리 추적이 켜져 있으면 단계 동안의 피크 할당 증가량도 기록한다.
+    """
+    started = time.perf_counter()
+    memory_start = memory_tracker.stage_start()
+    try:
+        with span(f"analyze.{stage}"):
+            yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+        if memory_start is not None:
+            analyze_stage_peak_bytes.labels(stage).observe(memory_tracker.stage_end(stage, memory_start))
+
+
+def timings_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    """초 단위 기록을 응답/저장용 밀리초 값으로 변환"""
+    return {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()}
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Server-Timing 헤더 값 (예: "session_create;dur=12.3, model_call;dur=8412.0")"""
+    return ", ".join(f"{stage};dur={ms}" for stage, ms in timings_ms(timings).items())
+
+
+# 예외를 잡아 None/[]을 반환하는 DB 메서드가 오류를 알리는 표시 (track_db_call이 호출마다 초기화)
+_db_call_failed: ContextVar[bool] = ContextVar("db_call_failed", default=False)
+
+
+def record_db_error():
+    """DB 메서드가 오류를 잡아 빈 값으로 반환할 때 except 블록에서 호출 - 그 호출을 outcome="error"로 기록"""
+    _db_call_failed.set(True)
+
+
+def track_db_call(method: Callable) -> Callable:
+    """DatabaseManager 비동기 메서드 데코레이터 - 메서드명/성공 여부별 소요 시간 기록 (추적 스팬 db.<메서드>)"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        token = _db_call_failed.set(False)
+        outcome = "error"
+        try:
+            with span(f"db.{name}"):
+                result = await method(*args, **kwargs)
+            if not _db_call_failed.get():
+                outcome = "ok"
+            return result
+        finally:
+            _db_call_failed.reset(token)
+            db_call_seconds.labels(name, outcome).observe(time.perf_counter() - started)
+            if outcome == "error":
+                db_errors_total.labels(name).inc()
+    return wrapper
+
+
+def record_model_usage(prompt_tokens, completion_tokens, retries: int, hedges: int):
+    if prompt_tokens:
+        model_tokens_total.labels("prompt").inc(prompt_tokens)
+    if completion_tokens:
+        model_tokens_total.labels("completion").inc(completion_tokens)
+    if retries:
+        model_call_retries_total.inc(retries)
+    if hedges:
+        model_call_hedges_total.inc(hedges)
+
+
+class _QueueCollector:
+    """스크레이프 시점에 진입 제어기/스케줄러 상태를 읽어 게이지로 노출 (요청 경로에 비용 없음)"""
+
+    def collect(self):
+        from admission import get_admission_controller
+        from scheduler import get_scheduler
+
+        admission = get_admission_controller().stats()
+        queue_depth = GaugeMetricFamily("model_admission_queue_depth", "모델 호출 진입 대기열 길이")
+        queue_depth.add_metric([], admission["queue_depth"])
+        yield queue_depth
+        in_flight = GaugeMetricFamily("model_admission_in_flight", "진입 허가된 모델 호출 수")
+        in_flight.add_metric([], admission["in_flight"])
+        yield in_flight
+
+        lanes = get_scheduler().stats()
+        running = GaugeMetricFamily("scheduler_lane_running", "레인별 실행 중 작업 수", labels=["lane"])
+        queued = GaugeMetricFamily("scheduler_lane_queued", "레인별 대기 작업 수", labels=["lane"])
+        for lane, row in lanes.items():
+            running.add_metric([lane], row["running"])
+            queued.add_metric([lane], row["queued"])
+        yield running
+        yield queued
+
+
+class _LoopLagCollector:
+    """최근 이벤트 루프 지연 백분위수 (감시기의 이동 창 기준)"""
+
+    def collect(self):
+        from loop_monitor import get_loop_monitor
+
+        stats = get_loop_monitor().stats()
+        lag = GaugeMetricFamily("event_loop_lag_recent_seconds", "최근 이벤트 루프 지연 백분위수",
+                                labels=["quantile"])
+        for quantile, key in (("0.5", "lag_p50_ms"), ("0.95", "lag_p95_ms"), ("0.99", "lag_p99_ms")):
+            if stats[key] is not None:
+                lag.add_metric([quantile], stats[key] / 1000)
+        yield lag
+
+
+registry.register(_QueueCollector())
+registry.register(_LoopLagCollector())
+
+
+def render_metrics():
+    """Prometheus 텍스트 노출 형식 (본문, Content-Type)"""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,140 @@
+import os
+import time
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from openai import AsyncOpenAI
+
+
+class ModelResponse:
+    """백엔드와 무관한 모델 응답 (본문 + 토큰 사용량)"""
+
+    def __init__(self, content: str, prompt_tokens: Optional[int] = None,
+                 completion_tokens: Optional[int] = None, ttft_ms: Optional[float] = None):
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.ttft_ms = ttft_ms
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        if self.prompt_tokens is None or self.completion_tokens is None:
+            return None
+        return self.prompt_tokens + self.completion_tokens
+
+
+class ModelBackend(ABC):
+    """모델 호출 백엔드 인터페이스"""
+
+    name = "base"
+
+    @abstractmethod
+    async def complete(self, model: str, messages: List[Dict[str, Any]],
+                       max_tokens: int, temperature: float, timeout: float) -> ModelResponse:
+        """chat 메시지로 모델을 한 번 호출 (재시도/헤징은 호출하는 쪽에서 처리)"""
+
+
+class OpenAIChatBackend(ModelBackend):
+    """OpenAI chat-completions 백엔드
+
+    OPENAI_BASE_URL을 지정하면 호환 서버(예: stub_openai_server.py)로 요청을 보낸다.
+    재시도는 resilience 모듈에서 처리하므로 SDK 자체 재시도는 끈다.
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, stream: bool = False):
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.stream = stream
+
+    async def complete(self, model: str, messages: List[Dict[str, Any]],
+                       max_tokens: int, temperature: float, timeout: float) -> ModelResponse:
+        if not self.stream:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=timeout
+            )
+            usage = response.usage
+            return ModelResponse(
+                response.choices[0].message.content,
+                usage.prompt_tokens if usage else None,
+                usage.completion_tokens if usage else None
+            )
+
+        # 스트리밍: 첫 토큰까지의 시간(TTFT)을 함께 기록
+        started = time.monotonic()
+        ttft_ms = None
+        parts: List[str] = []
+        prompt_tokens = completion_tokens = None
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            if chunk.usage is not None:
+                prompt_tokens = chunk.usage.prompt_tokens
+                completion_tokens = chunk.usage.completion_tokens
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    if ttft_ms is None:
+                        ttft_ms = round((time.monotonic() - started) * 1000, 1)
+                    parts.append(choice.delta.content)
+        return ModelResponse("".join(parts), prompt_tokens, completion_tokens, ttft_ms)
+
+
+class LocalStubBackend(ModelBackend):
+    """네트워크 없이 프로세스 안에서 정형 보고서를 돌려주는 결정적 백엔드 (테스트/부하 측정용)"""
+
+    name = "stub"
+
+    def __init__(self, latency: str = "fixed:0", seed: int = 0):
+        import random
+        from stub_openai_server import LatencyModel
+
+        self.latency = LatencyModel(latency, random.Random(seed))
+        self.seed = seed
+
+    async def complete(self, model: str, messages: List[Dict[str, Any]],
+                       max_tokens: int, temperature: float, timeout: float) -> ModelResponse:
+        from stub_openai_server import render_report, count_images, estimate_prompt_tokens
+
+        await asyncio.sleep(self.latency.sample_seconds())
+        report = render_report(count_images(messages), self.seed)
+        return ModelResponse(report, estimate_prompt_tokens(messages), len(report) // 2)
+
+
+# 전역 모델 백엔드
+model_backend = None
+
+def get_model_backend() -> ModelBackend:
+    """MODEL_BACKEND 환경변수로 선택 - openai(기본값) | stub"""
+    global model_backend
+    if model_backend is None:
+        backend_name = os.getenv("MODEL_BACKEND", "openai")
+        if backend_name == "stub":
+            model_backend = LocalStubBackend(
+                latency=os.getenv("STUB_LATENCY", "fixed:0"),
+                seed=int(os.getenv("STUB_SEED", "0"))
+            )
+        elif backend_name == "openai":
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise HTTPException(status_code=500, detail="OpenAI API 키가 설정되지 않았습니다.")
+            model_backend = OpenAIChatBackend(
+                api_key=api_key,
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                stream=os.getenv("OPENAI_STREAM", "false").lower() == "true"
+            )
+        else:
+            raise HTTPException(status_code=500, detail=f"알 수 없는 MODEL_BACKEND: {backend_name}")
+    return model_backend
@@ -0,0 +1,239 @@
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import uuid
+import threading
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+# 프레임 키: (함수명, 파일, 함수 시작 줄) - 같은 함수의 다른 줄을 하나로 묶어 플레임그래프를 읽기 쉽게 한다
+FrameKey = Tuple[str, str, int]
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+MAX_STACK_DEPTH = 200
+
+# 대기 중인 스레드의 가장 안쪽 프레임 (함수명, 파일명) - CPU를 쓰지 않으므로 기본적으로 샘플에서 뺀다
+IDLE_LEAVES = {
+    ("select", "selectors.py"), ("poll", "selectors.py"), ("wait", "threading.py"),
+    ("_wait_for_tstate_lock", "threading.py"), ("get", "queue.py"), ("accept", "socket.py"),
+}
+
+
+def _frame_key(frame: FrameType) -> FrameKey:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+class Profile:
+    """샘플링 결과 - (스레드 이름, 루트→안쪽 스택)별 샘플 수"""
+
+    def __init__(self, interval: float, label: str):
+        self.interval = interval
+        self.label = label
+        self.samples: Counter = Counter()
+        self.started = time.time()
+        self.duration = 0.0
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def to_collapsed(self) -> str:
+        """Brendan Gregg flamegraph.pl / speedscope가 읽는 접힌 스택 형식 ("스레드;f1;f2 샘플수")"""
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            names = [thread_name] + [f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack]
+            lines.append(f"{';'.join(n.replace(';', ':') for n in names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self) -> Dict:
+        """speedscope.app 파일 형식 (스레드별 sampled 프로파일, 가중치 단위 ms)"""
+        frame_index: Dict[FrameKey, int] = {}
+        frames: List[Dict] = []
+        per_thread: Dict[str, Dict[str, list]] = {}
+        interval_ms = self.interval * 1000
+        for (thread_name, stack), count in self.samples.items():
+            indices = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                indices.append(frame_index[key])
+            profile = per_thread.setdefault(thread_name, {"samples": [], "weights": []})
+            profile["samples"].append(indices)
+            profile["weights"].append(round(count * interval_ms, 3))
+
+        profiles = []
+        for thread_name, data in sorted(per_thread.items(), key=lambda item: -sum(item[1]["weights"])):
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(data["weights"]), 3),
+                "samples": data["samples"],
+                "weights": data["weights"],
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.label,
+            "exporter": "ai-safety-assessment profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def render(self, fmt: str) -> Tuple[bytes, str, str]:
+        """(본문, Content-Type, 파일 확장자)"""
+        if fmt == "collapsed":
+            return self.to_collapsed().encode("utf-8"), "text/plain; charset=utf-8", "collapsed.txt"
+        return json.dumps(self.to_speedscope(), ensure_ascii=False).encode("utf-8"), \
+            "application/json", "speedscope.json"
+
+
+class SamplingProfiler:
+    """sys._current_frames()를 주기적으로 읽는 인프로세스 샘플링 프로파일러
+
+    별도 스레드에서만 동작하므로 꺼져 있을 때는 비용이 없다.
+    thread_id/anchor_frame을 주면 그 스레드에서 anchor_frame이 스택에 있는 샘플
+    (= 해당 요청의 코루틴이 실제로 실행 중인 순간)만 모은다.
+    """
+
+    def __init__(self, interval: float, label: str, thread_id: Optional[int] = None,
+                 anchor_frame: Optional[FrameType] = None, include_idle: bool = False):
+        self.profile = Profile(interval, label)
+        self.interval = interval
+        self.thread_id = thread_id
+        self.anchor_frame = anchor_frame
+        self.include_idle = include_idle
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        self.profile.duration = time.perf_counter() - self._started
+        return self.profile
+
+    def _run(self):
+        own_id = threading.get_ident()
+        thread_names: Dict[int, str] = {}
+        names_refreshed = 0.0
+        samples = self.profile.samples
+        anchor = self.anchor_frame
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            if now - names_refreshed > 1.0:
+                thread_names = {t.ident: t.name for t in threading.enumerate()}
+                names_refreshed = now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_id is not None and thread_id != self.thread_id:
+                    continue
+                if not self.include_idle and (frame.f_code.co_name,
+                                              os.path.basename(frame.f_code.co_filename)) in IDLE_LEAVES:
+                    continue
+                stack = []
+                found_anchor = anchor is None
+                depth = 0
+                while frame is not None and depth < MAX_STACK_DEPTH:
+                    if frame is anchor:
+                        found_anchor = True
+                    stack.append(_frame_key(frame))
+                    frame = frame.f_back
+                    depth += 1
+                if found_anchor:
+                    stack.reverse()
+                    samples[(thread_names.get(thread_id, str(thread_id)), tuple(stack))] += 1
+            frame = None  # 다른 스레드의 프레임을 붙잡아 두지 않도록
+
+
+class ProfileStore:
+    """저장된 프로파일 파일 (profiles/<id>.<확장자>) - 요청 단위 프로파일을 나중에 내려받기 위한 보관소"""
+
+    def __init__(self, directory: str, keep: int = 50):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def save(self, profile: Profile, fmt: str, profile_id: Optional[str] = None) -> str:
+        profile_id = profile_id or uuid.uuid4().hex
+        body, _, extension = profile.render(fmt)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile_id}.{extension}").write_bytes(body)
+        self._prune()
+        return profile_id
+
+    def find(self, profile_id: str) -> Optional[Path]:
+        if not PROFILE_ID_PATTERN.match(profile_id) or not self.directory.exists():
+            return None
+        for path in self.directory.glob(f"{profile_id}.*"):
+            return path
+        return None
+
+    def _prune(self):
+        files = sorted(self.directory.glob("*.*"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for path in files[self.keep:]:
+            path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """X-Profile 헤더 값이 PROFILE_TOKEN과 같은 요청만 프로파일링하는 ASGI 미들웨어
+
+    결과는 ProfileStore에 저장하고 응답에 X-Profile-Id 헤더로 ID를 돌려준다
+    (관리자가 GET /admin/profiles/{id}로 내려받음). PROFILE_TOKEN이 없으면 main에서 등록하지 않는다.
+    스레드풀로 넘긴 동기 작업은 이벤트 루프 스택에 보이지 않으므로 포함되지 않는다.
+    """
+
+    def __init__(self, app, token: str, interval: float, fmt: str, store: ProfileStore):
+        self.app = app
+        self.token = token.encode()
+        self.interval = interval
+        self.fmt = fmt
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(
+            key == b"x-profile" and hmac.compare_digest(value, self.token) for key, value in scope.get("headers", ())
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # 이 코루틴 프레임이 이벤트 루프 스레드 스택에 있을 때만 이 요청의 코드가 실행 중이다
+        profiler = SamplingProfiler(self.interval, f"{scope['method']} {scope['path']}",
+                                    thread_id=threading.get_ident(), anchor_frame=sys._getframe()).start()
+        profile_id = uuid.uuid4().hex
+        profile_header = (b"x-profile-id", profile_id.encode())
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + [profile_header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.store.save(profiler.stop(), self.fmt, profile_id)
+
+
+# 동시에 하나의 전역 프로파일만 실행
+profile_lock = threading.Lock()
+
+# 전역 프로파일 보관소
+profile_store = None
+
+def get_profile_store() -> ProfileStore:
+    global profile_store
+    if profile_store is None:
+        profile_store = ProfileStore(os.getenv("PROFILE_DIR", "profiles"))
+    return profile_store
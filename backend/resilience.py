@@ -0,0 +1,272 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import openai
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출을 즉시 거부할 때 발생"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"모델 API 서킷 브레이커 열림 ({retry_after:.0f}초 후 재시도 가능)")
+
+
+class ModelCallError(Exception):
+    """재시도를 모두 소진했거나 재시도할 수 없는 오류로 호출이 실패했을 때 발생"""
+
+    def __init__(self, message: str, retryable: bool, stats: Dict[str, Any]):
+        self.retryable = retryable
+        self.stats = stats
+        super().__init__(message)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """429, 5xx, 타임아웃, 연결 오류만 재시도 대상으로 본다"""
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.RateLimitError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_after_seconds(error: BaseException) -> Optional[float]:
+    """429 응답의 Retry-After 헤더 값(초)을 읽는다"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """연속 실패가 임계값을 넘으면 일정 시간 동안 호출을 차단하는 서킷 브레이커
+
+    reset_timeout이 지나면 반개방 상태가 되어 half_open_max_calls개 호출만 시험 호출로 내보내고,
+    시험 호출이 끝날 때까지 나머지 호출은 CircuitOpenError로 바로 거부한다.
+    """
+
+    # 시험 호출이 진행 중이라 거부한 호출에 알려 줄 재시도 대기(초)
+    PROBE_RETRY_AFTER = 1.0
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+
+    def before_call(self) -> bool:
+        """호출 전 상태 확인 - 열려 있거나 시험 호출 자리가 없으면 CircuitOpenError 발생
+
+        반개방 상태의 시험 호출로 내보내면 True를 돌려주며, 호출이 어떻게 끝나든 release_probe()를 불러야 한다.
+        """
+        if self.state == "closed":
+            return False
+        if self.state == "open":
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.reset_timeout - elapsed)
+            # 반개방: 시험 호출로 복구 여부를 확인한다
+            self.state = "half_open"
+        if self.probes_in_flight >= self.half_open_max_calls:
+            raise CircuitOpenError(self.PROBE_RETRY_AFTER)
+        self.probes_in_flight += 1
+        return True
+
+    def release_probe(self):
+        self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """최근 성공 호출 지연시간으로 p95를 추정 (헤징 지연 계산용)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class ResilientCaller:
+    """시도별 데드라인, 지터 지수 백오프, 서킷 브레이커, 헤징을 적용한 비동기 호출 래퍼"""
+
+    def __init__(self,
+                 attempt_timeout: float = 90.0,
+                 max_retries: int = 2,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 20.0,
+                 hedge_enabled: bool = False,
+                 hedge_min_delay: float = 5.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 latency: Optional[LatencyTracker] = None):
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = latency or LatencyTracker()
+
+    def _backoff_delay(self, retry_index: int, error: BaseException) -> float:
+        """Full jitter 지수 백오프 - Retry-After가 있으면 그 값을 하한으로 사용"""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** retry_index))
+        delay = random.uniform(0, cap)
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge_enabled:
+            return None
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return None
+        return max(self.hedge_min_delay, p95)
+
+    async def _attempt(self, fn: Callable[[], Awaitable[Any]], stats: Dict[str, Any]) -> Any:
+        """한 번의 시도 - p95 지연 후 응답이 없으면 중복 요청을 보내 먼저 끝난 쪽을 채택"""
+        hedge_delay = self._hedge_delay()
+
+        async def request(hedge: bool):
+            with span("model.request", hedge=hedge):
+                return await fn()
+
+        primary = asyncio.ensure_future(request(False))
+        if hedge_delay is None or hedge_delay >= self.attempt_timeout:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+            if not done:
+                stats["hedges"] += 1
+                hedge = asyncio.ensure_future(request(True))
+                pending.add(hedge)
+
+            last_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            stats["hedge_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict[str, Any]]:
+        """fn을 복원력 정책에 따라 실행하고 (결과, 호출 통계)를 반환"""
+        stats: Dict[str, Any] = {"attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+        started = time.monotonic()
+
+        for retry_index in range(self.max_retries + 1):
+            probe = self.breaker.before_call()
+            stats["attempts"] += 1
+            attempt_started = time.monotonic()
+            try:
+                try:
+                    with span("model.attempt", attempt=stats["attempts"], probe=probe):
+                        result = await asyncio.wait_for(self._attempt(fn, stats), timeout=self.attempt_timeout)
+                finally:
+                    # 시험 호출 자리는 성공/실패/취소와 관계없이 시도가 끝나는 즉시 돌려준다 (백오프 대기 중에 잡고 있지 않음)
+                    if probe:
+                        self.breaker.release_probe()
+            except Exception as e:
+                retryable = is_retryable_error(e)
+                if retryable:
+                    self.breaker.record_failure()
+                if not retryable or retry_index >= self.max_retries:
+                    stats["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+                    reason = "시간 초과" if isinstance(e, asyncio.TimeoutError) else str(e)
+                    raise ModelCallError(reason, retryable, stats) from e
+                stats["retries"] += 1
+                delay = self._backoff_delay(retry_index, e)
+                logger.warning("모델 호출 실패, 재시도 예정", extra={
+                    "error_type": type(e).__name__, "retry_in_sec": round(delay, 2),
+                    "retry": stats["retries"], "max_retries": self.max_retries,
+                })
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.latency.record(time.monotonic() - attempt_started)
+            stats["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+            return result, stats
+
+
+# 전역 모델 호출 래퍼
+model_caller = None
+
+def get_model_caller() -> ResilientCaller:
+    global model_caller
+    if model_caller is None:
+        model_caller = ResilientCaller(
+            attempt_timeout=_env_float("OPENAI_ATTEMPT_TIMEOUT", 90.0),
+            max_retries=_env_int("OPENAI_MAX_RETRIES", 2),
+            backoff_base=_env_float("OPENAI_BACKOFF_BASE", 1.0),
+            backoff_max=_env_float("OPENAI_BACKOFF_MAX", 20.0),
+            hedge_enabled=os.getenv("OPENAI_HEDGE_ENABLED", "false").lower() == "true",
+            hedge_min_delay=_env_float("OPENAI_HEDGE_MIN_DELAY", 5.0),
+            breaker=CircuitBreaker(
+                failure_threshold=_env_int("OPENAI_BREAKER_THRESHOLD", 5),
+                reset_timeout=_env_float("OPENAI_BREAKER_RESET", 30.0),
+                half_open_max_calls=_env_int("OPENAI_BREAKER_HALF_OPEN_CALLS", 1),
+            ),
+        )
+    return model_caller
@@ -0,0 +1,293 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import metrics
+from database import get_db_manager
+from artifact_manifest import get_artifact_manifest
+from file_storage import get_file_storage_manager
+from direct_upload import get_direct_upload_manager
+from session_cache import get_session_cache
+from storage_backend import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+SEOUL_TZ = timezone(timedelta(hours=9))
+
+# 저장소 정리 작업(보존 기간 정리, 계층화)이 같은 날짜 폴더를 동시에 건드리지 않도록 하나씩 실행
+maintenance_lock = asyncio.Lock()
+
+
+class RetentionPolicy(NamedTuple):
+    """파일 종류별 보존 기간
+
+    dated=True면 <디렉터리>/<YYYY-MM-DD>/... 날짜 폴더 구조를 이용해 보존 기간 안의 날짜는 열어 보지도 않는다.
+    dated=False(세션 캐시 등)는 파일 mtime으로 판단한다. track_db=True면 매니페스트/이미지 DB 행도 함께 지운다.
+    """
+    name: str
+    directory: Path
+    days: int
+    dated: bool = True
+    track_db: bool = True
+
+
+def _walk_files(directory: str, older_than: Optional[float] = None) -> Iterator[Tuple[str, int]]:
+    """os.scandir로 하위 파일을 (경로, 크기)로 하나씩 내보낸다 - 목록 전체를 메모리에 만들지 않음"""
+    stack = [directory]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        info = entry.stat(follow_symlinks=False)
+                        if older_than is None or info.st_mtime < older_than:
+                            yield entry.path, info.st_size
+        except FileNotFoundError:
+            continue
+
+
+def _take(files: Iterator[Tuple[str, int]], count: int) -> List[Tuple[str, int]]:
+    return list(islice(files, count))
+
+
+def _unlink_all(batch: List[Tuple[str, int]]) -> Tuple[int, int, int]:
+    """(삭제한 파일 수, 확보한 바이트, 실패 수)"""
+    deleted = reclaimed = failed = 0
+    for path, size in batch:
+        try:
+            os.unlink(path)
+            deleted += 1
+            reclaimed += size
+        except FileNotFoundError:
+            continue
+        except OSError:
+            failed += 1
+    return deleted, reclaimed, failed
+
+
+def _remove_empty_dirs(directory: str):
+    for root, _, _ in os.walk(directory, topdown=False):
+        try:
+            os.rmdir(root)
+        except OSError:
+            pass
+
+
+class RetentionEngine:
+    """보존 기간이 지난 저장 파일과 해당 DB 행을 정리하는 백그라운드 작업
+
+    파일 탐색과 삭제는 batch_size개씩 스레드에서 하고, 배치 사이마다 pause만큼 이벤트 루프에 양보해
+    정리 중에도 요청 지연이 튀지 않게 한다. DB 행을 먼저 지운 뒤 파일을 지우므로 중간에 실패해도
+    없는 파일을 가리키는 행은 남지 않는다 (남은 파일은 다음 실행에서 다시 정리).
+    기한이 지나도록 끝내지 않은 직접 업로드 세션도 이때 함께 만료시킨다.
+    저장 백엔드가 로컬 디스크가 아니면(S3) 날짜 폴더 정책은 backend.list()로 키 순서대로(= 날짜 순) 훑어
+    보존 기간이 지난 날짜의 객체를 backend.delete()로 지운다. 세션 캐시처럼 dated=False인 정책은 항상 로컬 파일이다.
+    """
+
+    def __init__(self, policies: List[RetentionPolicy], backend: StorageBackend, batch_size: int = 200,
+                 pause: float = 0.05, interval: float = 6 * 3600):
+        self.policies = policies
+        self.backend = backend
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        # 서버 시작 직후의 부하와 겹치지 않도록 잠시 뒤 첫 실행
+        await asyncio.sleep(min(self.interval, 60))
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("보존 기간 정리 실패")
+            await asyncio.sleep(self.interval)
+
+    async def run(self, dry_run: bool = False, days_override: Optional[int] = None) -> Dict[str, Any]:
+        """모든 정책을 한 번 적용하고 보고서를 반환 (다른 저장소 정리 작업과 동시에 실행하지 않음)"""
+        async with maintenance_lock:
+            started = time.monotonic()
+            report: Dict[str, Any] = {
+                "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "dry_run": dry_run,
+                "types": {},
+            }
+            for policy in self.policies:
+                if days_override is not None:
+                    policy = policy._replace(days=days_override)
+                if policy.days <= 0:
+                    continue
+                stats = {"retention_days": policy.days, "files_deleted": 0, "bytes_reclaimed": 0,
+                         "days_removed": 0, "failed": 0}
+                report["types"][policy.name] = stats
+                # 배치마다 같은 세션이 다시 나올 수 있으므로 세션 수는 집합으로 센다
+                sessions = set()
+                if policy.dated and self.backend.local_path(str(policy.directory)) is None:
+                    await self._apply_dated_remote(policy, stats, sessions, dry_run)
+                elif policy.dated:
+                    await self._apply_dated(policy, stats, sessions, dry_run)
+                else:
+                    await self._apply_by_mtime(policy, stats, sessions, dry_run)
+                if policy.track_db:
+                    stats["sessions_affected"] = len(sessions)
+
+            uploads = await get_direct_upload_manager().expire_abandoned(dry_run)
+            report["direct_uploads"] = uploads
+            if not dry_run:
+                metrics.retention_files_deleted_total.labels("direct_uploads").inc(uploads["uploads_removed"])
+
+            report["files_deleted"] = sum(s["files_deleted"] for s in report["types"].values())
+            report["bytes_reclaimed"] = sum(s["bytes_reclaimed"] for s in report["types"].values())
+            report["duration_s"] = round(time.monotonic() - started, 2)
+            self.last_report = report
+            logger.info("보존 기간 정리 완료", extra={
+                "dry_run": dry_run, "files_deleted": report["files_deleted"],
+                "bytes_reclaimed": report["bytes_reclaimed"], "duration_s": report["duration_s"],
+            })
+            return report
+
+    async def _apply_dated(self, policy: RetentionPolicy, stats: Dict[str, int], sessions: set, dry_run: bool):
+        cutoff_day = (datetime.now(SEOUL_TZ) - timedelta(days=policy.days)).strftime("%Y-%m-%d")
+        try:
+            day_names = await asyncio.to_thread(
+                lambda: sorted(entry.name for entry in os.scandir(policy.directory) if entry.is_dir())
+            )
+        except FileNotFoundError:
+            return
+        for day_name in day_names:
+            # 날짜 폴더명(서울 기준 YYYY-MM-DD)만 보고 보존 기간 안의 날짜는 건너뛴다 (정렬되어 있으므로 이후도 모두 보존)
+            try:
+                datetime.strptime(day_name, "%Y-%m-%d")
+            except ValueError:
+                continue
+            if day_name >= cutoff_day:
+                break
+            day_path = os.path.join(policy.directory, day_name)
+            await self._delete_files(policy, _walk_files(day_path), stats, sessions, dry_run)
+            if not dry_run:
+                await asyncio.to_thread(_remove_empty_dirs, day_path)
+            stats["days_removed"] += 1
+
+    async def _apply_by_mtime(self, policy: RetentionPolicy, stats: Dict[str, int], sessions: set, dry_run: bool):
+        older_than = time.time() - policy.days * 86400
+        await self._delete_files(policy, _walk_files(str(policy.directory), older_than), stats, sessions, dry_run)
+
+    async def _apply_dated_remote(self, policy: RetentionPolicy, stats: Dict[str, int], sessions: set, dry_run: bool):
+        """객체 저장소 - 키가 <디렉터리>/<YYYY-MM-DD>/...이고 목록이 키 순서이므로 보존 기간 안의 날짜가 나오면 멈춘다"""
+        cutoff_day = (datetime.now(SEOUL_TZ) - timedelta(days=policy.days)).strftime("%Y-%m-%d")
+        prefix = str(policy.directory).rstrip("/") + "/"
+        days = set()
+        batch: List[Tuple[str, int]] = []
+        async for key, size in self.backend.list(prefix):
+            day_name = key[len(prefix):].split("/", 1)[0]
+            try:
+                datetime.strptime(day_name, "%Y-%m-%d")
+            except ValueError:
+                continue
+            if day_name >= cutoff_day:
+                break
+            days.add(day_name)
+            batch.append((key, size))
+            if len(batch) >= self.batch_size:
+                await self._delete_batch(policy, batch, stats, sessions, dry_run, remote=True)
+                batch = []
+        if batch:
+            await self._delete_batch(policy, batch, stats, sessions, dry_run, remote=True)
+        stats["days_removed"] += len(days)
+
+    async def _delete_files(self, policy: RetentionPolicy, files: Iterator[Tuple[str, int]],
+                            stats: Dict[str, int], sessions: set, dry_run: bool):
+        while True:
+            batch = await asyncio.to_thread(_take, files, self.batch_size)
+            if not batch:
+                return
+            await self._delete_batch(policy, batch, stats, sessions, dry_run)
+
+    async def _delete_batch(self, policy: RetentionPolicy, batch: List[Tuple[str, int]],
+                            stats: Dict[str, int], sessions: set, dry_run: bool, remote: bool = False):
+        if dry_run:
+            stats["files_deleted"] += len(batch)
+            stats["bytes_reclaimed"] += sum(size for _, size in batch)
+        else:
+            if policy.track_db:
+                manifest = get_artifact_manifest()
+                session_ids = await get_db_manager().delete_artifacts_by_paths([path for path, _ in batch])
+                for session_id in session_ids:
+                    manifest.forget(session_id)
+                sessions.update(session_ids)
+            if remote:
+                deleted, reclaimed, failed = await self._delete_objects(batch)
+            else:
+                deleted, reclaimed, failed = await asyncio.to_thread(_unlink_all, batch)
+            stats["files_deleted"] += deleted
+            stats["bytes_reclaimed"] += reclaimed
+            stats["failed"] += failed
+            metrics.retention_files_deleted_total.labels(policy.name).inc(deleted)
+            metrics.retention_bytes_reclaimed_total.labels(policy.name).inc(reclaimed)
+        await asyncio.sleep(self.pause)
+
+    async def _delete_objects(self, batch: List[Tuple[str, int]]) -> Tuple[int, int, int]:
+        """(삭제한 객체 수, 확보한 바이트, 실패 수) - _unlink_all의 객체 저장소 버전"""
+        deleted = reclaimed = failed = 0
+        for key, size in batch:
+            try:
+                await self.backend.delete(key)
+                deleted += 1
+                reclaimed += size
+            except Exception as e:
+                failed += 1
+                logger.warning("보존 기간 정리 중 객체 삭제 실패", extra={"key": key, "error": str(e)})
+        return deleted, reclaimed, failed
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "interval_hours": self.interval / 3600,
+            "policies": {policy.name: {"directory": str(policy.directory), "retention_days": policy.days}
+                         for policy in self.policies},
+            "last_report": self.last_report,
+        }
+
+
+# 전역 보존 기간 정리 엔진
+retention_engine = None
+
+def get_retention_engine() -> RetentionEngine:
+    global retention_engine
+    if retention_engine is None:
+        storage = get_file_storage_manager()
+        retention_engine = RetentionEngine(
+            policies=[
+                RetentionPolicy("images", storage.images_path, int(os.getenv("RETENTION_IMAGES_DAYS", "30"))),
+                RetentionPolicy("results", storage.results_path, int(os.getenv("RETENTION_RESULTS_DAYS", "90"))),
+                RetentionPolicy("session_cache", get_session_cache().directory,
+                                int(os.getenv("RETENTION_SESSION_CACHE_DAYS", "30")), dated=False, track_db=False),
+            ],
+            backend=storage.backend,
+            batch_size=int(os.getenv("RETENTION_BATCH_SIZE", "200")),
+            pause=float(os.getenv("RETENTION_BATCH_PAUSE_MS", "50")) / 1000,
+            interval=float(os.getenv("RETENTION_INTERVAL_HOURS", "6")) * 3600,
+        )
+    return retention_engine
@@ -0,0 +1,180 @@
+import os
+import time
+import heapq
+import asyncio
+import functools
+import itertools
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+
+class Lane:
+    """우선순위 레인 - 고객(조직)별 가중 공정 큐잉과 동시 실행 한도를 가진다"""
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.running = 0
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self.heap: List[Tuple[float, int, asyncio.Future]] = []
+        self.recent_waits: Deque[float] = deque(maxlen=1000)
+
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self.heap if not future.done())
+
+
+class FairScheduler:
+    """레인별 동시 실행 한도 + 레인 내부 가중 공정 큐잉(start-time fair queuing) 스케줄러
+
+    작업마다 가상 종료 태그 = max(레인 가상시간, 해당 고객의 직전 태그) + 비용 / 가중치 를 부여하고
+    태그가 가장 작은 작업부터 실행한다. 한 고객이 수백 건을 한꺼번에 넣어도
+    다른 고객의 작업은 자기 몫의 순서대로 끼어들 수 있다.
+    슬롯을 가진 작업의 CPU 단계(이미지 디코딩/축소)는 run_in_executor()로 레인 동시 실행 한도 합만큼의
+    스레드 풀에서 돌려, 한 작업의 전처리가 이벤트 루프(다른 레인의 요청 포함)를 막지 않게 한다.
+    """
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None,
+                 weights: Optional[Dict[str, float]] = None):
+        concurrency = concurrency or {INTERACTIVE: 4, BULK: 1}
+        self.lanes = {name: Lane(name, max(1, concurrency.get(name, 1))) for name in LANES}
+        self.weights = weights or {}
+        self._seq = itertools.count()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _lane(self, name: str) -> Lane:
+        if name not in self.lanes:
+            raise ValueError(f"알 수 없는 레인입니다: {name}")
+        return self.lanes[name]
+
+    def _dispatch(self, lane: Lane):
+        while lane.running < lane.concurrency and lane.heap:
+            tag, _, future = heapq.heappop(lane.heap)
+            if future.done():  # 대기 중 취소된 작업
+                continue
+            lane.virtual_time = max(lane.virtual_time, tag)
+            lane.running += 1
+            future.set_result(None)
+
+    def _release(self, lane: Lane):
+        lane.running -= 1
+        self._dispatch(lane)
+
+    async def acquire(self, lane_name: str, tenant: str, cost: float = 1.0) -> float:
+        """실행 슬롯 확보 - 대기한 시간(초)을 반환"""
+        lane = self._lane(lane_name)
+        weight = self.weights.get(tenant, 1.0)
+        start_tag = max(lane.virtual_time, lane.last_finish.get(tenant, 0.0))
+        finish_tag = start_tag + cost / weight
+        lane.last_finish[tenant] = finish_tag
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.heap, (finish_tag, next(self._seq), future))
+        started = time.monotonic()
+        self._dispatch(lane)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 슬롯을 받은 직후 취소되면 슬롯을 돌려준다
+                self._release(lane)
+            else:
+                # 슬롯을 받기 전에 취소되면(연결 끊김, 타임아웃) 받지 못한 몫만큼 고객의 가상 시간을 되돌린다
+                lane.last_finish[tenant] -= cost / weight
+            raise
+        waited = time.monotonic() - started
+        lane.recent_waits.append(waited)
+        return waited
+
+    def release(self, lane_name: str):
+        self._release(self._lane(lane_name))
+
+    @asynccontextmanager
+    async def slot(self, lane_name: str, tenant: str, cost: float = 1.0):
+        """async with scheduler.slot("interactive", org): ... 형태로 사용"""
+        waited = await self.acquire(lane_name, tenant, cost)
+        try:
+            yield waited
+        finally:
+            self.release(lane_name)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """전처리 스레드 풀 - 크기는 레인 동시 실행 한도의 합 (close() 뒤에 다시 쓰면 새로 만든다)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=sum(lane.concurrency for lane in self.lanes.values()),
+                                                thread_name_prefix="preprocess")
+        return self._executor
+
+    async def run_in_executor(self, func: Callable[..., T], *args) -> T:
+        """func(*args)를 전처리 스레드 풀에서 실행 (로그의 trace_id 등 컨텍스트 변수를 그대로 넘긴다)"""
+        call = functools.partial(contextvars.copy_context().run, func, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for name, lane in self.lanes.items():
+            waits = sorted(lane.recent_waits)
+
+            def pct(q: float) -> Optional[float]:
+                if not waits:
+                    return None
+                return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1)
+
+            result[name] = {
+                "concurrency": lane.concurrency,
+                "running": lane.running,
+                "queued": lane.queued(),
+                "wait_ms_p50": pct(0.5),
+                "wait_ms_p95": pct(0.95),
+            }
+        return result
+
+
+def parse_tenant_weights(value: str) -> Dict[str, float]:
+    """'건설회사 A:2,안전관리업체 B:1' 형식의 가중치 설정 파싱"""
+    weights = {}
+    for item in value.split(","):
+        if ":" not in item:
+            continue
+        tenant, weight = item.rsplit(":", 1)
+        try:
+            weights[tenant.strip()] = float(weight)
+        except ValueError:
+            continue
+    return weights
+
+
+def tenant_for_user(user: Dict[str, Any]) -> str:
+    """공정 큐잉 단위 - 소속 조직, 없으면 사용자 ID"""
+    return user.get("organization") or str(user["id"])
+
+
+# 전역 스케줄러
+fair_scheduler = None
+
+def get_scheduler() -> FairScheduler:
+    global fair_scheduler
+    if fair_scheduler is None:
+        fair_scheduler = FairScheduler(
+            concurrency={
+                INTERACTIVE: int(os.getenv("SCHEDULER_INTERACTIVE_CONCURRENCY", "4")),
+                BULK: int(os.getenv("SCHEDULER_BULK_CONCURRENCY", "1")),
+            },
+            weights=parse_tenant_weights(os.getenv("SCHEDULER_TENANT_WEIGHTS", "")),
+        )
+    return fair_scheduler
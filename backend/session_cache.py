@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import aiofiles
+
+import metrics
+from database import get_db_manager
+
+logger = logging.getLogger(__name__)
+
+# 세션 상세 응답에 싣는 analysis_result 필드 (session_id/user_id 등은 세션 행에서 채운다)
+RESULT_FIELDS = ("image_names", "full_report", "sections", "model_call", "scheduler", "timings", "timestamp")
+
+
+class CachedSession(NamedTuple):
+    """직렬화된 세션 상세 응답 - 소유자 확인 후 body를 그대로 내려보낸다
+
+    updated_at은 직렬화한 세션 행의 변경 시각으로, 캐시가 DB와 같은지 확인하는 버전 표시다.
+    """
+    owner_id: str
+    etag: str
+    body: bytes
+    updated_at: Optional[str] = None
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def build_session_document(row: Dict[str, Any]) -> Dict[str, Any]:
+    """analysis_sessions 행을 GET /sessions/{id} 응답 문서로 변환"""
+    result = row.get("analysis_result") or {}
+    document = {
+        "session_id": row["id"],
+        "session_name": row.get("session_name"),
+        "status": row.get("analysis_status"),
+        "image_count": row.get("image_count"),
+        "created_at": row.get("created_at"),
+        "completed_at": row.get("completed_at"),
+        "feedback": row.get("feedback"),
+        "feedback_rating": row.get("feedback_rating"),
+    }
+    document.update({field: result[field] for field in RESULT_FIELDS if field in result})
+    return document
+
+
+def serialize_session(row: Dict[str, Any]) -> CachedSession:
+    body = json.dumps(build_session_document(row), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CachedSession(str(row["user_id"]), make_etag(body), body, row.get("updated_at"))
+
+
+class SessionCache:
+    """세션 상세 응답의 계층형 캐시: 메모리 LRU(직렬화 바이트) → 디스크 아티팩트 → DB
+
+    - 완료된 세션만 캐시한다. 진행 중인 세션은 상태가 바뀌므로 매번 DB에서 읽는다.
+    - 디스크 아티팩트(<dir>/<id 앞 2자>/<id>.json)는 "소유자ID ETag updated_at" 한 줄 + 응답 본문으로,
+      프로세스 재시작 뒤에도 분석 결과 JSON을 DB에서 다시 받아 직렬화하지 않고 그대로 응답할 수 있다.
+    - 피드백 저장처럼 세션이 바뀌면 invalidate()로 두 계층에서 모두 지운다. 다만 invalidate()는 이 인스턴스만 지우므로,
+      디스크 아티팩트를 읽을 때마다, 메모리 항목은 revalidate_after초가 지날 때마다 DB의 updated_at 한 컬럼만 조회해
+      다른 인스턴스가 바꾼 세션인지 확인하고, 다르면 DB에서 다시 읽는다.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_entries: int, revalidate_after: float = 30):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.revalidate_after = revalidate_after
+        # 세션 → (DB와 마지막으로 맞춰 본 시각(monotonic), 캐시 항목)
+        self._entries: "OrderedDict[str, Tuple[float, CachedSession]]" = OrderedDict()
+        self._bytes = 0
+        self._loading: Dict[str, asyncio.Future] = {}
+        # invalidate()마다 증가 - 그 전에 시작된 조회가 바뀌기 전 내용을 다시 캐시하지 않도록
+        self._version = 0
+
+    def _artifact_path(self, session_id: str) -> Path:
+        return self.directory / session_id[:2] / f"{session_id}.json"
+
+    async def get(self, session_id: str) -> Optional[CachedSession]:
+        cached = self._entries.get(session_id)
+        if cached is not None and time.monotonic() - cached[0] < self.revalidate_after:
+            self._entries.move_to_end(session_id)
+            metrics.session_cache_requests_total.labels("lru").inc()
+            return cached[1]
+
+        # 같은 세션을 여러 요청이 동시에 찾으면 디스크/DB 조회는 한 번만 한다
+        loading = self._loading.get(session_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[session_id] = future
+        try:
+            entry = await self._load(session_id, cached[1] if cached is not None else None)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # 기다리는 요청이 없어도 경고가 남지 않도록
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            del self._loading[session_id]
+
+    async def _load(self, session_id: str, cached: Optional[CachedSession] = None) -> Optional[CachedSession]:
+        """cached(재검증할 메모리 항목) 또는 디스크 아티팩트가 DB와 같은 버전이면 그대로, 아니면 DB에서 다시 읽는다"""
+        version = self._version
+        db_manager = get_db_manager()
+        entry = cached or await self._read_artifact(session_id)
+        if entry is not None and entry.updated_at is not None:
+            if await db_manager.get_session_updated_at(session_id) == entry.updated_at:
+                metrics.session_cache_requests_total.labels("lru" if cached else "disk").inc()
+                if version == self._version:
+                    self._remember(session_id, entry)
+                return entry
+            metrics.session_cache_requests_total.labels("stale").inc()
+        row = await db_manager.get_session(session_id)
+        if row is None:
+            if entry is not None:
+                self.invalidate(session_id)
+            metrics.session_cache_requests_total.labels("miss").inc()
+            return None
+        entry = serialize_session(row)
+        metrics.session_cache_requests_total.labels("db").inc()
+        if row.get("analysis_status") != "completed" or version != self._version:
+            # 완료 전이거나 다른 인스턴스가 완료 상태를 되돌린 경우 - 남아 있는 옛 항목을 버린다
+            if version == self._version:
+                self._drop(session_id)
+            return entry
+        await self._write_artifact(session_id, entry)
+        if version == self._version:
+            self._remember(session_id, entry)
+        return entry
+
+    async def store(self, row: Dict[str, Any]) -> CachedSession:
+        """완료된 세션 행을 두 계층에 모두 넣는다 (분석 결과 저장 직후 호출)"""
+        entry = serialize_session(row)
+        if row.get("analysis_status") == "completed":
+            await self._write_artifact(str(row["id"]), entry)
+            self._remember(str(row["id"]), entry)
+        return entry
+
+    def invalidate(self, session_id: str):
+        self._version += 1
+        self._drop(session_id)
+
+    def _drop(self, session_id: str):
+        cached = self._entries.pop(session_id, None)
+        if cached is not None:
+            self._bytes -= len(cached[1].body)
+            metrics.session_cache_bytes.set(self._bytes)
+        self._artifact_path(session_id).unlink(missing_ok=True)
+
+    def _remember(self, session_id: str, entry: CachedSession):
+        # 한 항목이 캐시의 1/4을 넘으면 메모리에 올리지 않는다 (디스크 계층에서 제공)
+        if len(entry.body) > self.max_bytes // 4:
+            return
+        previous = self._entries.pop(session_id, None)
+        if previous is not None:
+            self._bytes -= len(previous[1].body)
+        self._entries[session_id] = (time.monotonic(), entry)
+        self._bytes += len(entry.body)
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+        metrics.session_cache_bytes.set(self._bytes)
+
+    async def _read_artifact(self, session_id: str) -> Optional[CachedSession]:
+        try:
+            async with aiofiles.open(self._artifact_path(session_id), "rb") as f:
+                data = await f.read()
+            header, body = data.split(b"\n", 1)
+            owner_id, etag, updated_at = header.decode("ascii").split(" ", 2)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            # 변경 시각이 없는 예전 형식도 여기로 온다 - DB에서 다시 읽어 새 형식으로 덮어쓴다
+            logger.warning("세션 캐시 아티팩트 읽기 실패", extra={"session_id": session_id, "error": str(e)})
+            return None
+        return CachedSession(owner_id, etag, body, updated_at)
+
+    async def _write_artifact(self, session_id: str, entry: CachedSession):
+        if entry.updated_at is None:
+            # 변경 시각이 없으면(updated_at 컬럼 마이그레이션 전) 다른 인스턴스의 변경을 알아챌 수 없으므로 디스크에 두지 않는다
+            return
+        path = self._artifact_path(session_id)
+        temp_path = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(temp_path, "wb") as f:
+                await f.write(f"{entry.owner_id} {entry.etag} {entry.updated_at}\n".encode("ascii") + entry.body)
+            # 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 다 쓴 뒤 교체
+            os.replace(temp_path, path)
+        except OSError as e:
+            # 디스크 계층은 최적화일 뿐이므로 실패해도 응답은 DB 계층으로 계속 제공된다
+            logger.warning("세션 캐시 아티팩트 저장 실패", extra={"session_id": session_id, "error": str(e)})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "revalidate_after_s": self.revalidate_after,
+            "directory": str(self.directory),
+        }
+
+
+# 전역 세션 캐시
+session_cache = None
+
+def get_session_cache() -> SessionCache:
+    global session_cache
+    if session_cache is None:
+        session_cache = SessionCache(
+            directory=os.getenv("SESSION_CACHE_DIR", "storage/sessions"),
+            max_bytes=int(float(os.getenv("SESSION_CACHE_MAX_MB", "64")) * 1024 * 1024),
+            max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "1000")),
+            revalidate_after=float(os.getenv("SESSION_CACHE_REVALIDATE_SECONDS", "30")),
+        )
+    return session_cache
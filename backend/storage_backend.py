@@ -0,0 +1,479 @@
+import os
+import hmac
+import base64
+import asyncio
+import hashlib
+import logging
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import aiofiles
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 스트리밍 읽기/쓰기 단위
+CHUNK_SIZE = 256 * 1024
+# S3 멀티파트 업로드의 최소 파트 크기 (마지막 파트 제외)
+MIN_PART_SIZE = 5 * 1024 * 1024
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+class StorageError(Exception):
+    pass
+
+
+class StoredObject(NamedTuple):
+    """저장한 객체의 크기와 SHA-256 (업로드 중 스트림에서 계산, stat()은 저장소가 모르면 None)"""
+    size: int
+    sha256: Optional[str]
+
+
+async def _single_chunk(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+def _sorted_files(directory: str) -> List[Tuple[str, int]]:
+    """directory 아래 파일을 (경로, 크기)로 경로 순 정렬해 반환 - 없는 디렉터리면 빈 목록"""
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                files.append((path, os.path.getsize(path)))
+            except FileNotFoundError:
+                continue
+    return sorted(files)
+
+
+class StorageBackend(ABC):
+    """저장 파일 백엔드 인터페이스
+
+    키는 매니페스트(analysis_files.file_path)에 기록되는 경로 문자열 그대로이다
+    (예: storage/images/2025-09-03/<user>_14-30-25/<uuid>.jpg). 로컬 백엔드는 파일 경로로,
+    S3 백엔드는 버킷 안의 객체 키로 쓰므로 백엔드를 바꿔도 DB 행 형식은 같다.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> StoredObject:
+        """조각 스트림을 저장하며 크기와 SHA-256을 함께 계산 - 전체를 메모리에 올리지 않는다"""
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str) -> StoredObject:
+        return await self.put_stream(key, _single_chunk(data), content_type)
+
+    @abstractmethod
+    async def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """start~end(포함) 바이트를 읽는다 - end가 없으면 끝까지. 없는 키면 FileNotFoundError"""
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int, count: int) -> AsyncIterator[bytes]:
+        """start부터 count바이트를 CHUNK_SIZE 안팎의 조각으로 스트리밍"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """키가 가리키는 객체/파일이 있는지"""
+
+    @abstractmethod
+    async def stat(self, key: str) -> StoredObject:
+        """본문을 읽지 않고 크기와 (저장소가 기록해 둔 경우) SHA-256을 조회. 없는 키면 FileNotFoundError"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """객체/파일 삭제 - 이미 없으면 아무것도 하지 않는다"""
+
+    @abstractmethod
+    def list(self, prefix: str) -> AsyncIterator[Tuple[str, int]]:
+        """prefix로 시작하는 키를 (키, 크기)로 키 순서대로 내보낸다 (보존 기간 정리용)"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """로컬 파일로 존재하는 백엔드면 경로 (sendfile, 보존 기간 정리/계층화 작업용), 아니면 None"""
+        return None
+
+    def presign_put(self, key: str, content_type: str, content_length: int, expires: int,
+                    sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """클라이언트가 API 서버를 거치지 않고 바로 올릴 수 있는 업로드 요청 {method, url, headers}
+
+        sha256을 주면 체크섬도 서명해 내용이 다른 업로드를 저장소가 거부하게 한다.
+        지원하지 않는 백엔드(로컬 디스크)는 None.
+        """
+        return None
+
+    async def close(self):
+        pass
+
+
+class LocalStorageBackend(StorageBackend):
+    """로컬 디스크 백엔드 - 임시 파일에 쓴 뒤 교체하므로 읽는 쪽이 반쯤 쓰인 파일을 보지 않는다"""
+
+    name = "local"
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> StoredObject:
+        path = Path(key)
+        temp_path = path.with_name(path.name + ".part")
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                async for chunk in chunks:
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    await f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return StoredObject(size, hasher.hexdigest())
+
+    async def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        async with aiofiles.open(key, "rb") as f:
+            await f.seek(start)
+            return await f.read(-1 if end is None else end - start + 1)
+
+    async def iter_range(self, key: str, start: int, count: int) -> AsyncIterator[bytes]:
+        async with aiofiles.open(key, "rb") as f:
+            await f.seek(start)
+            while count > 0:
+                chunk = await f.read(min(CHUNK_SIZE, count))
+                if not chunk:
+                    break
+                count -= len(chunk)
+                yield chunk
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.isfile, key)
+
+    async def stat(self, key: str) -> StoredObject:
+        return StoredObject((await asyncio.to_thread(os.stat, key)).st_size, None)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(Path(key).unlink, missing_ok=True)
+
+    async def list(self, prefix: str) -> AsyncIterator[Tuple[str, int]]:
+        # 로컬 키는 파일 경로이므로 prefix는 디렉터리 경로로 본다
+        for entry in await asyncio.to_thread(_sorted_files, prefix.rstrip("/")):
+            yield entry
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return Path(key)
+
+
+def _signature(method: str, path: str, query: Dict[str, str], headers: Dict[str, str], payload_hash: str,
+               amz_date: str, secret_key: str, region: str) -> Tuple[str, str]:
+    """SigV4 정규 요청 서명 - (SignedHeaders, Signature) 반환 (headers 이름은 소문자)"""
+    names = sorted(headers)
+    canonical_query = "&".join(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(query.items()))
+    canonical_request = "\n".join([
+        method,
+        quote(path, safe="/-_.~"),
+        canonical_query,
+        "".join(f"{name}:{' '.join(headers[name].split())}\n" for name in names),
+        ";".join(names),
+        payload_hash,
+    ])
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    key = ("AWS4" + secret_key).encode("utf-8")
+    for part in (amz_date[:8], region, "s3", "aws4_request"):
+        key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+    return ";".join(names), hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def sign_v4(method: str, host: str, path: str, query: Dict[str, str], headers: Dict[str, str],
+            payload_hash: str, access_key: str, secret_key: str, region: str,
+            now: Optional[datetime] = None) -> Dict[str, str]:
+    """AWS Signature V4 (서비스 s3) - host/x-amz-* 를 포함한 서명된 헤더 dict 반환
+
+    payload_hash는 본문 SHA-256 또는 "UNSIGNED-PAYLOAD"(객체 본문을 두 번 읽지 않기 위해 사용).
+    """
+    amz_date = (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+    signed = {name.lower(): str(value) for name, value in headers.items()}
+    signed.update({"host": host, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+    signed_headers, signature = _signature(method, path, query, signed, payload_hash, amz_date, secret_key, region)
+    signed["authorization"] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{amz_date[:8]}/{region}/s3/aws4_request, "
+                               f"SignedHeaders={signed_headers}, Signature={signature}")
+    return signed
+
+
+def presign_v4(method: str, host: str, path: str, headers: Dict[str, str], access_key: str, secret_key: str,
+               region: str, expires: int, now: Optional[datetime] = None) -> Dict[str, str]:
+    """쿼리 문자열 서명(presigned URL) 파라미터 반환
+
+    headers에 넣은 헤더(content-type, content-length 등)도 서명되므로 클라이언트는 같은 값을 보내야 하고,
+    저장소가 크기/형식이 다른 업로드를 거부한다.
+    """
+    amz_date = (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+    signed = {name.lower(): str(value) for name, value in headers.items()}
+    signed["host"] = host
+    query = {
+        "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+        "X-Amz-Credential": f"{access_key}/{amz_date[:8]}/{region}/s3/aws4_request",
+        "X-Amz-Date": amz_date,
+        "X-Amz-Expires": str(expires),
+        "X-Amz-SignedHeaders": ";".join(sorted(signed)),
+    }
+    _, query["X-Amz-Signature"] = _signature(method, path, query, signed, "UNSIGNED-PAYLOAD",
+                                             amz_date, secret_key, region)
+    return query
+
+
+class S3StorageBackend(StorageBackend):
+    """S3 호환 객체 저장소 백엔드 (AWS S3, MinIO, stub_s3_server.py)
+
+    - 연결: 프로세스당 httpx.AsyncClient 하나를 재사용 (max_connections 한도의 keep-alive 풀)
+    - 업로드: part_size보다 작으면 PUT 한 번, 크면 멀티파트 업로드. 스트림을 읽으면서 채워진 파트를
+      바로 보내고 동시에 max_concurrency개까지 전송하므로 메모리는 (max_concurrency + 1) * part_size로 제한된다.
+      실패하면 멀티파트 업로드를 중단(abort)해 조각이 버킷에 남지 않게 한다.
+    - 주소: path-style (<endpoint>/<bucket>/<key>)
+    """
+
+    name = "s3"
+
+    def __init__(self, endpoint_url: str, bucket: str, access_key: str, secret_key: str,
+                 region: str = "us-east-1", part_size: int = 8 * 1024 * 1024, max_concurrency: int = 4,
+                 max_connections: int = 32, timeout: float = 60.0, max_attempts: int = 3,
+                 public_endpoint_url: Optional[str] = None):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.host = urlsplit(self.endpoint_url).netloc
+        # 클라이언트가 접속하는 주소가 서버 내부 주소와 다르면 presigned URL은 이 주소로 서명한다
+        self.public_endpoint_url = (public_endpoint_url or endpoint_url).rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def _object_path(self, key: str) -> str:
+        return f"/{self.bucket}/{key.lstrip('/')}"
+
+    def _signed_headers(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str],
+                        payload_hash: str) -> Dict[str, str]:
+        return sign_v4(method, self.host, path, query, headers, payload_hash,
+                       self.access_key, self.secret_key, self.region)
+
+    def presign_put(self, key: str, content_type: str, content_length: int, expires: int,
+                    sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        path = self._object_path(key)
+        headers = {"content-type": content_type, "content-length": str(content_length)}
+        if sha256 is not None:
+            headers["x-amz-checksum-sha256"] = base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+        query = presign_v4("PUT", urlsplit(self.public_endpoint_url).netloc, path, headers,
+                           self.access_key, self.secret_key, self.region, expires)
+        url = (f"{self.public_endpoint_url}{quote(path, safe='/-_.~')}?"
+               + "&".join(f"{k}={quote(v, safe='-_.~')}" for k, v in query.items()))
+        client_headers = {"Content-Type": content_type}
+        if sha256 is not None:
+            client_headers["x-amz-checksum-sha256"] = headers["x-amz-checksum-sha256"]
+        return {"method": "PUT", "url": url, "headers": client_headers}
+
+    async def _request(self, method: str, key: str, query: Optional[Dict[str, str]] = None,
+                       headers: Optional[Dict[str, str]] = None, content: bytes = b"",
+                       unsigned_payload: bool = False) -> httpx.Response:
+        """서명한 요청을 보내고 5xx/연결 오류는 max_attempts까지 재시도 (여기서 쓰는 S3 요청은 모두 멱등)"""
+        query = query or {}
+        path = self._object_path(key)
+        payload_hash = "UNSIGNED-PAYLOAD" if unsigned_payload else hashlib.sha256(content).hexdigest()
+        for attempt in range(1, self.max_attempts + 1):
+            signed = self._signed_headers(method, path, query, headers or {}, payload_hash)
+            try:
+                response = await self.client.request(method, self.endpoint_url + quote(path, safe="/-_.~"),
+                                                     params=query, headers=signed, content=content)
+            except httpx.TransportError as e:
+                if attempt == self.max_attempts:
+                    raise StorageError(f"객체 저장소 요청 중 오류: {method} {key}: {e}") from e
+            else:
+                if response.status_code < 500 or attempt == self.max_attempts:
+                    return response
+            await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+        return response
+
+    @staticmethod
+    def _check(response: httpx.Response, action: str, key: str):
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+        if response.status_code >= 300:
+            raise StorageError(f"객체 저장소 {action} 중 오류: {key}: HTTP {response.status_code} {response.text[:200]}")
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> StoredObject:
+        hasher = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        upload_id: Optional[str] = None
+        etags: Dict[int, str] = {}
+        tasks: List[asyncio.Task] = []
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def send_part(part_number: int, data: bytes):
+            try:
+                response = await self._request("PUT", key, {"partNumber": str(part_number), "uploadId": upload_id},
+                                               content=data, unsigned_payload=True)
+                self._check(response, "파트 업로드", key)
+                etags[part_number] = response.headers["ETag"]
+            finally:
+                slots.release()
+
+        async def start_part(data: bytes):
+            # 전송 중인 파트가 max_concurrency개면 하나가 끝날 때까지 스트림 읽기를 멈춘다 (메모리 상한)
+            await slots.acquire()
+            for task in tasks:
+                if task.done() and task.exception() is not None:
+                    slots.release()
+                    raise task.exception()
+            tasks.append(asyncio.create_task(send_part(len(tasks) + 1, data)))
+
+        try:
+            async for chunk in chunks:
+                hasher.update(chunk)
+                size += len(chunk)
+                buffer += chunk
+                # 마지막 파트가 비지 않도록 part_size를 넘을 때만 앞부분을 보낸다
+                while len(buffer) > self.part_size:
+                    if upload_id is None:
+                        upload_id = await self._create_multipart(key, content_type)
+                    await start_part(bytes(buffer[:self.part_size]))
+                    del buffer[:self.part_size]
+
+            if upload_id is None:
+                response = await self._request("PUT", key, headers={"content-type": content_type},
+                                               content=bytes(buffer), unsigned_payload=True)
+                self._check(response, "업로드", key)
+            else:
+                await start_part(bytes(buffer))
+                await asyncio.gather(*tasks)
+                await self._complete_multipart(key, upload_id, etags)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if upload_id is not None:
+                await asyncio.shield(self._abort_multipart(key, upload_id))
+            raise
+        return StoredObject(size, hasher.hexdigest())
+
+    async def _create_multipart(self, key: str, content_type: str) -> str:
+        response = await self._request("POST", key, {"uploads": ""}, headers={"content-type": content_type})
+        self._check(response, "멀티파트 업로드 시작", key)
+        upload_id = ET.fromstring(response.content).findtext("{*}UploadId")
+        if not upload_id:
+            raise StorageError(f"객체 저장소 멀티파트 업로드 시작 중 오류: {key}: UploadId 없음")
+        return upload_id
+
+    async def _complete_multipart(self, key: str, upload_id: str, etags: Dict[int, str]):
+        parts = "".join(f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                        for number, etag in sorted(etags.items()))
+        body = f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode("utf-8")
+        response = await self._request("POST", key, {"uploadId": upload_id},
+                                       headers={"content-type": "application/xml"}, content=body)
+        self._check(response, "멀티파트 업로드 완료", key)
+        # S3는 완료 요청에 200을 보낸 뒤 본문에 오류를 담을 수 있다
+        if b"<Error>" in response.content:
+            raise StorageError(f"객체 저장소 멀티파트 업로드 완료 중 오류: {key}: {response.text[:200]}")
+
+    async def _abort_multipart(self, key: str, upload_id: str):
+        try:
+            await self._request("DELETE", key, {"uploadId": upload_id})
+        except Exception as e:
+            logger.warning("멀티파트 업로드 중단 실패", extra={"key": key, "error": str(e)})
+
+    async def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        headers = {}
+        if start or end is not None:
+            headers["range"] = f"bytes={start}-{'' if end is None else end}"
+        response = await self._request("GET", key, headers=headers)
+        self._check(response, "읽기", key)
+        return response.content
+
+    async def iter_range(self, key: str, start: int, count: int) -> AsyncIterator[bytes]:
+        if count <= 0:
+            return
+        path = self._object_path(key)
+        headers = self._signed_headers("GET", path, {}, {"range": f"bytes={start}-{start + count - 1}"},
+                                       EMPTY_SHA256)
+        async with self.client.stream("GET", self.endpoint_url + quote(path, safe="/-_.~"),
+                                      headers=headers) as response:
+            if response.status_code >= 300:
+                await response.aread()
+                self._check(response, "읽기", key)
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                yield chunk
+
+    async def exists(self, key: str) -> bool:
+        response = await self._request("HEAD", key)
+        if response.status_code == 404:
+            return False
+        self._check(response, "조회", key)
+        return True
+
+    async def stat(self, key: str) -> StoredObject:
+        response = await self._request("HEAD", key, headers={"x-amz-checksum-mode": "ENABLED"})
+        self._check(response, "조회", key)
+        checksum = response.headers.get("x-amz-checksum-sha256")
+        return StoredObject(int(response.headers["content-length"]),
+                            base64.b64decode(checksum).hex() if checksum else None)
+
+    async def delete(self, key: str):
+        response = await self._request("DELETE", key)
+        if response.status_code != 404:
+            self._check(response, "삭제", key)
+
+    async def list(self, prefix: str) -> AsyncIterator[Tuple[str, int]]:
+        """ListObjectsV2 - 한 페이지(최대 1000개)씩 받아 내보낸다"""
+        query = {"list-type": "2", "prefix": prefix}
+        while True:
+            response = await self._request("GET", "", query)
+            self._check(response, "목록 조회", prefix)
+            result = ET.fromstring(response.content)
+            for item in result.findall("{*}Contents"):
+                yield item.findtext("{*}Key"), int(item.findtext("{*}Size"))
+            token = result.findtext("{*}NextContinuationToken")
+            if result.findtext("{*}IsTruncated") != "true" or not token:
+                return
+            query = {**query, "continuation-token": token}
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# 전역 저장소 백엔드
+storage_backend = None
+
+def get_storage_backend() -> StorageBackend:
+    """STORAGE_BACKEND 환경변수로 선택 - local(기본값) | s3"""
+    global storage_backend
+    if storage_backend is None:
+        backend_name = os.getenv("STORAGE_BACKEND", "local")
+        if backend_name == "local":
+            storage_backend = LocalStorageBackend()
+        elif backend_name == "s3":
+            endpoint_url = os.getenv("S3_ENDPOINT_URL")
+            bucket = os.getenv("S3_BUCKET")
+            if not endpoint_url or not bucket:
+                raise ValueError("STORAGE_BACKEND=s3이면 S3_ENDPOINT_URL과 S3_BUCKET을 설정해야 합니다.")
+            storage_backend = S3StorageBackend(
+                endpoint_url=endpoint_url,
+                bucket=bucket,
+                access_key=os.getenv("S3_ACCESS_KEY_ID", ""),
+                secret_key=os.getenv("S3_SECRET_ACCESS_KEY", ""),
+                region=os.getenv("S3_REGION", "us-east-1"),
+                part_size=int(float(os.getenv("S3_PART_SIZE_MB", "8")) * 1024 * 1024),
+                max_concurrency=int(os.getenv("S3_MAX_CONCURRENCY", "4")),
+                max_connections=int(os.getenv("S3_MAX_CONNECTIONS", "32")),
+                public_endpoint_url=os.getenv("S3_PUBLIC_ENDPOINT_URL") or None,
+            )
+        else:
+            raise ValueError(f"알 수 없는 STORAGE_BACKEND: {backend_name}")
+    return storage_backend
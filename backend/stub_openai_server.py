@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+부하 테스트용 로컬 OpenAI 호환 스텁 서버
+chat-completions API를 흉내 내어 정해진 형식의 위험성 평가 보고서를 돌려준다.
+실제 API 키, 네트워크, 비용 없이 /analyze 전체 경로를 벤치마크할 수 있다.
+
+실행: python stub_openai_server.py --port 8900 --latency lognormal:1500,0.5 --error-429 0.05
+백엔드 설정: OPENAI_BASE_URL=http://localhost:8900/v1  OPENAI_API_KEY=stub
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHECKLIST_ITEMS = [
+    "모든 작업자는 작업조건에 맞는 안전보호구를 착용한다.",
+    "모든 공사성 작업시에는 위험성평가를 시행하고 결과를 기록/보관한다.",
+    "작업 전 반드시 TBM작업계획 공유 및 위험성 예지 등 시행",
+    "고위험 작업 시에는 2인1조 작업 및 작업계획서를 비치한다.",
+    "이동식사다리 및 고소작업대(차량) 사용 시 안전수칙 준수",
+    "전원작업 및 고압선 주변 작업 시 감전예방 조치",
+    "도로 횡단 및 도로 주변 작업 시 교통안전 시설물과 신호수를 배치한다.",
+    "밀폐공간(맨홀 등) 작업 시 산소/유해가스 농도 측정 및 감시인 배치",
+    "하절기/동절기 기상상황에 따른 옥외작업 금지",
+    "유해위험물 MSDS의 관리 및 예방 조치",
+    "중량물 이동 인력, 장비 이용 시 안전 조치",
+    "화기 작업 화상, 화재 위험 예방 조치",
+    "추락 예방 안전 조치",
+    "건설 기계장비, 설비 등 안전 및 방호조치(끼임)",
+    "혼재 작업(부딪힘) 시 안전 예방 조치",
+    "충돌 방지 조치(부딪힘)",
+]
+
+HAZARDS = [
+    ("추락", "비계 및 개구부 주변 안전난간이 일부 구간에서 확인되지 않음"),
+    ("낙하물", "상부 자재 적치 구역 하부에 통행로가 겹쳐 있음"),
+    ("감전", "임시 분전반 주변 전선이 바닥에 노출되어 있음"),
+    ("끼임", "건설 장비 회전 반경 내 작업자 접근 통제가 미흡함"),
+    ("부딪힘", "장비 이동 동선과 보행 동선이 분리되어 있지 않음"),
+    ("화재", "용접 작업 구역 주변에 가연물이 정리되지 않음"),
+]
+
+
+def render_report(image_count: int, seed: int = 0, hazard_rows: int = 4) -> str:
+    """이미지 수와 시드로 결정되는 정형 보고서 (같은 입력이면 항상 같은 출력)"""
+    rng = random.Random(seed * 1000 + image_count)
+    hazards = rng.sample(HAZARDS, min(hazard_rows, len(HAZARDS)))
+    lines = [
+        "### 1. 현장 전체 잠재 위험요인 분석 및 위험성 감소대책",
+        "| 번호 | 잠재 위험요인 | 잠재 위험요인 설명 | 위험성 감소대책 |",
+        "|------|---------------|--------------------|-----------------|",
+    ]
+    for i, (name, description) in enumerate(hazards, 1):
+        lines.append(
+            f"| {i} | {name} | {description} | ① 작업 전 점검 ② 안전시설 보강 ③ 작업자 교육 ④ 관리감독자 확인 |"
+        )
+    lines += [
+        "",
+        "### 2. SGR 체크리스트 항목별 통합 체크 결과",
+        "| 항목 | 준수여부 | 세부 내용 |",
+        "|----------------|----------|-------------------|",
+    ]
+    for i, item in enumerate(CHECKLIST_ITEMS, 1):
+        verdict = rng.choice(["O", "X", "해당없음", "알수없음"])
+        lines.append(f"| {i}. {item} | {verdict} | 현장 사진 {image_count}장 기준 확인 결과 |")
+    lines += [
+        "",
+        "### 3. 현장 전체 통합 추가 권장사항",
+        "- 작업 시작 전 TBM에서 당일 위험요인을 공유하고 기록을 남길 것",
+        "- 개구부 및 단부에 안전난간과 덮개를 설치하고 일일 점검할 것",
+        "- 장비 작업 반경에 출입 통제선과 신호수를 배치할 것",
+    ]
+    return "\n".join(lines)
+
+
+class LatencyModel:
+    """지연시간 분포 - fixed:ms | uniform:min_ms,max_ms | lognormal:median_ms,sigma"""
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.rng = rng
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+
+    def sample_seconds(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0] / 1000
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1]) / 1000
+        if self.kind == "lognormal":
+            median_ms, sigma = self.params
+            return self.rng.lognormvariate(math.log(median_ms), sigma) / 1000
+        return 0.0
+
+
+def count_images(messages: List[Dict[str, Any]]) -> int:
+    """chat 메시지에 포함된 이미지 수"""
+    count = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            count += sum(1 for part in content if part.get("type") == "image_url")
+    return count
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """입력 토큰 수 근사치 (텍스트 2자당 1토큰, 이미지당 765토큰) - 스텁 응답의 usage 값"""
+    tokens = 0
+    for message in messages:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        for part in parts:
+            if part.get("type") == "text":
+                tokens += len(part.get("text", "")) // 2
+            elif part.get("type") == "image_url":
+                tokens += 765
+    return tokens
+
+
+def create_app(latency: str = "fixed:0", error_429: float = 0.0, error_5xx: float = 0.0,
+               seed: int = 0, stream_chunk_delay_ms: float = 5.0) -> FastAPI:
+    rng = random.Random(seed)
+    latency_model = LatencyModel(latency, rng)
+    stub = FastAPI(title="OpenAI Stub Server")
+    stub.state.request_count = 0
+
+    @stub.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "stub-model", "object": "model", "owned_by": "stub"}]}
+
+    @stub.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stub.state.request_count += 1
+
+        roll = rng.random()
+        if roll < error_429:
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": "1"},
+                content={"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+        if roll < error_429 + error_5xx:
+            await asyncio.sleep(latency_model.sample_seconds() / 2)
+            return JSONResponse(
+                status_code=rng.choice([500, 502, 503]),
+                content={"error": {"message": "Upstream error (stub)", "type": "server_error"}},
+            )
+
+        messages = body.get("messages", [])
+        report = render_report(count_images(messages), seed)
+        prompt_tokens = estimate_prompt_tokens(messages)
+        completion_tokens = len(report) // 2
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub-model")
+        created = int(time.time())
+        delay = latency_model.sample_seconds()
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": report},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def event_stream():
+            # 첫 토큰까지 지연시간을 쓰고, 이후 줄 단위로 흘려보낸다
+            await asyncio.sleep(delay)
+            for line in report.split("\n"):
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": line + "\n"}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(stream_chunk_delay_ms / 1000)
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            if include_usage:
+                usage_chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [], "usage": usage,
+                }
+                yield f"data: {json.dumps(usage_chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    @stub.get("/stats")
+    async def stats():
+        return {"requests": stub.state.request_count}
+
+    return stub
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="OpenAI 호환 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("STUB_PORT", "8900")))
+    parser.add_argument("--latency", default=os.getenv("STUB_LATENCY", "lognormal:1500,0.5"),
+                        help="fixed:ms | uniform:min_ms,max_ms | lognormal:median_ms,sigma")
+    parser.add_argument("--error-429", type=float, default=float(os.getenv("STUB_ERROR_429", "0")),
+                        help="429 응답 비율 (0~1)")
+    parser.add_argument("--error-5xx", type=float, default=float(os.getenv("STUB_ERROR_5XX", "0")),
+                        help="5xx 응답 비율 (0~1)")
+    parser.add_argument("--seed", type=int, default=int(os.getenv("STUB_SEED", "0")))
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    print(f"🧪 OpenAI 스텁 서버 시작: http://{args.host}:{args.port}/v1 (지연 {args.latency}, "
+          f"429 {args.error_429:.0%}, 5xx {args.error_5xx:.0%})")
+    uvicorn.run(
+        create_app(args.latency, args.error_429, args.error_5xx, args.seed),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
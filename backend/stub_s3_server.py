@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+로컬 S3 호환 스텁 서버 (MinIO 대용)
+S3StorageBackend가 쓰는 요청(PUT/GET/HEAD/DELETE 객체, Range, 멀티파트 업로드, x-amz-checksum-sha256,
+ListObjectsV2)만 구현한다.
+SigV4 서명(헤더 서명과 presigned URL)을 실제로 검증하고 마지막이 아닌 파트의 최소 크기를 강제하므로, 서명/파트 분할 오류를 로컬에서 잡을 수 있다.
+
+실행: python stub_s3_server.py --port 9000 --data-dir /tmp/s3stub
+백엔드 설정: STORAGE_BACKEND=s3  S3_ENDPOINT_URL=http://localhost:9000  S3_BUCKET=assessments
+            S3_ACCESS_KEY_ID=stub  S3_SECRET_ACCESS_KEY=stubsecret
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import uuid
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import FastAPI, Request, Response
+
+from storage_backend import MIN_PART_SIZE, presign_v4, sign_v4
+from downloads import RangeNotSatisfiable, parse_byte_range
+
+
+def _error(status_code: int, code: str, message: str) -> Response:
+    body = f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{code}</Code><Message>{message}</Message></Error>"
+    return Response(body, status_code=status_code, media_type="application/xml")
+
+
+def create_app(data_dir: str, access_key: str, secret_key: str, region: str = "us-east-1",
+               min_part_size: int = MIN_PART_SIZE) -> FastAPI:
+    stub = FastAPI(title="S3 Stub")
+    root = Path(data_dir)
+    uploads_dir = root / ".uploads"
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+    stub.state.request_count = 0
+    stub.state.parts_in_flight = 0
+    stub.state.max_parts_in_flight = 0
+
+    def object_path(bucket: str, key: str) -> Path:
+        return root / bucket / key
+
+    def checksum_path(bucket: str, key: str) -> Path:
+        """업로드 때 받은 x-amz-checksum-sha256 (HEAD/GET에 x-amz-checksum-mode: ENABLED면 돌려준다)"""
+        return root / ".checksums" / bucket / key
+
+    def verify_presigned(request: Request) -> Optional[Response]:
+        """presigned URL(쿼리 문자열 서명) 검증 - 만료 시각과 서명된 헤더(content-length 등)까지 확인"""
+        query = dict(request.query_params)
+        try:
+            signature = query.pop("X-Amz-Signature")
+            credential = query["X-Amz-Credential"].split("/")
+            signed_names = query["X-Amz-SignedHeaders"].split(";")
+            now = datetime.strptime(query["X-Amz-Date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            expires = int(query["X-Amz-Expires"])
+        except (ValueError, KeyError):
+            return _error(403, "AccessDenied", "malformed presigned url")
+        if credential[0] != access_key:
+            return _error(403, "InvalidAccessKeyId", "unknown access key")
+        if (datetime.now(timezone.utc) - now).total_seconds() > expires:
+            return _error(403, "AccessDenied", "request has expired")
+        headers = {name: request.headers.get(name, "") for name in signed_names if name != "host"}
+        expected = presign_v4(request.method, request.headers.get("host", ""), request.url.path, headers,
+                              access_key, secret_key, region, expires, now)
+        if not hmac.compare_digest(expected["X-Amz-Signature"], signature):
+            return _error(403, "SignatureDoesNotMatch", "signature mismatch")
+        return None
+
+    def verify_signature(request: Request, body: bytes) -> Optional[Response]:
+        """요청을 받은 그대로 다시 서명해 Authorization과 비교"""
+        if "X-Amz-Signature" in request.query_params:
+            return verify_presigned(request)
+        authorization = request.headers.get("authorization", "")
+        try:
+            _, fields = authorization.split(" ", 1)
+            params = dict(field.strip().split("=", 1) for field in fields.split(","))
+            credential = params["Credential"].split("/")
+            signed_names = params["SignedHeaders"].split(";")
+            now = datetime.strptime(request.headers["x-amz-date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        except (ValueError, KeyError):
+            return _error(403, "AccessDenied", "missing or malformed authorization")
+        if credential[0] != access_key:
+            return _error(403, "InvalidAccessKeyId", "unknown access key")
+
+        payload_hash = request.headers.get("x-amz-content-sha256", "")
+        if payload_hash != "UNSIGNED-PAYLOAD" and payload_hash != hashlib.sha256(body).hexdigest():
+            return _error(400, "XAmzContentSHA256Mismatch", "payload hash mismatch")
+        headers = {name: request.headers.get(name, "") for name in signed_names
+                   if name not in ("host", "x-amz-date", "x-amz-content-sha256")}
+        expected = sign_v4(request.method, request.headers.get("host", ""), request.url.path,
+                           dict(request.query_params), headers, payload_hash, access_key, secret_key, region, now)
+        if not hmac.compare_digest(expected["authorization"], authorization):
+            return _error(403, "SignatureDoesNotMatch", "signature mismatch")
+        return None
+
+    def list_objects(bucket: str, prefix: str, after: Optional[str], max_keys: int) -> Response:
+        """ListObjectsV2 - 키 순서, continuation-token은 마지막으로 돌려준 키"""
+        bucket_dir = root / bucket
+        keys = sorted(path.relative_to(bucket_dir).as_posix() for path in bucket_dir.rglob("*") if path.is_file())
+        keys = [key for key in keys if key.startswith(prefix) and (after is None or key > after)]
+        page, truncated = keys[:max_keys], len(keys) > max_keys
+        contents = "".join(f"<Contents><Key>{escape(key)}</Key><Size>{(bucket_dir / key).stat().st_size}</Size></Contents>"
+                           for key in page)
+        token = f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if truncated else ""
+        return Response(
+            f"<ListBucketResult xmlns=\"http://s3.amazonaws.com/doc/2006-03-01/\"><Name>{bucket}</Name>"
+            f"<Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>"
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{token}{contents}</ListBucketResult>",
+            media_type="application/xml")
+
+    @stub.get("/_stub/stats")
+    async def stats():
+        return {"requests": stub.state.request_count, "max_parts_in_flight": stub.state.max_parts_in_flight}
+
+    @stub.api_route("/{bucket}/{key:path}", methods=["GET", "HEAD", "PUT", "POST", "DELETE"])
+    async def handle(bucket: str, key: str, request: Request):
+        stub.state.request_count += 1
+        query = request.query_params
+        is_part = request.method == "PUT" and "partNumber" in query
+        if is_part:
+            stub.state.parts_in_flight += 1
+            stub.state.max_parts_in_flight = max(stub.state.max_parts_in_flight, stub.state.parts_in_flight)
+        try:
+            body = await request.body()
+            denied = verify_signature(request, body)
+            if denied is not None:
+                return denied
+            path = object_path(bucket, key)
+
+            if request.method == "PUT":
+                if is_part:
+                    upload_dir = uploads_dir / query["uploadId"]
+                    if not upload_dir.is_dir():
+                        return _error(404, "NoSuchUpload", "upload not found")
+                    (upload_dir / f"{int(query['partNumber']):05d}").write_bytes(body)
+                else:
+                    checksum = request.headers.get("x-amz-checksum-sha256")
+                    if checksum is not None and checksum != base64.b64encode(hashlib.sha256(body).digest()).decode():
+                        return _error(400, "BadDigest", "x-amz-checksum-sha256 mismatch")
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    path.write_bytes(body)
+                    checksum_file = checksum_path(bucket, key)
+                    if checksum is None:
+                        checksum_file.unlink(missing_ok=True)
+                    else:
+                        checksum_file.parent.mkdir(parents=True, exist_ok=True)
+                        checksum_file.write_text(checksum)
+                return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+            if request.method == "POST" and "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                (uploads_dir / upload_id).mkdir()
+                return Response(
+                    f"<InitiateMultipartUploadResult xmlns=\"http://s3.amazonaws.com/doc/2006-03-01/\">"
+                    f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+                    f"</InitiateMultipartUploadResult>",
+                    media_type="application/xml")
+
+            if request.method == "POST" and "uploadId" in query:
+                upload_dir = uploads_dir / query["uploadId"]
+                if not upload_dir.is_dir():
+                    return _error(404, "NoSuchUpload", "upload not found")
+                parts: List[ET.Element] = ET.fromstring(body).findall("{*}Part")
+                chunks = []
+                for index, part in enumerate(parts):
+                    data = (upload_dir / f"{int(part.findtext('{*}PartNumber')):05d}").read_bytes()
+                    if part.findtext("{*}ETag").strip('"') != hashlib.md5(data).hexdigest():
+                        return _error(400, "InvalidPart", "etag mismatch")
+                    if index < len(parts) - 1 and len(data) < min_part_size:
+                        return _error(400, "EntityTooSmall", "part smaller than minimum")
+                    chunks.append(data)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(b"".join(chunks))
+                checksum_path(bucket, key).unlink(missing_ok=True)
+                shutil.rmtree(upload_dir)
+                return Response(
+                    f"<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>"
+                    f"</CompleteMultipartUploadResult>", media_type="application/xml")
+
+            if request.method == "DELETE":
+                if "uploadId" in query:
+                    shutil.rmtree(uploads_dir / query["uploadId"], ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+                    checksum_path(bucket, key).unlink(missing_ok=True)
+                return Response(status_code=204)
+
+            if request.method == "GET" and query.get("list-type") == "2":
+                return list_objects(bucket, query.get("prefix", ""), query.get("continuation-token"),
+                                    int(query.get("max-keys", "1000")))
+
+            # GET / HEAD
+            if not path.is_file():
+                return _error(404, "NoSuchKey", "key not found")
+            data = path.read_bytes()
+            try:
+                byte_range = parse_byte_range(request.headers.get("range"), len(data))
+            except RangeNotSatisfiable:
+                return _error(416, "InvalidRange", "range not satisfiable")
+            headers = {"ETag": f'"{hashlib.md5(data).hexdigest()}"', "Accept-Ranges": "bytes"}
+            checksum_file = checksum_path(bucket, key)
+            if request.headers.get("x-amz-checksum-mode") == "ENABLED" and checksum_file.is_file():
+                headers["x-amz-checksum-sha256"] = checksum_file.read_text()
+            if byte_range is None:
+                content, status_code = data, 200
+            else:
+                start, end = byte_range
+                content, status_code = data[start:end + 1], 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            if request.method == "HEAD":
+                headers["Content-Length"] = str(len(content))
+                return Response(status_code=status_code, headers=headers)
+            return Response(content, status_code=status_code, headers=headers,
+                            media_type="application/octet-stream")
+        finally:
+            if is_part:
+                stub.state.parts_in_flight -= 1
+
+    return stub
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="S3 호환 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("S3_STUB_PORT", "9000")))
+    parser.add_argument("--data-dir", default=os.getenv("S3_STUB_DATA_DIR", "s3stub"))
+    parser.add_argument("--access-key", default=os.getenv("S3_ACCESS_KEY_ID", "stub"))
+    parser.add_argument("--secret-key", default=os.getenv("S3_SECRET_ACCESS_KEY", "stubsecret"))
+    parser.add_argument("--region", default=os.getenv("S3_REGION", "us-east-1"))
+    parser.add_argument("--min-part-size-mb", type=float, default=MIN_PART_SIZE / 1024 / 1024,
+                        help="마지막이 아닌 파트의 최소 크기 (S3/MinIO는 5MB)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    print(f"🧪 S3 스텁 서버 시작: http://{args.host}:{args.port} (데이터 {args.data_dir})")
+    uvicorn.run(
+        create_app(args.data_dir, args.access_key, args.secret_key, args.region,
+                   int(args.min_part_size_mb * 1024 * 1024)),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
@@ -0,0 +1,371 @@
+import io
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import zstandard
+from PIL import Image
+
+import metrics
+from database import get_db_manager
+from artifact_manifest import get_artifact_manifest
+from file_storage import get_file_storage_manager
+from image_pipeline import RENDITION_SUFFIXES
+from retention import SEOUL_TZ, maintenance_lock, _take, _walk_files
+from storage_backend import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# 결과 날짜 폴더 안의 아카이브 파일 - 멤버마다 독립된 zstd 프레임이라 한 멤버만 풀 수 있다
+ARCHIVE_NAME = "results.zst"
+# 아카이브 자체 설명용 오프셋 인덱스 (DB 매니페스트가 유실되어도 멤버 위치를 복구할 수 있도록)
+ARCHIVE_INDEX_NAME = "results.idx.json"
+# 날짜 폴더 계층화 완료 표시 - 다음 실행에서 폴더를 열지 않고 건너뛴다
+TIERED_MARKER = ".tiered"
+# 재압축한 원본 사진 파일명 접미사 - 중간에 중단되어도 같은 사진을 두 번 재압축하지 않는다
+RECOMPRESSED_SUFFIX = ".tiered.jpg"
+
+_SKIP_NAMES = {ARCHIVE_NAME, ARCHIVE_INDEX_NAME, TIERED_MARKER}
+
+
+def decompress_member(frame: bytes) -> bytes:
+    """아카이브에서 (archive_offset, archive_length)로 읽은 한 멤버의 압축 프레임을 푼다 (스레드에서 호출)"""
+    return zstandard.ZstdDecompressor().decompress(frame)
+
+
+def recompress_image(path: str, max_side: int, quality: int) -> Optional[Tuple[str, int, str]]:
+    """원본 사진을 max_side 이하 해상도의 고품질 JPEG로 다시 인코딩
+
+    (새 경로, 크기, sha256)을 반환하며, 투명도가 있거나 10% 이상 줄지 않으면 None (원본 유지).
+    EXIF(촬영 정보, 방향)와 ICC 프로파일은 그대로 옮긴다.
+    """
+    original_size = os.path.getsize(path)
+    with Image.open(path) as image:
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            return None
+        exif = image.info.get("exif")
+        icc_profile = image.info.get("icc_profile")
+        # JPEG는 디코딩 단계에서 1/2, 1/4 ... 로 줄여 읽어 큰 사진의 메모리/CPU를 아낀다
+        image.draft("RGB", (max_side, max_side))
+        image = image.convert("RGB") if image.mode not in ("RGB", "L") else image.copy()
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    save_options = {"quality": quality, "optimize": True, "progressive": True}
+    if exif:
+        save_options["exif"] = exif
+    if icc_profile:
+        save_options["icc_profile"] = icc_profile
+    image.save(buffer, "JPEG", **save_options)
+    data = buffer.getvalue()
+    if len(data) > original_size * 0.9:
+        return None
+
+    base = path[:-len(Path(path).suffix)] if Path(path).suffix else path
+    new_path = base + RECOMPRESSED_SUFFIX
+    temp_path = new_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, new_path)
+    return new_path, len(data), hashlib.sha256(data).hexdigest()
+
+
+def append_to_archive(day_dir: str, files: List[Tuple[str, int]], level: int) -> Dict[str, Dict[str, Any]]:
+    """결과 파일들을 날짜 폴더의 아카이브 끝에 멤버로 추가하고 {원본 경로: 멤버 정보} 반환
+
+    기존 멤버의 위치는 바뀌지 않으므로 이미 DB에 기록된 오프셋은 그대로 유효하다.
+    중간에 중단되어 끝에 남은 조각은 인덱스에 없으므로 읽히지 않는다.
+    """
+    archive_path = os.path.join(day_dir, ARCHIVE_NAME)
+    index_path = os.path.join(day_dir, ARCHIVE_INDEX_NAME)
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        index = {"format": 1, "members": {}}
+
+    compressor = zstandard.ZstdCompressor(level=level, write_content_size=True, write_checksum=True)
+    added: Dict[str, Dict[str, Any]] = {}
+    with open(archive_path, "ab") as archive:
+        offset = archive.seek(0, os.SEEK_END)
+        for path, _ in files:
+            with open(path, "rb") as f:
+                content = f.read()
+            frame = compressor.compress(content)
+            archive.write(frame)
+            member = {
+                "offset": offset,
+                "length": len(frame),
+                "size": len(content),
+                "sha256": hashlib.sha256(content).hexdigest(),
+            }
+            index["members"][os.path.relpath(path, day_dir)] = member
+            added[path] = member
+            offset += len(frame)
+        archive.flush()
+        os.fsync(archive.fileno())
+
+    temp_path = index_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(temp_path, index_path)
+    return added
+
+
+def _remove_files(paths: List[str]):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_empty_subdirs(day_dir: str):
+    for root, _, _ in os.walk(day_dir, topdown=False):
+        if root != day_dir:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+
+def _mark_tiered(day_dir: str):
+    Path(day_dir, TIERED_MARKER).touch()
+
+
+def _pending_days(directory: Path, cutoff_day: str) -> List[str]:
+    """계층화 대상 날짜 폴더 (cutoff_day 이전이고 아직 완료 표시가 없는 것)"""
+    try:
+        names = sorted(entry.name for entry in os.scandir(directory) if entry.is_dir())
+    except FileNotFoundError:
+        return []
+    days = []
+    for name in names:
+        try:
+            datetime.strptime(name, "%Y-%m-%d")
+        except ValueError:
+            continue
+        if name >= cutoff_day:
+            break
+        if not os.path.exists(os.path.join(directory, name, TIERED_MARKER)):
+            days.append(name)
+    return days
+
+
+class TieringEngine:
+    """잘 읽히지 않는 오래된 파일을 작은 저장 형태로 옮기는 백그라운드 작업
+
+    - 원본 사진: images_age_days가 지나면 max_side 이하 해상도의 고품질 JPEG로 재압축 (storage_tier='compressed')
+    - 결과 파일: results_age_days가 지나면 날짜 폴더별 zstd 아카이브로 묶음 (storage_tier='archived')
+    매니페스트(analysis_files)가 새 위치를 가리키도록 갱신하므로 다운로드 API는 그대로 동작하고,
+    아카이브 멤버는 요청 시 해당 프레임만 풀어서 응답한다. 매니페스트 행이 없는 파일(매니페스트 이전 세션 등)은
+    새 위치를 가리킬 곳이 없으므로 원본을 지우지 않고 보고서의 unreferenced로 센다.
+    로컬 디스크 백엔드 전용이다 - S3 등 객체 저장소에서는 시작하지 않고 경고만 남긴다 (버킷 수명 주기 규칙을 쓸 것).
+    """
+
+    def __init__(self, images_dir: Path, results_dir: Path, images_age_days: int, results_age_days: int,
+                 backend: StorageBackend, max_side: int = 2560, quality: int = 85, level: int = 12,
+                 batch_size: int = 100, pause: float = 0.05, interval: float = 24 * 3600):
+        self.images_dir = images_dir
+        self.results_dir = results_dir
+        self.images_age_days = images_age_days
+        self.results_age_days = results_age_days
+        self.max_side = max_side
+        self.quality = quality
+        self.level = level
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+        self.supported = backend.local_path(str(images_dir)) is not None
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if not self.supported:
+            logger.warning("저장소 계층화는 로컬 디스크 백엔드에서만 동작합니다 - 객체 저장소에서는 버킷 수명 주기 규칙을 사용하세요")
+            return
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        await asyncio.sleep(min(self.interval, 120))
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("저장소 계층화 실패")
+            await asyncio.sleep(self.interval)
+
+    def _cutoff_day(self, days: int) -> str:
+        return (datetime.now(SEOUL_TZ) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    async def run(self) -> Dict[str, Any]:
+        if not self.supported:
+            return {"started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "skipped": "로컬 디스크 백엔드가 아님 - 객체 저장소는 버킷 수명 주기 규칙으로 계층화"}
+        async with maintenance_lock:
+            started = time.monotonic()
+            report: Dict[str, Any] = {
+                "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "images": {"days": 0, "recompressed": 0, "skipped": 0, "unreferenced": 0,
+                           "bytes_before": 0, "bytes_after": 0},
+                "results": {"days": 0, "archived": 0, "unreferenced": 0, "bytes_before": 0, "bytes_after": 0},
+            }
+            if self.images_age_days > 0:
+                await self._tier_images(report["images"])
+            if self.results_age_days > 0:
+                await self._tier_results(report["results"])
+            report["bytes_saved"] = sum(s["bytes_before"] - s["bytes_after"] for s in
+                                        (report["images"], report["results"]))
+            report["duration_s"] = round(time.monotonic() - started, 2)
+            self.last_report = report
+            logger.info("저장소 계층화 완료", extra={
+                "images_recompressed": report["images"]["recompressed"],
+                "results_archived": report["results"]["archived"],
+                "bytes_saved": report["bytes_saved"], "duration_s": report["duration_s"],
+            })
+            return report
+
+    async def _update_location(self, old_path: str, updates: Dict[str, Any]) -> bool:
+        """old_path를 가리키던 매니페스트/이미지 행을 새 위치로 갱신 - 갱신한 행이 없으면 False (원본을 지우면 안 됨)"""
+        session_ids = await get_db_manager().update_artifact_location(old_path, updates)
+        manifest = get_artifact_manifest()
+        for session_id in session_ids:
+            manifest.forget(session_id)
+        return bool(session_ids)
+
+    async def _tier_images(self, stats: Dict[str, int]):
+        days = await asyncio.to_thread(_pending_days, self.images_dir, self._cutoff_day(self.images_age_days))
+        for day in days:
+            day_dir = os.path.join(self.images_dir, day)
+            files = _walk_files(day_dir)
+            while True:
+                batch = await asyncio.to_thread(_take, files, self.batch_size)
+                if not batch:
+                    break
+                for path, size in batch:
+                    # 축소본(WebP)은 이미 작으므로 원본 사진만 재압축한다
+                    if os.path.basename(path) in _SKIP_NAMES or path.endswith(RECOMPRESSED_SUFFIX) \
+                            or path.endswith(RENDITION_SUFFIXES) or path.endswith(".tmp"):
+                        continue
+                    try:
+                        recompressed = await asyncio.to_thread(recompress_image, path, self.max_side, self.quality)
+                    except Exception as e:
+                        logger.warning("사진 재압축 실패", extra={"path": path, "error": str(e)})
+                        recompressed = None
+                    if recompressed is None:
+                        stats["skipped"] += 1
+                        continue
+                    new_path, new_size, digest = recompressed
+                    try:
+                        updated = await self._update_location(path, {
+                            "file_path": new_path, "file_size": new_size, "sha256": digest,
+                            "mime_type": "image/jpeg", "storage_tier": "compressed",
+                        })
+                    except Exception:
+                        # DB가 여전히 원본을 가리키므로 새 파일을 지우고 다음 실행에서 다시 시도
+                        await asyncio.to_thread(_remove_files, [new_path])
+                        raise
+                    if not updated:
+                        # 가리키는 행이 없으면 재압축본을 버리고 원본을 그대로 둔다
+                        await asyncio.to_thread(_remove_files, [new_path])
+                        stats["unreferenced"] += 1
+                        continue
+                    await asyncio.to_thread(_remove_files, [path])
+                    stats["recompressed"] += 1
+                    stats["bytes_before"] += size
+                    stats["bytes_after"] += new_size
+                    metrics.tiering_bytes_saved_total.labels("images").inc(max(0, size - new_size))
+                    await asyncio.sleep(self.pause)
+            await asyncio.to_thread(_mark_tiered, day_dir)
+            stats["days"] += 1
+
+    async def _tier_results(self, stats: Dict[str, int]):
+        days = await asyncio.to_thread(_pending_days, self.results_dir, self._cutoff_day(self.results_age_days))
+        for day in days:
+            day_dir = os.path.join(self.results_dir, day)
+            archive_path = os.path.join(day_dir, ARCHIVE_NAME)
+            archive_size_before = await asyncio.to_thread(
+                lambda: os.path.getsize(archive_path) if os.path.exists(archive_path) else 0)
+            files = _walk_files(day_dir)
+            while True:
+                batch = await asyncio.to_thread(_take, files, self.batch_size)
+                if not batch:
+                    break
+                batch = [(path, size) for path, size in batch
+                         if os.path.basename(path) not in _SKIP_NAMES and not path.endswith(".tmp")]
+                if not batch:
+                    continue
+                added = await asyncio.to_thread(append_to_archive, day_dir, batch, self.level)
+                moved = []
+                for path, member in added.items():
+                    if await self._update_location(path, {
+                        "file_path": archive_path, "storage_tier": "archived",
+                        "archive_offset": member["offset"], "archive_length": member["length"],
+                    }):
+                        moved.append(path)
+                # 매니페스트가 아카이브를 가리키게 된 원본만 삭제 - 행이 없는 파일은 아카이브 위치를 찾을 길이 없으므로 남긴다
+                await asyncio.to_thread(_remove_files, moved)
+                stats["archived"] += len(moved)
+                stats["unreferenced"] += len(added) - len(moved)
+                moved_paths = set(moved)
+                stats["bytes_before"] += sum(size for path, size in batch if path in moved_paths)
+                await asyncio.sleep(self.pause)
+            archive_growth = await asyncio.to_thread(
+                lambda: os.path.getsize(archive_path) - archive_size_before if os.path.exists(archive_path) else 0)
+            stats["bytes_after"] += archive_growth
+            await asyncio.to_thread(_remove_empty_subdirs, day_dir)
+            await asyncio.to_thread(_mark_tiered, day_dir)
+            stats["days"] += 1
+        metrics.tiering_bytes_saved_total.labels("results").inc(max(0, stats["bytes_before"] - stats["bytes_after"]))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "supported": self.supported,
+            "interval_hours": self.interval / 3600,
+            "images_age_days": self.images_age_days,
+            "results_age_days": self.results_age_days,
+            "image_max_side": self.max_side,
+            "image_quality": self.quality,
+            "zstd_level": self.level,
+            "last_report": self.last_report,
+        }
+
+
+# 전역 저장소 계층화 엔진
+tiering_engine = None
+
+def get_tiering_engine() -> TieringEngine:
+    global tiering_engine
+    if tiering_engine is None:
+        storage = get_file_storage_manager()
+        tiering_engine = TieringEngine(
+            images_dir=storage.images_path,
+            results_dir=storage.results_path,
+            images_age_days=int(os.getenv("TIERING_IMAGES_AGE_DAYS", "14")),
+            results_age_days=int(os.getenv("TIERING_RESULTS_AGE_DAYS", "14")),
+            backend=storage.backend,
+            max_side=int(os.getenv("TIERING_IMAGE_MAX_SIDE", "2560")),
+            quality=int(os.getenv("TIERING_IMAGE_QUALITY", "85")),
+            level=int(os.getenv("TIERING_ZSTD_LEVEL", "12")),
+            batch_size=int(os.getenv("TIERING_BATCH_SIZE", "100")),
+            pause=float(os.getenv("TIERING_BATCH_PAUSE_MS", "50")) / 1000,
+            interval=float(os.getenv("TIERING_INTERVAL_HOURS", "24")) * 3600,
+        )
+    return tiering_engine
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+요청 추적 (분산 트레이싱 형식의 스팬)
+HTTP 요청마다 루트 스팬을 만들고 인증, DB, 파일 저장, 전처리, 모델 호출을 하위 스팬으로 기록한다.
+추적 ID는 X-Trace-Id 응답 헤더와 로그(trace_id 필드)에 실린다.
+샘플링된 추적은 OTLP/JSON 형식(resourceSpans) 한 줄씩 파일로 내보내며, 외부 서비스 없이 폭포수로 볼 수 있다.
+
+폭포수 보기: python tracing.py [추적 ID] [--file traces/spans.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import argparse
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SERVICE_NAME = "ai-safety-assessment-api"
+
+# OTLP 상태 코드
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# OTLP 스팬 종류
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Trace:
+    """하나의 요청에서 생긴 스팬 모음 - 루트 스팬이 끝나면 한 번에 내보낸다"""
+
+    __slots__ = ("trace_id", "sampled", "spans")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status",
+                 "status_message")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any],
+                 kind: int = SPAN_KIND_INTERNAL):
+        self.trace = trace
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message} if self.status_message
+            else {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """추적 밖(스크립트, CLI)이나 샘플링되지 않은 하위 스팬 - 비용 없이 같은 인터페이스만 제공"""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _attribute_value(value: Dict[str, Any]) -> Any:
+    for kind, raw in value.items():
+        return int(raw) if kind == "intValue" else raw
+    return None
+
+
+class FileSpanExporter:
+    """추적 단위로 OTLP/JSON(resourceSpans) 한 줄씩 파일에 쓴다 - 쓰기는 백그라운드 스레드가 맡는다
+
+    파일이 max_bytes를 넘으면 .1 로 한 번 돌려 쓴다.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(maxsize=10000)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Span]):
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _encode(self, spans: List[Span]) -> str:
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "tracing"}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        }, ensure_ascii=False)
+
+    def _run(self):
+        while True:
+            spans = self.queue.get()
+            if spans is None:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                    self.path.replace(self.path.with_name(self.path.name + ".1"))
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(self._encode(spans) + "\n")
+            except Exception as e:
+                print(f"⚠️ 스팬 내보내기 실패: {e}", file=sys.stderr)
+
+    def shutdown(self):
+        self.queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class Tracer:
+    """샘플링 결정과 루트 스팬 관리
+
+    sample_rate: 새 추적을 기록할 비율 (0~1). 상위 서비스가 traceparent로 샘플링 여부를 정했으면 그대로 따른다.
+    """
+
+    def __init__(self, sample_rate: float, exporter: Optional[FileSpanExporter]):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    @contextmanager
+    def root_span(self, name: str, traceparent: Optional[str] = None, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        """이 프로세스의 최상위 스팬 - traceparent가 있으면 그 추적을 이어 받아 상위 스팬의 자식이 된다"""
+        trace_id, parent_id, sampled = _parse_traceparent(traceparent)
+        if trace_id is None:
+            trace_id = _new_trace_id()
+            sampled = self.exporter is not None and random.random() < self.sample_rate
+        trace = Trace(trace_id, sampled and self.exporter is not None)
+        span = Span(trace, name, parent_id, attributes, kind)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if trace.sampled:
+                trace.spans.append(span)
+                self.exporter.export(trace.spans)
+
+
+def _parse_traceparent(value: Optional[str]):
+    """W3C traceparent (00-<trace id>-<parent span id>-<flags>) 파싱"""
+    if not value:
+        return None, None, False
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None, False
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None, None, False
+    return parts[1], parts[2], sampled
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """with span("storage.save_images", image_count=3) as s: ... - 현재 추적의 하위 스팬
+
+    요청 밖에서 호출되면 아무것도 기록하지 않는다.
+    """
+    parent = _current_span.get()
+    if parent is None or not parent.trace.sampled:
+        yield NOOP_SPAN
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(f"{type(e).__name__}: {e}"[:200])
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end_ns = time.time_ns()
+        if child.trace.sampled:
+            child.trace.spans.append(child)
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current_span.get()
+    return active.trace.trace_id if active is not None else None
+
+
+class TracingMiddleware:
+    """요청마다 루트 스팬을 만들고 X-Trace-Id 헤더를 붙이는 ASGI 미들웨어 (응답 본문을 감싸지 않아 스트리밍에 영향 없음)"""
+
+    def __init__(self, app, exclude_paths=()):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        tracer = get_tracer()
+        with tracer.root_span(f"{scope['method']} {scope['path']}", traceparent, SPAN_KIND_SERVER,
+                              **{"http.method": scope["method"], "http.target": scope["path"]}) as root:
+            trace_header = (b"x-trace-id", root.trace_id.encode())
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        root.set_error(f"HTTP {message['status']}")
+                    message["headers"] = list(message.get("headers", ())) + [trace_header]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
+
+
+# 전역 트레이서
+tracer = None
+
+
+def get_tracer() -> Tracer:
+    """환경변수: TRACE_SAMPLE_RATE(기본 0.1, 0이면 내보내지 않음), TRACE_EXPORT_PATH, TRACE_EXPORT_MAX_MB"""
+    global tracer
+    if tracer is None:
+        sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+        exporter = None
+        if sample_rate > 0:
+            exporter = FileSpanExporter(
+                os.getenv("TRACE_EXPORT_PATH", "traces/spans.jsonl"),
+                int(float(os.getenv("TRACE_EXPORT_MAX_MB", "100")) * 1024 * 1024),
+            )
+            atexit.register(exporter.shutdown)
+        tracer = Tracer(sample_rate, exporter)
+    return tracer
+
+
+# ---------------------------------------------------------------------------
+# 폭포수 보기 (CLI)
+# ---------------------------------------------------------------------------
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for item in scope["spans"]:
+                        traces.setdefault(item["traceId"], []).append(item)
+    return traces
+
+
+def print_waterfall(spans: List[Dict[str, Any]], width: int = 50):
+    start = min(int(s["startTimeUnixNano"]) for s in spans)
+    end = max(int(s["endTimeUnixNano"]) for s in spans)
+    total = max(end - start, 1)
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {s["spanId"] for s in spans}
+    for s in sorted(spans, key=lambda s: int(s["startTimeUnixNano"])):
+        parent = s.get("parentSpanId")
+        children.setdefault(parent if parent in span_ids else None, []).append(s)
+
+    print(f"추적 {spans[0]['traceId']} - 전체 {total / 1e6:.1f} ms")
+
+    def walk(parent_id: Optional[str], depth: int):
+        for s in children.get(parent_id, []):
+            offset = (int(s["startTimeUnixNano"]) - start) / total
+            duration = (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / total
+            bar = " " * int(offset * width) + "█" * max(1, int(duration * width))
+            error = " ❌" if s["status"].get("code") == STATUS_ERROR else ""
+            label = ("  " * depth + s["name"])[:40]
+            print(f"{label:<40} {bar:<{width}} {(int(s['endTimeUnixNano']) - int(s['startTimeUnixNano'])) / 1e6:>9.1f} ms{error}")
+            walk(s["spanId"], depth + 1)
+
+    walk(None, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추적 파일의 스팬을 폭포수로 출력")
+    parser.add_argument("trace_id", nargs="?", help="추적 ID (미지정 시 최근 추적 목록)")
+    parser.add_argument("--file", default=os.getenv("TRACE_EXPORT_PATH", "traces/spans.jsonl"))
+    parser.add_argument("--last", type=int, default=20, help="목록에 보여줄 최근 추적 수")
+    args = parser.parse_args()
+
+    traces = load_traces(args.file)
+    if args.trace_id:
+        if args.trace_id not in traces:
+            raise SystemExit(f"❌ 추적을 찾을 수 없습니다: {args.trace_id}")
+        print_waterfall(traces[args.trace_id])
+        return
+    for trace_id, spans in list(traces.items())[-args.last:]:
+        # 상위 서비스의 traceparent를 이어 받은 요청은 루트 스팬에도 parentSpanId가 있으므로 종류로 찾는다
+        root = next((s for s in spans if s.get("kind") == SPAN_KIND_SERVER), spans[0])
+        duration = (int(root["endTimeUnixNano"]) - int(root["startTimeUnixNano"])) / 1e6
+        status = {a["key"]: _attribute_value(a["value"]) for a in root["attributes"]}.get("http.status_code", "")
+        print(f"{trace_id}  {root['name']:<30} {status!s:>4} {duration:>9.1f} ms  스팬 {len(spans)}개")
+
+
+if __name__ == "__main__":
+    main()